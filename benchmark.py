@@ -0,0 +1,332 @@
+"""
+Benchmark del percorso disegno -> feature -> previsione, senza display.
+
+L'app viene costruita senza Tk (widget sostituiti da oggetti vuoti) e riceve
+tratti sintetici riproducibili. Si misurano:
+
+    draw_event_us[...]           draw_on_canvas per evento, a vari brush_size
+    update_pixel_counts_us[...]  calcolo delle feature (griglia 2x2 e NxN)
+    classify_input_us[...]       latenza di una singola classify_input
+    classify_cached_us[...]      la stessa previsione già nella cache LRU (predcache.py)
+    classify_batch_rows_per_s[.] throughput di classify_batch (anche rete + k-NN con --knn-assist)
+    knn_*[rows=...]              costruzione, ricerca e aggiunte dell'indice k-NN su
+                                 righe sintetiche, per vedere come scala oltre dataset.csv
+    cold_start_s[...]            percorso di caricamento di LoadingScreen in un
+                                 processo nuovo (import compresi)
+
+I risultati sono scritti in JSON (formato stabile, vedi BENCHMARK_FORMAT). Con
+--compare si confrontano con una baseline salvata: le metriche peggiorate oltre
+--threshold vengono segnalate e il processo esce con codice 1.
+
+Uso:
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import knn
+import main
+from features import CANVAS_SIZE
+from predcache import PredictionCache
+from replay import headless_app, reset_canvas
+
+BENCHMARK_FORMAT = 1
+BRUSH_SIZES = (2, 8, 16, 32)
+GRID_SIZES = (2, 4)
+DEFAULT_THRESHOLD = 0.20   # Peggioramento relativo oltre il quale una metrica è una regressione
+DEFAULT_REPEATS = 5
+STROKES = 40               # Tratti sintetici per ripetizione
+STROKE_EVENTS = 60         # Eventi <B1-Motion> per tratto
+BATCH_ROWS = 100_000
+SINGLE_CALLS = 2000
+KNN_INDEX_ROWS = (10_000, 200_000)
+KNN_INSERTS = 5000
+
+
+def synthetic_strokes(n_strokes=STROKES, n_events=STROKE_EVENTS, seed=0):
+    """Tratti come passeggiate casuali con velocità variabile, dentro il canvas."""
+    rng = np.random.default_rng(seed)
+    strokes = []
+    for _ in range(n_strokes):
+        start = rng.uniform(20, CANVAS_SIZE - 20, 2)
+        heading = rng.uniform(0, 2 * np.pi)
+        points = [start]
+        for _ in range(n_events - 1):
+            heading += rng.normal(0, 0.4)
+            step = rng.uniform(1, 8)
+            points.append(np.clip(points[-1] + step * np.array([np.cos(heading), np.sin(heading)]),
+                                  0, CANVAS_SIZE - 1))
+        strokes.append([(int(x), int(y)) for x, y in points])
+    return strokes
+
+def play_strokes(app, strokes):
+    """Stessa sequenza di chiamate di start_draw / draw_line / stop_draw, storico compreso."""
+    for stroke in strokes:
+        last_x, last_y = stroke[0]
+        app.history.begin()
+        app.draw_on_canvas(last_x, last_y)
+        for x, y in stroke[1:]:
+            app.draw_on_canvas(x, y, last_x, last_y)
+            last_x, last_y = x, y
+        app.history.commit()
+
+
+def _best_time(run, repeats, setup=None):
+    """Tempo migliore su più ripetizioni (come timeit): il meno disturbato dal resto del sistema."""
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def _metric(value, unit, better='lower'):
+    return {'value': round(value, 3), 'unit': unit, 'better': better}
+
+
+def bench_drawing(results, repeats):
+    strokes = synthetic_strokes()
+    n_events = sum(len(stroke) for stroke in strokes)
+    for render_mode, brushes in (('bitmap', BRUSH_SIZES), ('vector', (8,))):
+        for brush_size in brushes:
+            app = headless_app(brush_size, render_mode)
+            seconds = _best_time(lambda: play_strokes(app, strokes), repeats, lambda: reset_canvas(app))
+            results[f'draw_event_us[brush={brush_size},render={render_mode}]'] = \
+                _metric(seconds / n_events * 1e6, 'us')
+    for grid_size in GRID_SIZES[1:]:
+        # Griglia NxN: ogni evento aggiorna anche i conteggi per cella
+        app = headless_app(grid_size=grid_size)
+        seconds = _best_time(lambda: play_strokes(app, strokes), repeats, lambda: reset_canvas(app))
+        results[f'draw_event_us[brush=8,render=bitmap,grid={grid_size}]'] = _metric(seconds / n_events * 1e6, 'us')
+
+def bench_features(results, repeats):
+    strokes = synthetic_strokes(seed=1)
+    for grid_size in GRID_SIZES:
+        app = headless_app(grid_size=grid_size)
+        play_strokes(app, strokes)
+        calls = 2000
+
+        def run():
+            for _ in range(calls):
+                app.update_pixel_counts()
+        seconds = _best_time(run, repeats)
+        results[f'update_pixel_counts_us[grid={grid_size}]'] = _metric(seconds / calls * 1e6, 'us')
+
+def available_backends(requested):
+    backends, skipped = [], {}
+    for backend in requested:
+        if backend == 'keras':
+            try:
+                import tensorflow  # noqa: F401
+            except ImportError:
+                skipped[backend] = "TensorFlow non installato"
+                continue
+            if not os.path.exists(main.MODEL_PATH):
+                skipped[backend] = f"'{main.MODEL_PATH}' non trovato"
+                continue
+        if backend == 'knn' and not os.path.exists(knn.DATASET_PATH):
+            skipped[backend] = f"'{knn.DATASET_PATH}' non trovato"
+            continue
+        backends.append(backend)
+    return backends, skipped
+
+def bench_inference(results, skipped, backends, scaler, repeats):
+    rng = np.random.default_rng(2)
+    for backend in backends:
+        try:
+            model = main.load_model_backend(backend, status=lambda message: None)
+        except Exception as e:
+            skipped[f'inference[{backend}]'] = str(e)
+            continue
+        network = main.network_view(model)
+        n_features = network.input_size if network is not None else 4
+        rows = rng.uniform(0, 30, (BATCH_ROWS, n_features))
+        calls = SINGLE_CALLS if backend != 'keras' else 50
+
+        def single():
+            for row in rows[:calls]:
+                main.classify_input(model, scaler, row)
+        seconds = _best_time(single, repeats)
+        results[f'classify_input_us[backend={backend}]'] = _metric(seconds / calls * 1e6, 'us')
+        cache = PredictionCache(calls)
+
+        def cached():
+            for row in rows[:calls]:
+                cache.classify(model, scaler, row)
+        cached() # Riempie la cache: si misurano solo i hit
+        seconds = _best_time(cached, repeats)
+        results[f'classify_cached_us[backend={backend}]'] = _metric(seconds / calls * 1e6, 'us')
+        seconds = _best_time(lambda: main.classify_batch(model, scaler, rows), repeats)
+        results[f'classify_batch_rows_per_s[backend={backend}]'] = _metric(BATCH_ROWS / seconds, 'rows/s',
+                                                                           better='higher')
+
+def bench_knn(results, skipped, backends, scaler, repeats):
+    """Indice k-NN su righe sintetiche di varie dimensioni, e la rete affiancata dal k-NN."""
+    rng = np.random.default_rng(3)
+    queries = rng.uniform(0, 30, (SINGLE_CALLS, 4))
+    scaled = scaler.transform(queries)
+    for n_rows in KNN_INDEX_ROWS:
+        features, labels = rng.uniform(0, 30, (n_rows, 4)), rng.integers(1, 4, n_rows)
+        seconds = _best_time(lambda: knn.NearestNeighborClassifier(features, labels, scaler), repeats)
+        results[f'knn_build_s[rows={n_rows}]'] = _metric(seconds, 's')
+        index = knn.NearestNeighborClassifier(features, labels, scaler)
+
+        def single():
+            for row in scaled:
+                index.predict(row.reshape(1, -1))
+        seconds = _best_time(single, repeats)
+        results[f'knn_query_us[rows={n_rows}]'] = _metric(seconds / len(scaled) * 1e6, 'us')
+
+        def inserts():
+            # Indice nuovo a ogni ripetizione: le ricostruzioni dell'albero sono comprese
+            fresh = knn.NearestNeighborClassifier(features, labels, scaler)
+            for i in range(KNN_INSERTS):
+                fresh.add(queries[i % len(queries)], i % 3 + 1)
+        seconds = _best_time(inserts, repeats)
+        results[f'knn_insert_us[rows={n_rows}]'] = _metric(seconds / KNN_INSERTS * 1e6, 'us')
+
+    network_backends = [backend for backend in backends if backend != 'knn']
+    if 'knn' not in backends or not network_backends:
+        return
+    backend = network_backends[0]
+    try:
+        model = main.load_model_backend(backend, status=lambda message: None)
+    except Exception as e:
+        skipped[f'knn_assist[{backend}]'] = str(e)
+        return
+    rows = rng.uniform(0, 30, (BATCH_ROWS, 4))
+    for mode in knn.ASSIST_MODES:
+        assisted = knn.assist_factory(mode)(model, scaler)
+        seconds = _best_time(lambda: main.classify_batch(assisted, scaler, rows), repeats)
+        results[f'classify_batch_rows_per_s[backend={backend},knn_assist={mode}]'] = _metric(
+            BATCH_ROWS / seconds, 'rows/s', better='higher')
+
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+main.load_app_resources({backend!r}, status=lambda message: None)
+print(time.perf_counter() - start)
+"""
+
+FAST_START_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+model, scaler = main.load_fast_start({backend!r})
+assert model is not None, "artefatto non aggiornato"
+print(time.perf_counter() - start)
+"""
+
+def _run_cold(script):
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'errore')
+    return float(completed.stdout.strip().splitlines()[-1])
+
+def bench_cold_start(results, skipped, backends, repeats):
+    """Ogni misura in un interprete nuovo: import di main (Tk, NumPy) e caricamento del modello."""
+    for backend in backends:
+        try:
+            seconds = [_run_cold(COLD_START_SCRIPT.format(backend=backend)) for _ in range(repeats)]
+            results[f'cold_start_s[backend={backend}]'] = _metric(min(seconds), 's')
+        except Exception as e:
+            skipped[f'cold_start[{backend}]'] = str(e)
+            continue
+        try:
+            # Prepara l'artefatto (come il primo avvio con --fast-start), poi misura i lanci successivi
+            model, scaler = main.load_model_backend(backend, status=lambda message: None), main.load_scaler()
+            main.compile_fast_start(model, scaler, backend)
+            seconds = [_run_cold(FAST_START_SCRIPT.format(backend=backend)) for _ in range(repeats)]
+            results[f'cold_start_s[backend={backend},fast_start]'] = _metric(min(seconds), 's')
+        except Exception as e:
+            skipped[f'cold_start[{backend},fast_start]'] = str(e)
+
+
+def run_benchmarks(backends, repeats=DEFAULT_REPEATS, cold_start=True):
+    results, skipped = {}, {}
+    try:
+        scaler, scaler_source = main.load_scaler(), main.SCALER_PATH
+    except Exception as e:
+        from engine import AffineScaler
+        scaler, scaler_source = AffineScaler.identity(4), 'identity'
+        skipped['scaler'] = f"{e} (uso uno scaler identità per la latenza di inferenza)"
+    backends, unavailable = available_backends(backends)
+    skipped.update(unavailable)
+
+    bench_drawing(results, repeats)
+    bench_features(results, repeats)
+    bench_inference(results, skipped, backends, scaler, repeats)
+    if 'knn' in backends:
+        bench_knn(results, skipped, backends, scaler, repeats)
+    if cold_start:
+        bench_cold_start(results, skipped, backends, repeats)
+    return {
+        'format': BENCHMARK_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'machine': platform.machine(),
+                        'scaler': scaler_source, 'repeats': repeats},
+        'results': results,
+        'skipped': skipped,
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Confronta le metriche comuni. Restituisce una lista di righe (nome, baseline, attuale, variazione, regressione)."""
+    if baseline.get('format') != BENCHMARK_FORMAT:
+        raise ValueError(f"Formato della baseline non supportato: {baseline.get('format')}")
+    rows = []
+    for name, metric in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        old, new = baseline['results'][name]['value'], metric['value']
+        # Variazione positiva = peggioramento, qualunque sia il verso della metrica
+        if metric['better'] == 'lower':
+            change = new / old - 1 if old else 0.0
+        else:
+            change = old / new - 1 if new else float('inf')
+        rows.append((name, old, new, change, change > threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark headless di disegno, feature e previsione.")
+    parser.add_argument('--backend', nargs='+', choices=main.BACKENDS, default=['numpy', 'numpy-csv', 'knn', 'keras'],
+                        help="Backend da misurare (quelli non disponibili vengono saltati)")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--no-cold-start', action='store_true', help="Salta le misure in processi nuovi")
+    parser.add_argument('--output', default=None, help="File JSON dei risultati (predefinito: stdout)")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON di una esecuzione precedente")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Peggioramento relativo tollerato (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.backend, args.repeats, cold_start=not args.no_cold_start)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        for name, old, new, change, regression in rows:
+            flag = 'REGRESSIONE' if regression else 'ok'
+            print(f"{name:<52} {old:>14,.3f} -> {new:>14,.3f}  {change * 100:+7.1f}%  {flag}")
+        regressions = [row for row in rows if row[4]]
+        print(f"{len(regressions)} regressioni su {len(rows)} metriche (soglia {args.threshold * 100:.0f}%)")
+        raise SystemExit(1 if regressions else 0)
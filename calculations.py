@@ -21,11 +21,7 @@ W15 = np.array([
 ]).T # La matrice è (5x3) nel testo, quindi la trasponiamo per avere (3x5)
 b15 = np.array([-0.02902211, -0.13917246,  0.18778509])
 
-# --- 2. Input di Esempio ---
-X = np.array([2.24, 8.00, 7.68, 11.08])
-print(f"Input X: {X}\n")
-
-# --- 3. Funzioni di Attivazione ---
+# --- 2. Funzioni di Attivazione ---
 def relu(Z):
     """Funzione di Attivazione ReLU: max(0, Z)"""
     return np.maximum(0, Z)
@@ -36,31 +32,42 @@ def softmax(Z):
     exp_Z = np.exp(Z - np.max(Z))
     return exp_Z / np.sum(exp_Z)
 
-# --- 4. Calcolo Layer dense_14 (ReLU) ---
+# --- 3. Forward Pass ---
+def forward(X):
+    """Probabilità di uscita per un singolo input X (stesso calcolo delle sezioni 5 e 6)."""
+    A14 = relu(np.dot(W14, X) + b14)
+    return softmax(np.dot(W15, A14) + b15)
+
+if __name__ == "__main__":
+    # --- 4. Input di Esempio ---
+    X = np.array([2.24, 8.00, 7.68, 11.08])
+    print(f"Input X: {X}\n")
+
+    # --- 5. Calcolo Layer dense_14 (ReLU) ---
 
-# Calcolo del Net Input (Z14)
-# Z = W * X + b
-Z14 = np.dot(W14, X) + b14
-A14 = relu(Z14)
+    # Calcolo del Net Input (Z14)
+    # Z = W * X + b
+    Z14 = np.dot(W14, X) + b14
+    A14 = relu(Z14)
 
-print("--- Calcolo Layer dense_14 (ReLU) ---")
-print(f"Dimensione Pesi (W14): {W14.shape}, Dimensione Bias (b14): {b14.shape}")
-print(f"Net Input (Z14): W14 * X + b14")
-print(f"Z14:\n{Z14}")
-print(f"Attivazione (A14): ReLU(Z14)")
-print(f"A14:\n{A14}\n")
+    print("--- Calcolo Layer dense_14 (ReLU) ---")
+    print(f"Dimensione Pesi (W14): {W14.shape}, Dimensione Bias (b14): {b14.shape}")
+    print(f"Net Input (Z14): W14 * X + b14")
+    print(f"Z14:\n{Z14}")
+    print(f"Attivazione (A14): ReLU(Z14)")
+    print(f"A14:\n{A14}\n")
 
-# --- 5. Calcolo Layer dense_15 (Softmax) ---
+    # --- 6. Calcolo Layer dense_15 (Softmax) ---
 
-# Calcolo del Net Input (Z15)
-# Z = W * A_prev + b
-Z15 = np.dot(W15, A14) + b15
-Y_pred = softmax(Z15)
+    # Calcolo del Net Input (Z15)
+    # Z = W * A_prev + b
+    Z15 = np.dot(W15, A14) + b15
+    Y_pred = softmax(Z15)
 
-print("--- Calcolo Layer dense_15 (Softmax) ---")
-print(f"Dimensione Pesi (W15): {W15.shape}, Dimensione Bias (b15): {b15.shape}")
-print(f"Net Input (Z15): W15 * A14 + b15")
-print(f"Z15:\n{Z15}")
-print(f"Output Finale (Y_pred): Softmax(Z15)")
-print(f"Y_pred (Probabilità):\n{Y_pred}")
-print(f"Somma delle probabilità (dovrebbe essere 1): {np.sum(Y_pred)}")
\ No newline at end of file
+    print("--- Calcolo Layer dense_15 (Softmax) ---")
+    print(f"Dimensione Pesi (W15): {W15.shape}, Dimensione Bias (b15): {b15.shape}")
+    print(f"Net Input (Z15): W15 * A14 + b15")
+    print(f"Z15:\n{Z15}")
+    print(f"Output Finale (Y_pred): Softmax(Z15)")
+    print(f"Y_pred (Probabilità):\n{Y_pred}")
+    print(f"Somma delle probabilità (dovrebbe essere 1): {np.sum(Y_pred)}")
@@ -0,0 +1,233 @@
+"""
+Archivio colonnare binario per i dataset (feature x1..xN e bitmap 28x28).
+
+Un archivio è una cartella con un manifest.json e un file binario per colonna:
+righe di dimensione fissa una dopo l'altra, little-endian, come i dati di un
+.npy senza intestazione. La lettura è un np.memmap, senza parsing né copia:
+aprire un milione di righe costa quanto aprire un file. L'archivio è
+append-only: i nuovi blocchi vengono scritti in coda alle colonne, poi il
+manifest (scritto in modo atomico) aggiorna il numero di righe. Eventuali byte
+oltre quel numero, lasciati da una scrittura interrotta, vengono ignorati e
+sovrascritti.
+
+    kind 'features': features (N, F) float32, label (N,) int32
+    kind 'bitmaps':  pixels (N, 28, 28) uint8, label (N,) int32
+
+Conversione dai CSV esistenti (dataset.csv, export del sito label,x1..xN,
+export grezzo label,p0..p783):
+
+    python colstore.py convert dataset.csv dataset_store
+    python colstore.py info dataset_store
+"""
+import argparse
+import json
+import os
+import time
+from itertools import islice
+
+import numpy as np
+
+from features import DEFAULT_CLASSES
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+BITMAP_SIZE = 28
+CONVERT_CHUNK_ROWS = 65536
+
+
+class ColumnStore:
+    def __init__(self, path):
+        """Apre un archivio esistente (vedi create per crearne uno nuovo)."""
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Formato dell'archivio non supportato: {self.manifest.get('format')}")
+
+    @classmethod
+    def create(cls, path, kind, columns, meta=None):
+        """columns: {nome: (dtype, forma di una riga)}; meta: dizionario salvato nel manifest."""
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            raise FileExistsError(f"'{path}' contiene già un archivio")
+        manifest = {'format': FORMAT_VERSION, 'kind': kind, 'rows': 0, 'meta': meta or {},
+                    'columns': {name: {'file': f'{name}.bin', 'dtype': np.dtype(dtype).newbyteorder('<').str,
+                                       'shape': list(shape)}
+                                for name, (dtype, shape) in columns.items()}}
+        for spec in manifest['columns'].values():
+            open(os.path.join(path, spec['file']), 'wb').close()
+        _write_manifest(path, manifest)
+        return cls(path)
+
+    @property
+    def kind(self):
+        return self.manifest['kind']
+
+    @property
+    def meta(self):
+        return self.manifest['meta']
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def column(self, name):
+        """Colonna come array in sola lettura mappato in memoria (nessuna copia)."""
+        spec = self.manifest['columns'][name]
+        shape = (len(self),) + tuple(spec['shape'])
+        if len(self) == 0:
+            return np.empty(shape, dtype=spec['dtype'])
+        return np.memmap(os.path.join(self.path, spec['file']), dtype=spec['dtype'], mode='r', shape=shape)
+
+    def append(self, **arrays):
+        """Aggiunge lo stesso numero di righe a ogni colonna, poi aggiorna il manifest."""
+        columns = self.manifest['columns']
+        if set(arrays) != set(columns):
+            raise ValueError(f"Servono esattamente le colonne {sorted(columns)}")
+        n_rows = {len(a) for a in arrays.values()}
+        if len(n_rows) != 1:
+            raise ValueError("Le colonne devono avere lo stesso numero di righe")
+        n_rows = n_rows.pop()
+        prepared = {}
+        for name, array in arrays.items():
+            spec = columns[name]
+            array = np.ascontiguousarray(array, dtype=spec['dtype'])
+            if array.shape[1:] != tuple(spec['shape']):
+                raise ValueError(f"Colonna '{name}': righe di forma {array.shape[1:]}, attesa {tuple(spec['shape'])}")
+            prepared[name] = array
+        for name, array in prepared.items():
+            spec = columns[name]
+            row_bytes = np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape'], dtype=np.int64))
+            with open(os.path.join(self.path, spec['file']), 'r+b') as f:
+                # Sovrascrive eventuali byte lasciati da un'aggiunta interrotta
+                f.seek(len(self) * row_bytes)
+                f.write(array.tobytes())
+                f.truncate()
+        self.manifest['rows'] += n_rows
+        _write_manifest(self.path, self.manifest)
+
+    def set_meta(self, **meta):
+        self.manifest['meta'].update(meta)
+        _write_manifest(self.path, self.manifest)
+
+
+def _write_manifest(path, manifest):
+    tmp_path = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+def is_store(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST))
+
+
+# --- Conversione dai CSV ---
+
+def csv_layout(header):
+    """Tipo di archivio e colonne di un CSV: (kind, indice di label, indici dei valori)."""
+    if 'label' not in header:
+        raise ValueError("Il CSV deve avere una colonna 'label'")
+    label_column = header.index('label')
+    value_columns = [i for i, name in enumerate(header) if name != 'label']
+    names = [header[i] for i in value_columns]
+    if names == [f'p{i}' for i in range(BITMAP_SIZE * BITMAP_SIZE)]:
+        return 'bitmaps', label_column, value_columns
+    if names == [f'x{i + 1}' for i in range(len(names))]:
+        return 'features', label_column, value_columns
+    raise ValueError("Colonne non riconosciute: servono x1..xN oppure p0..p783 più 'label'")
+
+def _encode_labels(raw, label_names):
+    """(codici, testuali): etichette numeriche così come sono; testuali (es. a/b/c del sito)
+    con la tabella label_names (1..K).
+
+    Il codice dipende solo dalla tabella, non dall'ordine delle righe: un nome
+    che non vi compare è un errore, non una nuova classe.
+    """
+    try:
+        return raw.astype(np.float64).astype(np.int32), False
+    except ValueError:
+        codes = {name: i + 1 for i, name in enumerate(label_names)}
+        unknown = sorted({name for name in raw if name not in codes and not name.isdigit()})
+        if unknown:
+            raise ValueError(f"Etichette sconosciute: {', '.join(unknown)} (classi: {', '.join(label_names)})")
+        return np.array([codes[name] if name in codes else int(name) for name in raw], dtype=np.int32), True
+
+def convert_csv(csv_path, store_path, chunk_rows=CONVERT_CHUNK_ROWS, classes=DEFAULT_CLASSES):
+    """Converte (o aggiunge a un archivio esistente) un CSV a blocchi. Restituisce l'archivio.
+
+    classes: nomi delle etichette testuali 1..K; un archivio che ha già i suoi
+    (label_names nel manifest) continua a usare quelli.
+    """
+    with open(csv_path) as src:
+        header = src.readline().strip().split(',')
+        kind, label_column, value_columns = csv_layout(header)
+        if is_store(store_path):
+            store = ColumnStore(store_path)
+            if store.kind != kind:
+                raise ValueError(f"L'archivio è di tipo '{store.kind}', il CSV di tipo '{kind}'")
+        elif kind == 'bitmaps':
+            store = ColumnStore.create(store_path, kind, {'pixels': (np.uint8, (BITMAP_SIZE, BITMAP_SIZE)),
+                                                          'label': (np.int32, ())})
+        else:
+            store = ColumnStore.create(store_path, kind, {'features': (np.float32, (len(value_columns),)),
+                                                          'label': (np.int32, ())},
+                                       meta={'feature_names': [header[i] for i in value_columns]})
+        label_names = list(store.meta.get('label_names') or classes)
+        text_labels = False
+
+        while True:
+            lines = list(islice(src, chunk_rows))
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                break
+            cells = np.array([line.rstrip('\r\n').split(',') for line in lines])
+            labels, named = _encode_labels(cells[:, label_column], label_names)
+            text_labels = text_labels or named
+            values = cells[:, value_columns].astype(np.float32)
+            if kind == 'bitmaps':
+                # Export grezzo: scala di grigi 0-255, oppure 0-1 (riportata a 0-255)
+                if values.size and values.max() <= 1.0:
+                    values = values * 255
+                pixels = np.clip(np.rint(values), 0, 255).astype(np.uint8)
+                store.append(pixels=pixels.reshape(-1, BITMAP_SIZE, BITMAP_SIZE), label=labels)
+            else:
+                store.append(features=values, label=labels)
+    if text_labels and 'label_names' not in store.meta:
+        store.set_meta(label_names=label_names)
+    return store
+
+def load_features(path):
+    """(feature, etichette) di un archivio 'features', mappati in memoria."""
+    store = ColumnStore(path)
+    if store.kind != 'features':
+        raise ValueError(f"'{path}' contiene {store.kind}, non feature")
+    return store.column('features'), store.column('label')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivio colonnare binario per i dataset.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="Converte un CSV (o lo aggiunge a un archivio esistente)")
+    convert.add_argument('csv')
+    convert.add_argument('store')
+    convert.add_argument('--chunk-rows', type=int, default=CONVERT_CHUNK_ROWS)
+    convert.add_argument('--classes', nargs='+', default=list(DEFAULT_CLASSES),
+                         help="Nomi delle etichette testuali 1..K")
+    info = commands.add_parser('info', help="Mostra manifest e tempo di apertura")
+    info.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        start = time.perf_counter()
+        store = convert_csv(args.csv, args.store, args.chunk_rows, tuple(args.classes))
+        print(f"'{args.csv}' -> '{args.store}' ({store.kind}): {len(store)} righe "
+              f"in {time.perf_counter() - start:.2f}s")
+    else:
+        start = time.perf_counter()
+        store = ColumnStore(args.store)
+        columns = {name: store.column(name) for name in store.manifest['columns']}
+        elapsed = time.perf_counter() - start
+        print(f"'{args.store}': tipo {store.kind}, {len(store)} righe (aperto in {elapsed * 1000:.2f} ms)")
+        for name, column in columns.items():
+            print(f"  {name:<10} {column.dtype.str:<5} {str(column.shape):<20} {column.nbytes:,} byte")
+        if store.meta:
+            print(f"  meta: {json.dumps(store.meta)}")
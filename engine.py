@@ -0,0 +1,476 @@
+"""
+Motore di inferenza in NumPy puro per la rete densa del riconoscimento lettere.
+
+Esegue lo stesso forward pass mostrato in calculations.py (ReLU nello strato
+nascosto, Softmax in uscita) senza importare TensorFlow. I pesi possono essere
+caricati dal modello TF.js (model.json + group1-shard1of1.bin), dai CSV usati
+dal sito (weights_*.csv / biases_*.csv) oppure copiati da un modello Keras già
+in memoria.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# --- Percorsi predefiniti dei pesi ---
+MODEL_JSON_PATH = 'model.json'
+WEIGHTS_HIDDEN_PATH = 'weights_hidden.csv'
+BIASES_HIDDEN_PATH = 'biases_hidden.csv'
+WEIGHTS_OUTPUT_PATH = 'weights_output.csv'
+BIASES_OUTPUT_PATH = 'biases_output.csv'
+
+# --- Funzioni di Attivazione ---
+
+def relu(Z):
+    """Funzione di Attivazione ReLU: max(0, Z)"""
+    return np.maximum(Z, 0)
+
+def softmax(Z):
+    """Softmax riga per riga, stabile numericamente (sottrae il max)."""
+    exp_Z = np.exp(Z - Z.max(axis=-1, keepdims=True))
+    return exp_Z / exp_Z.sum(axis=-1, keepdims=True)
+
+def linear(Z):
+    return Z
+
+ACTIVATIONS = {'relu': relu, 'softmax': softmax, 'linear': linear}
+
+
+class AffineScaler:
+    """Scaler per colonna x * scale + offset, con la stessa interfaccia transform di scikit-learn."""
+
+    def __init__(self, scale, offset):
+        self.scale = np.asarray(scale, dtype=float).ravel()
+        self.offset = np.asarray(offset, dtype=float).ravel()
+
+    @classmethod
+    def identity(cls, n_features):
+        return cls(np.ones(n_features), np.zeros(n_features))
+
+    @classmethod
+    def from_scaler(cls, scaler, n_features):
+        """Ricava scale/offset da uno scaler affine (StandardScaler, MinMaxScaler, ...)."""
+        offset = np.asarray(scaler.transform(np.zeros((1, n_features))), dtype=float)[0]
+        scale = np.asarray(scaler.transform(np.ones((1, n_features))), dtype=float)[0] - offset
+        affine = cls(scale, offset)
+        probe = np.random.default_rng(0).uniform(0, 100, size=(16, n_features))
+        if not np.allclose(affine.transform(probe), scaler.transform(probe), rtol=1e-6, atol=1e-6):
+            raise ValueError("Lo scaler non è affine per colonna: impossibile incorporarlo nel modello")
+        return affine
+
+    @classmethod
+    def from_json(cls, config):
+        """Legge i formati di scaler.json accettati da index.html.
+
+        StandardScaler: { mean, scale } con (x - mean) / scale
+        MinMax:         { min, scale }  con (x - min) * scale
+        """
+        if 'mean' in config:
+            scale = np.asarray(config['scale'], dtype=float)
+            scale = np.where(scale == 0, 1.0, scale)
+            return cls(1.0 / scale, -np.asarray(config['mean'], dtype=float) / scale)
+        if 'min' in config:
+            scale = np.asarray(config['scale'], dtype=float)
+            scale = np.where(scale == 0, 1.0, scale)
+            return cls(scale, -np.asarray(config['min'], dtype=float) * scale)
+        raise ValueError("scaler.json deve contenere 'mean'/'scale' oppure 'min'/'scale'")
+
+    def to_json(self):
+        """Formato StandardScaler di scaler.json equivalente a questo scaler."""
+        return {'mean': (0.0 - self.offset / self.scale).tolist(), 'scale': (1.0 / self.scale).tolist()}
+
+    def transform(self, X):
+        return np.asarray(X, dtype=float) * self.scale + self.offset
+
+
+class FoldedScaler(AffineScaler):
+    """Identità da usare con una rete che ha lo scaler incorporato nel primo layer (avvio rapido).
+
+    folded è lo scaler incorporato, per chi lavora ancora sugli input
+    normalizzati (l'indice k-NN di knn.py).
+    """
+
+    def __init__(self, folded):
+        n_features = len(folded.scale)
+        super().__init__(np.ones(n_features), np.zeros(n_features))
+        self.folded = folded
+
+
+class DenseNetwork:
+    """Sequenza di layer Dense (kernel, bias, attivazione) eseguita con NumPy."""
+
+    def __init__(self, layers, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.layers = []
+        for kernel, bias, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Attivazione non supportata: {activation}")
+            kernel = np.ascontiguousarray(kernel, dtype=self.dtype)
+            bias = np.ascontiguousarray(np.ravel(bias), dtype=self.dtype)
+            if kernel.ndim != 2 or kernel.shape[1] != bias.shape[0]:
+                raise ValueError(f"Forme incompatibili: kernel {kernel.shape}, bias {bias.shape}")
+            self.layers.append((kernel, bias, activation))
+        for (k_prev, _, _), (k_next, _, _) in zip(self.layers, self.layers[1:]):
+            if k_prev.shape[1] != k_next.shape[0]:
+                raise ValueError("I layer non sono concatenabili: "
+                                 f"{k_prev.shape} -> {k_next.shape}")
+
+    @property
+    def layer_sizes(self):
+        """Numero di neuroni per layer, input compreso (es. [4, 5, 3])."""
+        return [self.layers[0][0].shape[0]] + [k.shape[1] for k, _, _ in self.layers]
+
+    @property
+    def input_size(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def output_size(self):
+        return self.layers[-1][0].shape[1]
+
+    # --- Caricamento ---
+
+    @classmethod
+    def from_tfjs(cls, model_json_path=MODEL_JSON_PATH, mmap=False):
+        """Carica topologia e pesi da un modello TF.js 'layers-model'.
+
+        Con mmap=True uno shard singolo viene mappato in memoria invece che
+        copiato: i kernel float32 restano viste sul file.
+        """
+        with open(model_json_path) as f:
+            spec = json.load(f)
+        topology = spec['modelTopology']
+        config = topology.get('model_config', topology)['config']
+        layer_configs = config['layers'] if isinstance(config, dict) else config
+
+        # I file .bin del manifest sono la concatenazione dei tensori, in ordine
+        base_dir = os.path.dirname(os.path.abspath(model_json_path))
+        tensors = {}
+        for group in spec['weightsManifest']:
+            if mmap and len(group['paths']) == 1:
+                buffer = np.memmap(os.path.join(base_dir, group['paths'][0]), dtype=np.uint8, mode='r')
+            else:
+                buffer = b''.join(_read_bytes(os.path.join(base_dir, p)) for p in group['paths'])
+            offset = 0
+            for entry in group['weights']:
+                if entry.get('dtype', 'float32') != 'float32':
+                    raise ValueError(f"dtype non supportato per {entry['name']}: {entry['dtype']}")
+                count = int(np.prod(entry['shape'], dtype=np.int64))
+                quantization = entry.get('quantization')
+                if quantization:
+                    # Quantizzazione affine di TF.js: valore = q * scale + min
+                    q_dtype = np.dtype(quantization['dtype']).newbyteorder('<')
+                    q = np.frombuffer(buffer, dtype=q_dtype, count=count, offset=offset)
+                    value = q.astype(np.float32) * quantization['scale'] + quantization['min']
+                    offset += count * q_dtype.itemsize
+                else:
+                    value = np.frombuffer(buffer, dtype='<f4', count=count, offset=offset)
+                    offset += count * 4
+                tensors[entry['name']] = value.reshape(entry['shape'])
+
+        layers = []
+        for layer in layer_configs:
+            if layer['class_name'] != 'Dense':
+                continue
+            name = layer['config']['name']
+            kernel = _find_tensor(tensors, name, 'kernel')
+            if layer['config'].get('use_bias', True):
+                bias = _find_tensor(tensors, name, 'bias')
+            else:
+                bias = np.zeros(kernel.shape[1], dtype=np.float32)
+            layers.append((kernel, bias, layer['config'].get('activation', 'linear')))
+        return cls(layers)
+
+    @classmethod
+    def from_csv(cls, weights_hidden=WEIGHTS_HIDDEN_PATH, biases_hidden=BIASES_HIDDEN_PATH,
+                 weights_output=WEIGHTS_OUTPUT_PATH, biases_output=BIASES_OUTPUT_PATH):
+        """Carica la rete 4-5-3 dai CSV letti anche da index.html."""
+        load = lambda path: np.loadtxt(path, delimiter=',', ndmin=2)
+        return cls([
+            (load(weights_hidden), load(biases_hidden), 'relu'),
+            (load(weights_output), load(biases_output), 'softmax'),
+        ])
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copia i pesi da un modello Keras Sequential composto da layer Dense."""
+        layers = []
+        for layer in model.layers:
+            weights = layer.get_weights()
+            if not weights:
+                continue
+            kernel = weights[0]
+            bias = weights[1] if len(weights) > 1 else np.zeros(kernel.shape[1])
+            layers.append((kernel, bias, layer.get_config().get('activation', 'linear')))
+        return cls(layers)
+
+    @classmethod
+    def from_npz(cls, path):
+        """Carica una rete salvata con save_npz."""
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data['activations']]
+            if 'kernel_q' in data:
+                return cls(_unpack_int8(data['shapes'], data['kernel_q'], data['params'], activations))
+            return cls([(data[f'kernel_{i}'], data[f'bias_{i}'], activation)
+                        for i, activation in enumerate(activations)])
+
+    def save_npz(self, path, quantize=None, **metadata):
+        """Salva pesi e attivazioni in un unico file .npz (più eventuali metadati).
+
+        Con quantize='int8' i kernel sono salvati in int8 simmetrico con una
+        scala float32 per neurone di uscita; i bias restano in float32. Tutti i
+        kernel stanno in un solo array int8 e scale e bias in uno float32,
+        compressi: con reti piccole l'intestazione di ogni array nel .npz pesa
+        più dei pesi stessi.
+        """
+        if quantize not in (None, 'int8'):
+            raise ValueError(f"Quantizzazione non supportata: {quantize}")
+        arrays = {'activations': np.array([a for _, _, a in self.layers])}
+        if quantize == 'int8':
+            arrays['shapes'], arrays['kernel_q'], arrays['params'] = _pack_int8(self.layers)
+        else:
+            for i, (kernel, bias, _) in enumerate(self.layers):
+                arrays[f'kernel_{i}'] = kernel.astype(np.float32)
+                arrays[f'bias_{i}'] = bias.astype(np.float32)
+        for key, value in metadata.items():
+            arrays[f'meta_{key}'] = np.asarray(value)
+        with open(path, 'wb') as f:
+            (np.savez_compressed if quantize else np.savez)(f, **arrays)
+
+    def save_csv(self, weights_hidden=WEIGHTS_HIDDEN_PATH, biases_hidden=BIASES_HIDDEN_PATH,
+                 weights_output=WEIGHTS_OUTPUT_PATH, biases_output=BIASES_OUTPUT_PATH):
+        """Scrive i CSV letti da index.html (solo reti a due layer, come 4-5-3)."""
+        if len(self.layers) != 2:
+            raise ValueError("Il formato CSV del sito prevede esattamente due layer Dense")
+        (w_hidden, b_hidden, _), (w_output, b_output, _) = self.layers
+        for path, array in ((weights_hidden, w_hidden), (biases_hidden, b_hidden[:, None]),
+                            (weights_output, w_output), (biases_output, b_output[:, None])):
+            np.savetxt(path, array, delimiter=',', fmt='%.8g')
+
+    def save_tfjs(self, model_json_path=MODEL_JSON_PATH, quantize=None):
+        """Scrive un modello TF.js 'layers-model' (model.json + group1-shard1of1.bin).
+
+        Con quantize='uint8' i pesi usano la quantizzazione affine nativa di TF.js.
+        """
+        if quantize not in (None, 'uint8'):
+            raise ValueError(f"Quantizzazione non supportata: {quantize}")
+        base_dir = os.path.dirname(os.path.abspath(model_json_path))
+        shard_name = 'group1-shard1of1.bin'
+        layer_configs = [{'class_name': 'InputLayer',
+                          'config': {'batch_shape': [None, self.input_size], 'dtype': 'float32',
+                                     'sparse': False, 'ragged': False, 'name': 'input_layer'}}]
+        entries, chunks = [], []
+        for i, (kernel, bias, activation) in enumerate(self.layers):
+            name = f'dense_{i}'
+            layer_configs.append({'class_name': 'Dense',
+                                  'config': {'name': name, 'trainable': True, 'dtype': 'float32',
+                                             'units': int(kernel.shape[1]), 'activation': activation,
+                                             'use_bias': True}})
+            for kind, tensor in (('kernel', kernel), ('bias', bias)):
+                entry = {'name': f'sequential/{name}/{kind}', 'shape': list(tensor.shape),
+                         'dtype': 'float32'}
+                if quantize == 'uint8':
+                    t_min, t_max = float(tensor.min()), float(tensor.max())
+                    scale = (t_max - t_min) / 255 or 1.0
+                    q = np.round((tensor - t_min) / scale).astype(np.uint8)
+                    entry['quantization'] = {'dtype': 'uint8', 'scale': scale, 'min': t_min}
+                    chunks.append(q.tobytes())
+                else:
+                    chunks.append(tensor.astype('<f4').tobytes())
+                entries.append(entry)
+        spec = {
+            'format': 'layers-model',
+            'generatedBy': 'engine.py',
+            'convertedBy': None,
+            'modelTopology': {'class_name': 'Sequential',
+                              'model_config': {'class_name': 'Sequential',
+                                               'config': {'name': 'sequential', 'layers': layer_configs}}},
+            'weightsManifest': [{'paths': [shard_name], 'weights': entries}],
+        }
+        # Scrittura atomica: chi ha lo shard mappato in memoria continua a leggere il file vecchio
+        _write_atomic(os.path.join(base_dir, shard_name), b''.join(chunks))
+        _write_atomic(model_json_path, json.dumps(spec).encode())
+
+    def fold_scaler(self, scaler):
+        """Incorpora uno scaler affine nel primo layer Dense.
+
+        (x * a + c) @ W + b = x @ (a[:, None] * W) + (c @ W + b), quindi la rete
+        risultante accetta direttamente le percentuali x1..x4 non scalate.
+        """
+        if not isinstance(scaler, AffineScaler):
+            scaler = AffineScaler.from_scaler(scaler, self.input_size)
+        kernel, bias, activation = self.layers[0]
+        kernel64 = kernel.astype(np.float64)
+        folded = (scaler.scale[:, None] * kernel64, scaler.offset @ kernel64 + bias, activation)
+        return DenseNetwork([folded] + self.layers[1:], dtype=self.dtype)
+
+    # --- Inferenza ---
+
+    def forward(self, X, return_activations=False):
+        """Forward pass su un batch (N, input_size). Restituisce le probabilità."""
+        A = np.asarray(X, dtype=self.dtype)
+        if A.ndim == 1:
+            A = A.reshape(1, -1)
+        activations = [A] if return_activations else None
+        for kernel, bias, activation in self.layers:
+            A = ACTIVATIONS[activation](A @ kernel + bias)
+            if return_activations:
+                activations.append(A)
+        return activations if return_activations else A
+
+    def predict(self, X, verbose=0, batch_size=None):
+        """Compatibile con model.predict di Keras, così classify_input non cambia."""
+        return self.forward(X)
+
+    def __call__(self, X):
+        return self.forward(X)
+
+
+def quantize_int8(kernel):
+    """Quantizzazione simmetrica int8 per colonna: kernel ≈ q * scale."""
+    kernel = np.asarray(kernel, dtype=np.float32)
+    scale = np.abs(kernel).max(axis=0) / 127.0
+    scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+    q = np.clip(np.round(kernel / scale), -127, 127).astype(np.int8)
+    return q, scale
+
+def _pack_int8(layers):
+    """(forme dei kernel, kernel int8 concatenati, scale e bias float32 concatenati per layer)."""
+    shapes, kernels, params = [], [], []
+    for kernel, bias, _ in layers:
+        q, scale = quantize_int8(kernel)
+        shapes.append(q.shape)
+        kernels.append(q.ravel())
+        params += [scale, np.asarray(bias, dtype=np.float32)]
+    return np.array(shapes, dtype=np.int32), np.concatenate(kernels), np.concatenate(params)
+
+def _unpack_int8(shapes, kernel_q, params, activations):
+    """Layer (kernel, bias, attivazione) da _pack_int8, dequantizzati una volta al caricamento."""
+    layers, k_offset, p_offset = [], 0, 0
+    for (rows, cols), activation in zip(shapes, activations):
+        q = kernel_q[k_offset:k_offset + rows * cols].reshape(rows, cols)
+        scale, bias = params[p_offset:p_offset + cols], params[p_offset + cols:p_offset + 2 * cols]
+        layers.append((q.astype(np.float32) * scale, bias, activation))
+        k_offset += rows * cols
+        p_offset += 2 * cols
+    return layers
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _write_atomic(path, data):
+    """Scrive in un file temporaneo e lo rinomina: il file non è mai visibile a metà."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _find_tensor(tensors, layer_name, kind):
+    for name, value in tensors.items():
+        parts = name.split('/')
+        if parts[-1] == kind and layer_name in parts:
+            return value
+    raise KeyError(f"Tensore '{kind}' non trovato per il layer '{layer_name}'")
+
+
+# --- Artefatto compilato (modello + scaler in un unico .npz) ---
+
+def source_fingerprint(paths):
+    """Impronta SHA-256 del contenuto dei file sorgente (nome e byte di ciascuno)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def compile_artifact(network, scaler, artifact_path, source_paths):
+    """Salva la rete con lo scaler incorporato, etichettata con l'impronta dei sorgenti.
+
+    Anche i parametri dello scaler restano nell'artefatto (vedi FoldedScaler).
+    """
+    if not isinstance(scaler, AffineScaler):
+        scaler = AffineScaler.from_scaler(scaler, network.input_size)
+    folded = network.fold_scaler(scaler)
+    folded.save_npz(artifact_path, source_key=source_fingerprint(source_paths),
+                    scaler_scale=scaler.scale, scaler_offset=scaler.offset)
+    return folded
+
+def load_artifact(artifact_path, source_paths):
+    """(rete, FoldedScaler) se l'artefatto esiste ed è aggiornato rispetto ai sorgenti, altrimenti None."""
+    if not os.path.exists(artifact_path):
+        return None
+    try:
+        with np.load(artifact_path, allow_pickle=False) as data:
+            cached_key = str(data['meta_source_key'])
+            # Gli artefatti senza lo scaler vengono ricompilati
+            scaler = AffineScaler(data['meta_scaler_scale'], data['meta_scaler_offset'])
+        if cached_key != source_fingerprint(source_paths):
+            return None
+        return DenseNetwork.from_npz(artifact_path), FoldedScaler(scaler)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+# --- Verifica di parità con Keras ---
+
+def check_parity(keras_model, network, X):
+    """Confronta le probabilità di Keras e del motore NumPy sugli stessi input.
+
+    Restituisce (massima differenza assoluta, numero di argmax discordanti).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    expected = keras_model.predict(X, verbose=0)
+    actual = network.forward(X)
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    mismatches = int(np.sum(np.argmax(expected, axis=1) != np.argmax(actual, axis=1)))
+    return max_abs_diff, mismatches
+
+def measure_latency(network, x, repeats=10000):
+    """Latenza media (in microsecondi) di una singola previsione."""
+    x = np.asarray(x, dtype=network.dtype).reshape(1, -1)
+    network.forward(x)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        network.forward(x)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+def _parity_inputs(network, dataset_path='dataset.csv', n_random=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [rng.uniform(-3, 3, size=(n_random, network.input_size))]
+    if os.path.exists(dataset_path):
+        data = np.loadtxt(dataset_path, delimiter=',', skiprows=1, ndmin=2)
+        rows.append(data[:, :network.input_size] / 100.0)
+    return np.vstack(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Motore NumPy: parità con Keras e latenza.")
+    parser.add_argument('--source', choices=['tfjs', 'csv'], default='tfjs',
+                        help="Origine dei pesi del motore NumPy")
+    parser.add_argument('--model-json', default=MODEL_JSON_PATH)
+    parser.add_argument('--keras-model', default=None,
+                        help="Modello Keras (.h5/.keras) con cui verificare la parità")
+    args = parser.parse_args()
+
+    network = (DenseNetwork.from_tfjs(args.model_json) if args.source == 'tfjs'
+               else DenseNetwork.from_csv())
+    print(f"Rete caricata ({args.source}): {'-'.join(map(str, network.layer_sizes))}")
+    X = _parity_inputs(network)
+    print(f"Latenza singola previsione: {measure_latency(network, X[0]):.1f} µs")
+
+    if args.keras_model:
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+        from tensorflow.keras.models import load_model
+        keras_model = load_model(args.keras_model)
+        # Stessi pesi di Keras: verifica la matematica del forward pass
+        diff, mismatches = check_parity(keras_model, DenseNetwork.from_keras(keras_model), X)
+        print(f"Keras vs NumPy (pesi Keras): diff max {diff:.2e}, argmax discordanti {mismatches}")
+        # Pesi dal file scelto: verifica che il file corrisponda al modello Keras
+        diff, mismatches = check_parity(keras_model, network, X)
+        print(f"Keras vs NumPy ({args.source}): diff max {diff:.2e}, argmax discordanti {mismatches}")
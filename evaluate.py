@@ -0,0 +1,199 @@
+"""
+Valutazione: cross-validation stratificata e confronto tra i percorsi di inferenza.
+
+1. Cross-validation k-fold stratificata su dataset.csv: ogni fold (scaler +
+   addestramento con train.py + previsione) gira in un processo separato.
+   Si riportano accuratezza per fold, precision/recall per classe e matrice
+   di confusione (righe = etichetta reale, colonne = prevista).
+2. Le stesse righe di validazione passano per ogni percorso di inferenza
+   disponibile (Keras tramite classify_input, motore NumPy su model.json e
+   sui CSV, forward di calculations.py): si riportano le previsioni discordanti
+   rispetto al riferimento e il throughput di ciascun percorso.
+
+L'output è JSON, da conservare per seguire l'andamento nel tempo.
+
+Uso:
+    python evaluate.py --folds 5 --output evaluation.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import DenseNetwork
+from export import DATASET_PATH, load_dataset
+from train import (DEFAULT_BATCH_SIZE, DEFAULT_EPOCHS, fit_standard_scaler, labels_to_indices,
+                   stratified_split, train_network)
+
+DEFAULT_FOLDS = 5
+THROUGHPUT_SINGLE_ROWS = 500 # Righe classificate una alla volta per misurare la latenza per chiamata
+
+
+def stratified_folds(y, k, seed=0):
+    """Assegna ogni riga a uno dei k fold mantenendo le proporzioni delle classi."""
+    rng = np.random.default_rng(seed)
+    fold_of = np.empty(len(y), dtype=int)
+    for cls in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == cls))
+        fold_of[idx] = np.arange(len(idx)) % k
+    return fold_of
+
+def _run_fold(args):
+    """Eseguita in un processo del pool: addestra sul resto e prevede il fold."""
+    features, y, test_mask, n_classes, hidden_size, learning_rate, epochs, batch_size, seed = args
+    scaler = fit_standard_scaler(features[~test_mask])
+    network, _ = train_network(scaler.transform(features[~test_mask]), y[~test_mask], n_classes,
+                               hidden_size, learning_rate, epochs, batch_size, seed)
+    return np.argmax(network.forward(scaler.transform(features[test_mask])), axis=1)
+
+def classification_report(y_true, y_pred, n_classes):
+    """Matrice di confusione e precision/recall/F1 per classe (etichette 1..n_classes)."""
+    confusion = np.zeros((n_classes, n_classes), dtype=int)
+    np.add.at(confusion, (y_true, y_pred), 1)
+    per_class = {}
+    for c in range(n_classes):
+        tp = confusion[c, c]
+        predicted, actual = confusion[:, c].sum(), confusion[c, :].sum()
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_class[str(c + 1)] = {'precision': round(float(precision), 4), 'recall': round(float(recall), 4),
+                                 'f1': round(float(f1), 4), 'support': int(actual)}
+    return {'accuracy': round(float(np.mean(y_true == y_pred)), 4),
+            'per_class': per_class, 'confusion_matrix': confusion.tolist()}
+
+def cross_validate(features, labels, k=DEFAULT_FOLDS, hidden_size=5, learning_rate=0.01,
+                   epochs=DEFAULT_EPOCHS, batch_size=DEFAULT_BATCH_SIZE, seed=0, workers=None):
+    y, n_classes = labels_to_indices(labels)
+    fold_of = stratified_folds(y, k, seed)
+    jobs = [(features, y, fold_of == fold, n_classes, hidden_size, learning_rate, epochs, batch_size, seed)
+            for fold in range(k)]
+    predictions = np.empty(len(y), dtype=int)
+    fold_accuracy = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for fold, predicted in enumerate(pool.map(_run_fold, jobs)):
+            mask = fold_of == fold
+            predictions[mask] = predicted
+            fold_accuracy.append(round(float(np.mean(predicted == y[mask])), 4))
+    report = classification_report(y, predictions, n_classes)
+    report.update({'folds': k, 'fold_accuracy': fold_accuracy,
+                   'fold_accuracy_std': round(float(np.std(fold_accuracy)), 4),
+                   'hyperparameters': {'hidden_size': hidden_size, 'learning_rate': learning_rate,
+                                       'epochs': epochs, 'batch_size': batch_size, 'seed': seed}})
+    return report
+
+
+# --- Confronto dei percorsi di inferenza ---
+
+def inference_paths(scaler, keras_model_path):
+    """Percorsi disponibili: nome -> (classifica una riga, classifica un batch o None), più i saltati."""
+    from main import classify_batch, classify_input
+    import calculations
+
+    paths, skipped = {}, {}
+
+    def engine_path(network):
+        single = lambda row: classify_input(network, scaler, row)
+        batch = lambda rows: classify_batch(network, scaler, rows)
+        return single, batch
+
+    if keras_model_path and os.path.exists(keras_model_path):
+        try:
+            os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+            from tensorflow.keras.models import load_model
+            keras_model = load_model(keras_model_path)
+            paths['keras'] = engine_path(keras_model)
+        except Exception as e:
+            skipped['keras'] = str(e)
+    else:
+        skipped['keras'] = f"modello '{keras_model_path}' non trovato"
+    for name, loader in (('numpy_tfjs', DenseNetwork.from_tfjs), ('numpy_csv', DenseNetwork.from_csv)):
+        try:
+            paths[name] = engine_path(loader())
+        except Exception as e:
+            skipped[name] = str(e)
+
+    def calculations_single(row):
+        probabilities = calculations.forward(scaler.transform(np.asarray(row, dtype=float).reshape(1, -1))[0])
+        index = int(np.argmax(probabilities))
+        return index + 1, float(probabilities[index])
+    paths['calculations'] = (calculations_single, None)
+    return paths, skipped
+
+def compare_paths(features, scaler, keras_model_path, row_ids=None):
+    """Previsioni di ogni percorso sulle stesse righe; row_ids = indici delle righe nel dataset."""
+    row_ids = np.arange(len(features)) if row_ids is None else np.asarray(row_ids)
+    paths, skipped = inference_paths(scaler, keras_model_path)
+    predictions, throughput = {}, {}
+    n_single = min(len(features), THROUGHPUT_SINGLE_ROWS)
+    for name, (single, batch) in paths.items():
+        start = time.perf_counter()
+        for row in features[:n_single]:
+            single(row)
+        single_rate = n_single / (time.perf_counter() - start)
+        if batch is not None:
+            start = time.perf_counter()
+            labels, _ = batch(features)
+            batch_rate = len(features) / (time.perf_counter() - start)
+            predictions[name] = np.asarray(labels, dtype=int)
+        else:
+            batch_rate = None
+            predictions[name] = np.array([int(single(row)[0]) for row in features])
+        throughput[name] = {'single_rows_per_s': round(single_rate, 1),
+                            'batch_rows_per_s': round(batch_rate, 1) if batch_rate else None}
+
+    reference = 'keras' if 'keras' in predictions else next(iter(predictions))
+    disagreements = {}
+    for name, labels in predictions.items():
+        if name == reference:
+            continue
+        rows = np.flatnonzero(labels != predictions[reference])
+        disagreements[name] = {'count': int(len(rows)), 'rate': round(len(rows) / len(labels), 4),
+                               'rows': row_ids[rows][:50].tolist()}
+    return {'reference': reference, 'rows': int(len(features)), 'throughput': throughput,
+            'disagreements': disagreements, 'skipped': skipped}
+
+
+if __name__ == "__main__":
+    from main import MODEL_PATH, SCALER_PATH, load_scaler
+
+    parser = argparse.ArgumentParser(description="Cross-validation stratificata e confronto dei backend (JSON).")
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--hidden', type=int, default=5)
+    parser.add_argument('--lr', type=float, default=0.01)
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help="Frazione di righe (stratificata) usata per il confronto dei backend")
+    parser.add_argument('--keras-model', default=MODEL_PATH)
+    parser.add_argument('--scaler', default=SCALER_PATH, help="Scaler dei modelli già addestrati (.pkl o .json)")
+    parser.add_argument('--output', default=None, help="File JSON di uscita (predefinito: stdout)")
+    args = parser.parse_args()
+
+    features, labels = load_dataset(args.dataset)
+    result = {'dataset': args.dataset, 'rows': int(len(features)), 'timestamp': time.time()}
+    start = time.perf_counter()
+    result['cross_validation'] = cross_validate(features, labels, args.folds, args.hidden, args.lr,
+                                                args.epochs, seed=args.seed, workers=args.workers)
+    result['cross_validation']['seconds'] = round(time.perf_counter() - start, 3)
+
+    try:
+        scaler = load_scaler(args.scaler)
+    except Exception as e:
+        result['backends'] = {'skipped': {'all': f"scaler non disponibile: {e}"}}
+    else:
+        _, holdout = stratified_split(labels_to_indices(labels)[0], args.holdout, args.seed)
+        holdout = np.sort(holdout)
+        result['backends'] = compare_paths(features[holdout], scaler, args.keras_model, holdout)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
@@ -0,0 +1,122 @@
+"""
+Esportazione del modello con lo scaler incorporato nel primo layer Dense.
+
+Lo scaler (scaler.pkl oppure scaler.json nei formati di index.html) è affine
+come il primo layer, quindi si può fondere nei suoi pesi: l'app e il sito non
+devono più normalizzare l'input prima della rete. Vengono scritte una variante
+float32 e una ridotta (int8 per l'app, uint8 TF.js per il sito), e si misura
+su dataset.csv quanto cambia l'accuratezza rispetto al percorso originale.
+
+Uso:
+    python export.py --backend numpy --scaler scaler.pkl --out-dir export
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from colstore import is_store, load_features
+from engine import AffineScaler, DenseNetwork
+from main import BACKENDS, DEFAULT_BACKEND, SCALER_PATH, load_model_backend, load_scaler
+
+DATASET_PATH = 'dataset.csv'
+
+
+def load_dataset(path=DATASET_PATH):
+    """Legge dataset.csv (x1..xN,label), o un archivio di colstore.py, e restituisce (feature, etichette)."""
+    if is_store(path):
+        return load_features(path)
+    with open(path) as f:
+        header = f.readline().strip().split(',')
+    data = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    label_column = header.index('label')
+    features = np.delete(data, label_column, axis=1)
+    return features, data[:, label_column].astype(int)
+
+def evaluate_variant(reference_probs, probs, labels):
+    """Accuratezza sul dataset e scostamento dalle probabilità di riferimento."""
+    predicted = np.argmax(probs, axis=1) + 1
+    return {
+        'accuracy': float(np.mean(predicted == labels)),
+        'agreement_with_reference': float(np.mean(predicted == np.argmax(reference_probs, axis=1) + 1)),
+        'max_abs_prob_diff': float(np.max(np.abs(probs - reference_probs))),
+    }
+
+def export(network, scaler, out_dir, dataset_path=DATASET_PATH):
+    """Scrive le varianti fuse e restituisce il report con le differenze di accuratezza."""
+    web_dir = os.path.join(out_dir, 'web')
+    web_uint8_dir = os.path.join(out_dir, 'web_uint8')
+    for directory in (out_dir, web_dir, web_uint8_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    folded = network.fold_scaler(scaler)
+    float32_path = os.path.join(out_dir, 'model_float32.npz')
+    int8_path = os.path.join(out_dir, 'model_int8.npz')
+    folded.save_npz(float32_path)
+    folded.save_npz(int8_path, quantize='int8')
+
+    # Sito: lo scaler è già nei pesi, quindi scaler.json è l'identità (evita il fallback x/100)
+    identity = AffineScaler.identity(folded.input_size).to_json()
+    for directory, quantize in ((web_dir, None), (web_uint8_dir, 'uint8')):
+        folded.save_tfjs(os.path.join(directory, 'model.json'), quantize=quantize)
+        with open(os.path.join(directory, 'scaler.json'), 'w') as f:
+            json.dump(identity, f)
+    if len(folded.layers) == 2:
+        folded.save_csv(*(os.path.join(web_dir, name) for name in (
+            'weights_hidden.csv', 'biases_hidden.csv', 'weights_output.csv', 'biases_output.csv')))
+
+    features, labels = load_dataset(dataset_path)
+    reference = np.asarray(network.predict(scaler.transform(features), verbose=0))
+    variants = {
+        'float32_folded': DenseNetwork.from_npz(float32_path),
+        'int8_folded': DenseNetwork.from_npz(int8_path),
+        'tfjs_uint8_folded': DenseNetwork.from_tfjs(os.path.join(web_uint8_dir, 'model.json')),
+    }
+    reference_metrics = evaluate_variant(reference, reference, labels)
+    report = {'reference': reference_metrics, 'variants': {}}
+    for name, variant in variants.items():
+        metrics = evaluate_variant(reference, variant.forward(features), labels)
+        metrics['accuracy_delta'] = metrics['accuracy'] - reference_metrics['accuracy']
+        report['variants'][name] = metrics
+    report['sizes_bytes'] = {
+        'model_float32.npz': os.path.getsize(float32_path),
+        'model_int8.npz': os.path.getsize(int8_path),
+        'web/group1-shard1of1.bin': os.path.getsize(os.path.join(web_dir, 'group1-shard1of1.bin')),
+        'web_uint8/group1-shard1of1.bin': os.path.getsize(os.path.join(web_uint8_dir, 'group1-shard1of1.bin')),
+    }
+    report['int8_size_ratio'] = round(report['sizes_bytes']['model_int8.npz']
+                                      / report['sizes_bytes']['model_float32.npz'], 3)
+    # Byte dei soli pesi, senza l'intestazione dei contenitori .npz/.json
+    report['weight_payload_bytes'] = {
+        'float32': sum(k.size * 4 + b.size * 4 for k, b, _ in folded.layers),
+        'int8': sum(k.size + k.shape[1] * 4 + b.size * 4 for k, b, _ in folded.layers),
+    }
+    with open(os.path.join(out_dir, 'export_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fonde lo scaler nel primo layer ed esporta varianti float32/int8.")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Da dove leggere la rete da esportare")
+    parser.add_argument('--scaler', default=SCALER_PATH, help="scaler.pkl oppure scaler.json")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="CSV su cui misurare l'accuratezza")
+    parser.add_argument('--out-dir', default='export')
+    args = parser.parse_args()
+
+    model = load_model_backend(args.backend)
+    network = model if isinstance(model, DenseNetwork) else DenseNetwork.from_keras(model)
+    report = export(network, load_scaler(args.scaler), args.out_dir, args.dataset)
+
+    print(f"Riferimento (scaler + rete): accuratezza {report['reference']['accuracy'] * 100:.2f}%")
+    for name, metrics in report['variants'].items():
+        print(f"{name:>18}: accuratezza {metrics['accuracy'] * 100:.2f}% "
+              f"(delta {metrics['accuracy_delta'] * 100:+.2f} pp), "
+              f"concordanza {metrics['agreement_with_reference'] * 100:.2f}%, "
+              f"diff max prob {metrics['max_abs_prob_diff']:.2e}")
+    for name, size in list(report['sizes_bytes'].items()) + [
+            (f'pesi {kind}', size) for kind, size in report['weight_payload_bytes'].items()]:
+        print(f"{name:>32}: {size} byte")
+    print(f"{'int8 / float32 (.npz)':>32}: {report['int8_size_ratio']:.3f}")
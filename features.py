@@ -0,0 +1,77 @@
+"""
+Estrazione delle feature a griglia tramite immagine integrale (summed-area table).
+
+Ogni feature è la percentuale di pixel neri (valore 1) in una cella di una
+griglia rows x cols sul canvas, arrotondata a due decimali come in
+update_pixel_counts. Con rows = cols = 2 si ottengono esattamente x1..x4
+(TL, TR, BL, BR). Costruita l'immagine integrale, la somma di ogni cella
+richiede quattro letture, qualunque sia la risoluzione della griglia.
+"""
+import numpy as np
+
+CANVAS_SIZE = 200 # Il canvas è 200x200 pixel
+QUADRANT_SIZE = CANVAS_SIZE // 2 # Ogni quadrante è 100x100 pixel
+MAX_PIXELS_PER_QUADRANT = QUADRANT_SIZE * QUADRANT_SIZE # 10000
+DEFAULT_GRID_SIZE = 2
+DEFAULT_CLASSES = ('a', 'b', 'c') # Nomi delle etichette 1..K (app, sito, ingest, colstore)
+
+
+def cell_edges(size, n):
+    """Bordi interi delle n celle lungo un lato di 'size' pixel (celle di ±1 pixel se non divisibile)."""
+    return (np.arange(n + 1) * size) // n
+
+def feature_names(rows, cols=None):
+    """Nomi delle colonne nel formato di dataset.csv: x1..x{rows*cols}, riga per riga."""
+    cols = rows if cols is None else cols
+    return [f'x{i + 1}' for i in range(rows * cols)]
+
+
+class IntegralImage:
+    """Immagine integrale di un buffer binario: table[r, c] = pixel neri in [0:r, 0:c]."""
+
+    def __init__(self, pixels):
+        self.height, self.width = pixels.shape
+        self.table = np.zeros((self.height + 1, self.width + 1), dtype=np.int32)
+        self.refresh(pixels)
+
+    def refresh(self, pixels):
+        """Ricalcola la tabella (due cumsum vettorizzate) dopo che il buffer è cambiato."""
+        np.cumsum(pixels != 0, axis=0, dtype=np.int32, out=self.table[1:, 1:])
+        np.cumsum(self.table[1:, 1:], axis=1, out=self.table[1:, 1:])
+
+    def box_sum(self, top, left, bottom, right):
+        """Pixel neri nel rettangolo [top:bottom, left:right], in O(1)."""
+        t = self.table
+        return int(t[bottom, right] - t[top, right] - t[bottom, left] + t[top, left])
+
+    def grid_counts(self, rows, cols=None):
+        """Pixel neri per cella di una griglia rows x cols, come array (rows, cols)."""
+        cols = rows if cols is None else cols
+        r = cell_edges(self.height, rows)
+        c = cell_edges(self.width, cols)
+        corners = self.table[np.ix_(r, c)]
+        return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+    def grid_features(self, rows, cols=None):
+        """Percentuali (0-100, due decimali) di pixel neri per cella, riga per riga."""
+        cols = rows if cols is None else cols
+        areas = np.outer(np.diff(cell_edges(self.height, rows)), np.diff(cell_edges(self.width, cols)))
+        percent = self.grid_counts(rows, cols) / areas * 100
+        return [round(float(v), 2) for v in percent.ravel()]
+
+
+def region_cell_counts(mask, top, left, row_edges, col_edges):
+    """Pixel veri di mask (riquadro in top, left del canvas) per cella della griglia, come array (rows, cols).
+
+    Costa quanto il riquadro (es. il pennello), non quanto il canvas: serve ad
+    aggiornare i conteggi per cella a ogni evento di disegno.
+    """
+    height, width = mask.shape
+    r = np.clip(np.asarray(row_edges) - top, 0, height)
+    c = np.clip(np.asarray(col_edges) - left, 0, width)
+    corners = IntegralImage(mask).table[np.ix_(r, c)]
+    return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+def grid_features(pixels, rows=DEFAULT_GRID_SIZE, cols=None):
+    """Feature a griglia di un buffer binario (costruisce l'immagine integrale al volo)."""
+    return IntegralImage(pixels).grid_features(rows, cols)
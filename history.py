@@ -0,0 +1,112 @@
+"""
+Storico annulla/ripeti del canvas a livello di tratto.
+
+Ogni tratto (o cancellazione) è salvato come delta: il riquadro sporco e i bit
+dei pixel che hanno cambiato stato, impacchettati con np.packbits. Applicare un
+delta è uno XOR sul riquadro, quindi la stessa operazione annulla e ripete, in
+tempo proporzionale alla dimensione del tratto. Lo storico ha un budget in
+byte: superato il limite, i delta più vecchi vengono scartati.
+"""
+from collections import deque
+
+import numpy as np
+
+HISTORY_MAX_BYTES = 256 * 1024 # Budget dei delta conservati (annulla + ripeti)
+
+
+class StrokeDelta:
+    """Pixel cambiati da un tratto: riquadro (top, left, height, width) e bit impacchettati."""
+
+    __slots__ = ('id', 'top', 'left', 'height', 'width', 'bits')
+
+    def __init__(self, stroke_id, top, left, mask):
+        self.id = stroke_id
+        self.top, self.left = top, left
+        self.height, self.width = mask.shape
+        self.bits = np.packbits(mask, axis=None)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def mask(self):
+        bits = np.unpackbits(self.bits, count=self.height * self.width)
+        return bits.reshape(self.height, self.width).view(bool)
+
+    def apply(self, pixels):
+        """Inverte i pixel del delta (annulla o ripete). Restituisce (top, left, maschera)."""
+        mask = self.mask()
+        region = pixels[self.top:self.top + self.height, self.left:self.left + self.width]
+        region ^= mask.view(np.uint8)
+        return self.top, self.left, mask
+
+
+class StrokeHistory:
+    def __init__(self, max_bytes=HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0
+        self.next_id = 0
+        self._segments = None   # (top, left, changed) del tratto in corso
+
+    @property
+    def recording(self):
+        return self._segments is not None
+
+    def begin(self):
+        """Inizio di un tratto: i segmenti successivi formano un unico delta."""
+        self._segments = []
+
+    def add(self, top, left, changed):
+        """Pixel cambiati da un segmento del tratto in corso (ignorati fuori da un tratto)."""
+        if self._segments is not None:
+            self._segments.append((top, left, changed))
+
+    def commit(self):
+        """Chiude il tratto. Restituisce i delta di 'ripeti' scartati dal nuovo tratto."""
+        segments, self._segments = self._segments, None
+        if not segments:
+            return []
+        top = min(t for t, _, _ in segments)
+        left = min(l for _, l, _ in segments)
+        bottom = max(t + c.shape[0] for t, _, c in segments)
+        right = max(l + c.shape[1] for _, l, c in segments)
+        mask = np.zeros((bottom - top, right - left), dtype=bool)
+        for t, l, changed in segments:
+            # XOR: un pixel disegnato e poi cancellato nello stesso tratto non cambia
+            mask[t - top:t - top + changed.shape[0], l - left:l - left + changed.shape[1]] ^= changed
+        return self.push(top, left, mask)
+
+    def push(self, top, left, mask):
+        """Aggiunge un delta già calcolato (es. cancellazione del canvas)."""
+        if not mask.any():
+            return []
+        delta = StrokeDelta(self.next_id, top, left, mask)
+        self.next_id += 1
+        discarded = self.redo_stack
+        self.redo_stack = []
+        self.nbytes -= sum(d.nbytes for d in discarded)
+        self.undo_stack.append(delta)
+        self.nbytes += delta.nbytes
+        while self.nbytes > self.max_bytes and len(self.undo_stack) > 1:
+            self.nbytes -= self.undo_stack.popleft().nbytes
+        return discarded
+
+    def undo(self):
+        """Delta da applicare per annullare l'ultimo tratto, o None."""
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self.redo_stack.append(delta)
+        return delta
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        self.undo_stack.append(delta)
+        return delta
+
+    def stats(self):
+        return {'undo': len(self.undo_stack), 'redo': len(self.redo_stack), 'bytes': self.nbytes}
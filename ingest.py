@@ -0,0 +1,181 @@
+"""
+Estrazione delle feature da cartelle di immagini (lettere scansionate) in righe di dataset.csv.
+
+Ogni immagine viene letta in scala di grigi (le trasparenze diventano carta
+bianca) e binarizzata: un pixel è nero se più scuro di --threshold (con
+--invert, se più chiaro). Le feature sono le stesse di update_pixel_counts
+sull'immagine riportata al riquadro CANVAS_SIZE x CANVAS_SIZE con il
+ricampionamento nearest-neighbour delle bitmap del server: percentuale di
+pixel neri per cella, arrotondata a due decimali. Il ricampionamento non viene
+materializzato: ogni pixel sorgente pesa quante righe e colonne del canvas lo
+ripetono, quindi i conteggi per cella sono due prodotti matriciali
+sull'immagine alla risoluzione originale.
+
+I file vengono elencati in streaming e distribuiti a blocchi su un pool di
+processi, con un numero limitato di blocchi in volo: la memoria non dipende
+dalla dimensione dell'archivio. I blocchi vengono scritti nell'ordine di
+lettura, con l'avanzamento su stderr.
+
+    python ingest.py scansioni/ --output nuove_righe.csv     # scansioni/a/*.png, scansioni/b/*.png, ...
+    python ingest.py lettere_c/ --label 3 --output c.csv --workers 8
+
+Senza --label l'etichetta è la cartella che contiene l'immagine: un numero
+oppure una delle --classes (predefinite a b c, cioè 1..3 come nell'app).
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from features import CANVAS_SIZE, DEFAULT_CLASSES, DEFAULT_GRID_SIZE, cell_edges, feature_names
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+DEFAULT_THRESHOLD = 128    # Livello di grigio sotto cui un pixel è inchiostro
+DEFAULT_CHUNK_SIZE = 256   # Immagini per blocco inviato a un processo
+MAX_PENDING_PER_WORKER = 2 # Blocchi in volo per processo (limita la memoria)
+
+
+def iter_images(root):
+    """Percorsi delle immagini sotto root, in ordine, senza elencare tutto l'albero in memoria."""
+    entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir():
+            yield from iter_images(entry.path)
+        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            yield entry.path
+
+def label_for(path, fixed_label=None, classes=DEFAULT_CLASSES):
+    """Etichetta di un'immagine: quella fissa, oppure dal nome della cartella (None se sconosciuta)."""
+    if fixed_label is not None:
+        return fixed_label
+    folder = os.path.basename(os.path.dirname(path))
+    if folder.isdigit():
+        return int(folder)
+    if folder in classes:
+        return classes.index(folder) + 1
+    return None
+
+def load_binary(path, threshold=DEFAULT_THRESHOLD, invert=False):
+    """Immagine come buffer binario alla risoluzione originale (True = nero)."""
+    with Image.open(path) as image:
+        # I JPEG grandi vengono decodificati già ridotti e in scala di grigi
+        image.draft('L', (CANVAS_SIZE, CANVAS_SIZE))
+        if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            paper = Image.new('RGBA', image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(paper, image)
+        pixels = np.asarray(image.convert('L'))
+    return pixels >= threshold if invert else pixels < threshold
+
+@lru_cache(maxsize=64)
+def _cell_weights(length, cells):
+    """weights[cella, i] = righe (o colonne) del canvas di quella cella ricampionate dal pixel sorgente i."""
+    source = np.arange(CANVAS_SIZE) * length // CANVAS_SIZE
+    cell_of = np.searchsorted(cell_edges(CANVAS_SIZE, cells), np.arange(CANVAS_SIZE), side='right') - 1
+    weights = np.zeros((cells, length), dtype=np.float32)
+    np.add.at(weights, (cell_of, source), 1)
+    return weights
+
+def canvas_features(binary, grid_size=DEFAULT_GRID_SIZE):
+    """Feature a griglia della bitmap riportata a CANVAS_SIZE x CANVAS_SIZE (come server.bitmap_features)."""
+    height, width = binary.shape
+    counts = _cell_weights(height, grid_size) @ binary.astype(np.float32) @ _cell_weights(width, grid_size).T
+    edges = cell_edges(CANVAS_SIZE, grid_size)
+    percent = counts / np.outer(np.diff(edges), np.diff(edges)) * 100
+    return [round(float(v), 2) for v in percent.ravel()]
+
+def _extract_chunk(args):
+    """Eseguita in un processo del pool: (righe di feature, etichette, percorsi scartati)."""
+    items, grid_size, threshold, invert = args
+    rows, labels, failed = [], [], []
+    for path, label in items:
+        try:
+            rows.append(canvas_features(load_binary(path, threshold, invert), grid_size))
+            labels.append(label)
+        except (OSError, ValueError) as e:
+            failed.append((path, str(e)))
+    return rows, labels, failed
+
+def _chunks(paths, fixed_label, classes, chunk_size, skipped):
+    chunk = []
+    for path in paths:
+        label = label_for(path, fixed_label, classes)
+        if label is None:
+            skipped.append(path)
+            continue
+        chunk.append((path, label))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ingest(root, output_path, fixed_label=None, classes=DEFAULT_CLASSES, grid_size=DEFAULT_GRID_SIZE,
+           threshold=DEFAULT_THRESHOLD, invert=False, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+           progress=True):
+    """Scrive le righe (x1..xN, label) di tutte le immagini sotto root. Restituisce le statistiche."""
+    workers = workers or os.cpu_count() or 1
+    skipped, failed = [], []
+    written = 0
+    start = time.perf_counter()
+    chunks = _chunks(iter_images(root), fixed_label, classes, chunk_size, skipped)
+    with open(output_path, 'w') as dst, ProcessPoolExecutor(max_workers=workers) as pool:
+        dst.write(','.join(feature_names(grid_size) + ['label']) + '\n')
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_extract_chunk, (chunk, grid_size, threshold, invert)))
+            if len(pending) < workers * MAX_PENDING_PER_WORKER:
+                continue
+            written += _write_chunk(dst, pending.popleft().result(), failed)
+            if progress:
+                _report(written, failed, start)
+        while pending:
+            written += _write_chunk(dst, pending.popleft().result(), failed)
+            if progress:
+                _report(written, failed, start)
+    if progress:
+        print(file=sys.stderr)
+    return {'rows': written, 'failed': failed, 'skipped': skipped, 'seconds': time.perf_counter() - start}
+
+def _write_chunk(dst, result, failed):
+    rows, labels, chunk_failed = result
+    for features, label in zip(rows, labels):
+        dst.write(','.join(f'{v:.2f}' for v in features) + f',{label}\n')
+    failed.extend(chunk_failed)
+    return len(rows)
+
+def _report(written, failed, start):
+    elapsed = time.perf_counter() - start
+    print(f"\r{written} immagini ({written / max(elapsed, 1e-9):,.0f}/s), {len(failed)} errori",
+          end='', file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Righe di dataset.csv da cartelle di immagini.")
+    parser.add_argument('root', help="Cartella delle immagini (sottocartelle = etichette)")
+    parser.add_argument('--output', default='ingested.csv')
+    parser.add_argument('--label', type=int, default=None, help="Etichetta di tutte le immagini")
+    parser.add_argument('--classes', nargs='+', default=list(DEFAULT_CLASSES),
+                        help="Nomi delle cartelle per le etichette 1..K")
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID_SIZE)
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help="Livello di grigio (0-255) sotto cui un pixel è nero")
+    parser.add_argument('--invert', action='store_true', help="Inchiostro chiaro su fondo scuro")
+    parser.add_argument('--workers', type=int, default=None, help="Processi del pool (predefinito: CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Immagini per blocco")
+    args = parser.parse_args()
+
+    stats = ingest(args.root, args.output, args.label, tuple(args.classes), args.grid, args.threshold,
+                   args.invert, args.workers, args.chunk_size)
+    print(f"{stats['rows']} righe in {stats['seconds']:.2f}s "
+          f"({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} immagini/s) -> '{args.output}'")
+    if stats['skipped']:
+        print(f"{len(stats['skipped'])} immagini in cartelle senza etichetta (es. '{stats['skipped'][0]}')")
+    for path, error in stats['failed'][:10]:
+        print(f"Errore su '{path}': {error}")
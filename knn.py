@@ -0,0 +1,253 @@
+"""
+Classificatore k-NN sul dataset, come backend a sé o affiancato alla rete.
+
+Con quattro feature un k-NN sulle righe di dataset.csv è un'alternativa
+economica alla rete densa. I vettori vengono normalizzati con lo stesso scaler
+e indicizzati una volta all'avvio in un KD-tree (scipy.spatial.cKDTree;
+senza scipy la ricerca è esaustiva in NumPy). predict() ha la stessa firma
+del modello Keras: riceve input già normalizzati e restituisce, per ogni
+classe, la frazione dei k vicini con quell'etichetta, quindi funziona con
+classify_input, classify_batch, il server e la riproduzione.
+
+I nuovi campioni etichettati (add) finiscono in un piccolo buffer cercato in
+modo esaustivo e unito all'albero quando supera una frazione delle righe
+indicizzate. Lo stato dell'indice viene sostituito con una sola
+assegnazione: le ricerche in corso in altri thread non vedono stati a metà.
+
+KNNAssist affianca il k-NN a una rete: sulle righe in cui la confidenza della
+softmax è sotto la soglia, le probabilità vengono sostituite ('fallback') o
+mediate ('ensemble') con i voti dei vicini. Con l'avvio rapido la rete riceve
+le feature grezze (scaler incorporato nei pesi): l'indice usa comunque lo
+scaler originale, conservato nel FoldedScaler, e normalizza le query.
+"""
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_K = 5
+DEFAULT_THRESHOLD = 0.6   # Confidenza della rete sotto cui interviene il k-NN
+ASSIST_MODES = ('fallback', 'ensemble')
+REBUILD_MIN = 1024        # Campioni aggiunti nel buffer prima di ricostruire l'albero...
+REBUILD_RATIO = 0.02      # ...e almeno questa frazione delle righe già indicizzate
+BRUTE_FORCE_CHUNK = 1024  # Righe per blocco nella ricerca esaustiva (memoria limitata)
+DATASET_PATH = 'dataset.csv'
+
+
+def _build_tree(points):
+    """KD-tree sui punti, o None se scipy non è installato o non ci sono punti."""
+    if not len(points):
+        return None
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return None
+    return cKDTree(points)
+
+def _brute_force(points, queries, k):
+    """(distanze, indici) dei k punti più vicini a ogni query, ordinati per distanza."""
+    distances = np.empty((len(queries), k))
+    indices = np.empty((len(queries), k), dtype=np.intp)
+    for start in range(0, len(queries), BRUTE_FORCE_CHUNK):
+        chunk = queries[start:start + BRUTE_FORCE_CHUNK]
+        d2 = ((chunk[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        d2_nearest = np.take_along_axis(d2, nearest, axis=1)
+        order = np.argsort(d2_nearest, axis=1)
+        distances[start:start + len(chunk)] = np.sqrt(np.take_along_axis(d2_nearest, order, axis=1))
+        indices[start:start + len(chunk)] = np.take_along_axis(nearest, order, axis=1)
+    return distances, indices
+
+
+class _IndexState:
+    """Albero sulle righe indicizzate più il buffer delle aggiunte recenti (immutabile)."""
+
+    __slots__ = ('points', 'labels', 'tree', 'extra_points', 'extra_labels')
+
+    def __init__(self, points, labels, tree, extra_points, extra_labels):
+        self.points, self.labels, self.tree = points, labels, tree
+        self.extra_points, self.extra_labels = extra_points, extra_labels
+
+    def __len__(self):
+        return len(self.labels) + len(self.extra_labels)
+
+
+class NearestNeighborClassifier:
+    def __init__(self, features, labels, scaler, k=DEFAULT_K):
+        """features: righe grezze (x1..xN, come dataset.csv); labels: interi 1..K."""
+        self.k = k
+        self.scaler = scaler
+        features = np.asarray(features, dtype=float)
+        labels = np.asarray(labels, dtype=int)
+        self.input_size = features.shape[1]
+        self.n_classes = int(labels.max()) if len(labels) else 0
+        self.inserted = 0
+        self._raw = [features]        # Righe grezze, per ricostruire l'indice con un altro scaler
+        self._raw_labels = [labels]
+        self._lock = threading.Lock() # Serializza le aggiunte; le ricerche leggono self._state
+        points = self._scale(features)
+        self._state = _IndexState(points, labels, _build_tree(points), points[:0], labels[:0])
+
+    @classmethod
+    def from_dataset(cls, scaler, path=DATASET_PATH, k=DEFAULT_K):
+        from export import load_dataset
+        features, labels = load_dataset(path)
+        return cls(features, labels, scaler, k)
+
+    def __len__(self):
+        return len(self._state)
+
+    def _scale(self, features):
+        if not len(features):
+            return np.empty((0, self.input_size))
+        return np.asarray(self.scaler.transform(features), dtype=float)
+
+    @property
+    def indexed(self):
+        """'kd-tree' oppure 'brute-force' (scipy non disponibile)."""
+        return 'kd-tree' if self._state.tree is not None or not len(self._state.labels) else 'brute-force'
+
+    def with_scaler(self, scaler):
+        """Stesso insieme di campioni indicizzato con un altro scaler."""
+        with self._lock:
+            features, labels = np.concatenate(self._raw), np.concatenate(self._raw_labels)
+        return NearestNeighborClassifier(features, labels, scaler, self.k)
+
+    # --- Ricerca ---
+
+    def kneighbors(self, X):
+        """(distanze, etichette) dei k vicini di ogni riga di X (già normalizzata), dal più vicino."""
+        state = self._state
+        X = np.asarray(X, dtype=float).reshape(-1, self.input_size)
+        k = min(self.k, len(state))
+        if k == 0:
+            raise ValueError("Nessun campione indicizzato")
+        k_tree = min(k, len(state.labels))
+        if state.tree is not None:
+            distances, indices = state.tree.query(X, k=k_tree)
+            distances, indices = distances.reshape(len(X), k_tree), indices.reshape(len(X), k_tree)
+        elif k_tree:
+            distances, indices = _brute_force(state.points, X, k_tree)
+        else:
+            distances, indices = np.empty((len(X), 0)), np.empty((len(X), 0), dtype=np.intp)
+        labels = state.labels[indices]
+        if len(state.extra_labels):
+            k_extra = min(k, len(state.extra_labels))
+            extra_distances, extra_indices = _brute_force(state.extra_points, X, k_extra)
+            distances = np.concatenate([distances, extra_distances], axis=1)
+            labels = np.concatenate([labels, state.extra_labels[extra_indices]], axis=1)
+            order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            labels = np.take_along_axis(labels, order, axis=1)
+        return distances, labels
+
+    def predict(self, X, verbose=0):
+        """Frazione dei k vicini per classe, forma (N, n_classes): stessa interfaccia del modello Keras."""
+        _, labels = self.kneighbors(X)
+        n_rows, k = labels.shape
+        cells = (labels - 1) + np.arange(n_rows)[:, None] * self.n_classes
+        votes = np.bincount(cells.ravel(), minlength=n_rows * self.n_classes)
+        return votes.reshape(n_rows, self.n_classes) / k
+
+    # --- Aggiunte incrementali ---
+
+    def add(self, features, labels):
+        """Aggiunge campioni etichettati (righe grezze); l'albero viene ricostruito a soglie."""
+        features = np.asarray(features, dtype=float).reshape(-1, self.input_size)
+        labels = np.asarray(labels, dtype=int).reshape(-1)
+        if len(features) != len(labels):
+            raise ValueError("Servono tante etichette quante righe")
+        if len(labels) and labels.min() < 1:
+            raise ValueError("Le etichette devono essere interi 1..K")
+        points = self._scale(features)
+        with self._lock:
+            self._raw.append(features)
+            self._raw_labels.append(labels)
+            state = self._state
+            extra_points = np.concatenate([state.extra_points, points])
+            extra_labels = np.concatenate([state.extra_labels, labels])
+            if len(extra_labels) >= max(REBUILD_MIN, REBUILD_RATIO * len(state.labels)):
+                all_points = np.concatenate([state.points, extra_points])
+                all_labels = np.concatenate([state.labels, extra_labels])
+                state = _IndexState(all_points, all_labels, _build_tree(all_points),
+                                    extra_points[:0], extra_labels[:0])
+            else:
+                state = _IndexState(state.points, state.labels, state.tree, extra_points, extra_labels)
+            if len(labels):
+                self.n_classes = max(self.n_classes, int(labels.max()))
+            self.inserted += len(labels)
+            self._state = state
+
+    @property
+    def version(self):
+        """Cambia a ogni aggiunta (chiave delle cache di previsioni, predcache.py)."""
+        return self.inserted
+
+    def stats(self):
+        state = self._state
+        return {'rows': len(state), 'buffered': len(state.extra_labels), 'inserted': self.inserted,
+                'k': self.k, 'index': self.indexed}
+
+
+class KNNAssist:
+    """Rete con il k-NN come ripiego (o partner d'ensemble) quando la confidenza è bassa."""
+
+    def __init__(self, model, knn, mode='fallback', threshold=DEFAULT_THRESHOLD, query_scaler=None):
+        """query_scaler: porta gli input della rete nello spazio dell'indice (None se coincidono)."""
+        if mode not in ASSIST_MODES:
+            raise ValueError(f"Modalità sconosciuta: {mode}")
+        self.model = model
+        self.knn = knn
+        self.mode = mode
+        self.threshold = threshold
+        self.query_scaler = query_scaler
+        self.rows = 0
+        self.assisted = 0   # Righe in cui è intervenuto il k-NN
+
+    @property
+    def version(self):
+        return self.knn.version
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=float)
+        probabilities = np.array(self.model.predict(X, verbose=0), dtype=float)
+        low = probabilities.max(axis=1) < self.threshold
+        if low.any():
+            # Colonna j = etichetta j + 1 in entrambi: i vicini con etichette che la rete
+            # non ha vengono ignorati e i voti restanti rinormalizzati
+            n = probabilities.shape[1]
+            queries = X[low] if self.query_scaler is None else self.query_scaler.transform(X[low])
+            votes = self.knn.predict(queries)
+            votes = np.pad(votes, ((0, 0), (0, max(n - votes.shape[1], 0))))[:, :n]
+            total = votes.sum(axis=1)
+            # Righe senza vicini delle classi della rete: resta la rete
+            low[low] = total > 0
+            votes = votes[total > 0] / total[total > 0, None]
+        if low.any():
+            if self.mode == 'fallback':
+                probabilities[low] = votes
+            else:
+                probabilities[low] = (probabilities[low] + votes) / 2
+        self.rows += len(X)
+        self.assisted += int(low.sum())
+        return probabilities
+
+
+def assist_factory(mode, threshold=DEFAULT_THRESHOLD, k=DEFAULT_K, path=DATASET_PATH):
+    """Funzione (modello, scaler) -> KNNAssist; l'indice si ricostruisce solo se cambia lo scaler."""
+    cache = {}
+
+    def wrap(model, scaler):
+        # Avvio rapido: indice nello spazio dello scaler incorporato, non delle feature grezze
+        index_scaler = getattr(scaler, 'folded', scaler)
+        knn = cache.get('knn')
+        if knn is None:
+            knn = NearestNeighborClassifier.from_dataset(index_scaler, path, k)
+        elif knn.scaler is not index_scaler:
+            knn = knn.with_scaler(index_scaler)
+        cache['knn'] = knn
+        return KNNAssist(model, knn, mode, threshold, None if index_scaler is scaler else index_scaler)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"'{path}' non trovato: serve per l'indice k-NN")
+    return wrap
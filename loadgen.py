@@ -0,0 +1,148 @@
+"""
+Generatore di carico per server.py: client HTTP concorrenti con keep-alive.
+
+Ogni client invia richieste in sequenza su una propria connessione; alla fine
+si riportano latenza p50/p99 e richieste (e vettori) al secondo. Ogni client ha
+un proprio seme, quindi i vettori non si ripetono tra un client e l'altro; gli
+hit della cache delle previsioni del server durante la prova (da GET /health)
+compaiono accanto ai risultati. Per misurare solo il modello avvia il server
+con --cache-size 0.
+
+Uso:
+    python loadgen.py --port 8000 --concurrency 32 --requests 5000
+    python loadgen.py --mode bitmap --concurrency 8 --requests 500
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+
+from features import CANVAS_SIZE
+
+
+def make_payloads(mode, batch_size, n_features, count, seed=0):
+    """Corpi JSON pre-serializzati, così il client misura il server e non json.dumps."""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(count):
+        if mode == 'features':
+            body = {'features': np.round(rng.uniform(0, 30, n_features), 2).tolist()}
+        elif mode == 'batch':
+            body = {'batch': np.round(rng.uniform(0, 30, (batch_size, n_features)), 2).tolist()}
+        else:
+            # Densità diversa per ogni bitmap: feature (e chiavi della cache) diverse
+            bitmap = rng.random((CANVAS_SIZE, CANVAS_SIZE)) < rng.uniform(0.02, 0.3)
+            body = {'bitmap_b64': base64.b64encode(np.packbits(bitmap)).decode(),
+                    'shape': [CANVAS_SIZE, CANVAS_SIZE]}
+        payloads.append(json.dumps(body).encode())
+    return payloads
+
+async def client(host, port, payloads, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in payloads:
+            request = (f"POST /classify HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b' 200 ' not in status_line:
+                errors.append(status_line.decode('latin-1').strip())
+    finally:
+        writer.close()
+
+async def fetch_health(host, port):
+    """Corpo di GET /health, o None se non disponibile."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return None
+    try:
+        writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        return json.loads(response.partition(b'\r\n\r\n')[2])
+    except (OSError, ValueError):
+        return None
+    finally:
+        writer.close()
+
+async def run(host, port, concurrency, requests, mode, batch_size, n_features, seed=0):
+    """Restituisce (latenze, errori, durata, statistiche della cache del server durante la prova o None)."""
+    per_client = max(1, requests // concurrency)
+    # Un seme per client: con payload identici quasi tutte le richieste sarebbero hit della cache
+    payloads = [make_payloads(mode, batch_size, n_features, per_client, seed=seed + i) for i in range(concurrency)]
+    latencies, errors = [], []
+    before = await fetch_health(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, client_payloads, latencies, errors)
+                           for client_payloads in payloads))
+    elapsed = time.perf_counter() - start
+    after = await fetch_health(host, port)
+    cache = None
+    if before is not None and after is not None and 'cache' in after:
+        hits = after['cache']['hits'] - before['cache']['hits']
+        misses = after['cache']['misses'] - before['cache']['misses']
+        cache = {'hits': hits, 'misses': misses,
+                 'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                 'max_entries': after['cache']['max_entries']}
+    return latencies, errors, elapsed, cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carico concorrente verso server.py: p50/p99 e richieste/s.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=5000, help="Richieste totali (divise tra i client)")
+    parser.add_argument('--mode', choices=['features', 'batch', 'bitmap'], default='features')
+    parser.add_argument('--batch-size', type=int, default=32, help="Vettori per richiesta in modalità batch")
+    parser.add_argument('--features', type=int, default=4, help="Valori per vettore")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seme del primo client (gli altri seguono); cambialo per non riusare la cache della prova precedente")
+    parser.add_argument('--json', action='store_true', help="Stampa il risultato in JSON")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed, cache = asyncio.run(run(args.host, args.port, args.concurrency, args.requests,
+                                                 args.mode, args.batch_size, args.features, args.seed))
+    latencies_ms = np.array(latencies) * 1000
+    vectors_per_request = args.batch_size if args.mode == 'batch' else 1
+    report = {
+        'mode': args.mode,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'vectors_per_s': round(len(latencies) * vectors_per_request / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+    if cache is not None:
+        report['cache_hits'] = cache['hits']
+        report['cache_misses'] = cache['misses']
+        report['cache_hit_rate'] = cache['hit_rate']
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in report.items():
+            print(f"{key:>15}: {value}")
+        if errors:
+            print(f"Primo errore: {errors[0]}")
+        if cache is not None and cache['max_entries'] > 0 and cache['hits']:
+            print("Parte delle richieste è servita dalla cache del server: "
+                  "per il throughput del modello avvialo con --cache-size 0")
@@ -1,13 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
-import pandas as pd
-import joblib
 import os
 import warnings
 import threading
 import time
 
+from raster import stamp_segment, quadrant_counts, guide_background, photo_rows
+from worker import InferenceWorker, LIVE_DEBOUNCE_MS
+from network_view import NetworkDiagram
+# Dimensioni fisse in features.py: server, ingest e loadgen le leggono senza importare Tk
+from features import (CANVAS_SIZE, DEFAULT_GRID_SIZE, MAX_PIXELS_PER_QUADRANT, QUADRANT_SIZE, cell_edges,
+                      region_cell_counts)
+import strokes
+from profiling import PROFILE_OUTPUT, Profiler, TimedProxy, profiling_requested
+from registry import POLL_INTERVAL, ModelRegistry
+from history import StrokeHistory
+from colstore import is_store, load_features
+from knn import ASSIST_MODES, DEFAULT_THRESHOLD as KNN_THRESHOLD, assist_factory
+from predcache import DEFAULT_MAX_ENTRIES, PredictionCache, cache_key, model_version
+
 # Optimize TensorFlow loading
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce TensorFlow logging
 
@@ -15,26 +27,127 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce TensorFlow logging
 # AGGIUSTA QUESTI PERCORSI in base a dove hai salvato i file sul tuo Mac!
 MODEL_PATH = 'handwriting_ann_model.h5' 
 SCALER_PATH = 'scaler.pkl' 
+MODEL_JSON_PATH = 'model.json' # Modello TF.js (model.json + group1-shard1of1.bin)
+
+# Backend di inferenza: 'keras' (TensorFlow), 'numpy' (model.json), 'numpy-csv' (weights_*.csv)
+# o 'knn' (vicini più prossimi sulle righe di dataset.csv, vedi knn.py)
+BACKENDS = ('keras', 'numpy', 'numpy-csv', 'knn')
+DEFAULT_BACKEND = 'keras'
+
+# Rendering del canvas: 'bitmap' mostra canvas_pixels con un'unica PhotoImage,
+# 'vector' crea una linea Tk per ogni movimento del mouse (comportamento originale)
+RENDER_MODES = ('bitmap', 'vector')
+DEFAULT_RENDER_MODE = 'bitmap'
+
+BATCH_CHUNK_SIZE = 8192 # Righe per blocco nella classificazione batch
+
+# Avvio rapido: modello + scaler compilati in un unico .npz (scaler incorporato nel primo layer)
+ARTIFACT_PATH = 'model_cache.npz'
 
-# --- Dimensioni Fisse ---
-CANVAS_SIZE = 200 # Il canvas è 200x200 pixel
-QUADRANT_SIZE = CANVAS_SIZE // 2 # Ogni quadrante è 100x100 pixel
-MAX_PIXELS_PER_QUADRANT = QUADRANT_SIZE * QUADRANT_SIZE # 10000
+# Metodi dell'app temporizzati con --profile (handler di Tk, disegno, feature, classificazione)
+PROFILED_STAGES = ('start_draw', 'draw_line', 'stop_draw', 'draw_on_canvas', 'render_region',
+                   'update_pixel_counts', 'classify_features', 'show_prediction')
+DIAGNOSTICS_REFRESH_MS = 500
+CPROFILE_SECONDS = 5 # Durata della cattura cProfile avviata dal pannello di diagnostica
 
 # Sopprimi il warning sul formato .h5 (potrebbe apparire al caricamento)
 warnings.filterwarnings("ignore", category=UserWarning)
 
 # --- Funzioni di Caricamento e Classificazione ---
 
-def load_resources():
-    """Carica il modello Keras e lo scaler joblib all'avvio dell'app."""
-    try:
-        print("Caricamento TensorFlow...")
+def load_model_backend(backend=DEFAULT_BACKEND, status=print):
+    """Carica il modello per il backend scelto. I backend NumPy non importano TensorFlow."""
+    if backend == 'keras':
+        status("Caricamento TensorFlow...")
         from tensorflow.keras.models import load_model
-        print("TensorFlow caricato. Caricamento modello...")
-        model = load_model(MODEL_PATH)
+        status("TensorFlow caricato. Caricamento modello...")
+        return load_model(MODEL_PATH)
+    from engine import DenseNetwork
+    if backend == 'numpy':
+        status("Caricamento modello NumPy (model.json)...")
+        return DenseNetwork.from_tfjs(MODEL_JSON_PATH)
+    if backend == 'numpy-csv':
+        status("Caricamento modello NumPy (CSV)...")
+        return DenseNetwork.from_csv()
+    if backend == 'knn':
+        from knn import NearestNeighborClassifier
+        status("Indicizzazione di dataset.csv (k-NN)...")
+        return NearestNeighborClassifier.from_dataset(load_scaler())
+    raise ValueError(f"Backend sconosciuto: {backend}")
+
+def load_scaler(path=SCALER_PATH):
+    """Carica lo scaler: .pkl con joblib (import differito) oppure scaler.json nei formati di index.html."""
+    if path.endswith('.json'):
+        import json
+        from engine import AffineScaler
+        with open(path) as f:
+            return AffineScaler.from_json(json.load(f))
+    import joblib
+    return joblib.load(path)
+
+def model_source_paths(backend=DEFAULT_BACKEND):
+    """File da cui dipende il modello del backend scelto (chiave della cache di avvio rapido)."""
+    if backend == 'keras':
+        return [MODEL_PATH, SCALER_PATH]
+    if backend == 'numpy':
+        return [MODEL_JSON_PATH, 'group1-shard1of1.bin', SCALER_PATH]
+    if backend == 'knn':
+        from knn import DATASET_PATH
+        return [DATASET_PATH, SCALER_PATH]
+    return ['weights_hidden.csv', 'biases_hidden.csv', 'weights_output.csv',
+            'biases_output.csv', SCALER_PATH]
+
+def load_fast_start(backend=DEFAULT_BACKEND):
+    """Carica l'artefatto compilato se è aggiornato. Restituisce (modello, scaler) oppure (None, None).
+
+    Lo scaler è già incorporato nei pesi del primo layer: quello restituito è
+    l'identità (FoldedScaler, che conserva l'originale per il k-NN).
+    """
+    from engine import load_artifact
+    try:
+        loaded = load_artifact(ARTIFACT_PATH, model_source_paths(backend))
+    except OSError:
+        loaded = None
+    return loaded if loaded is not None else (None, None)
+
+def compile_fast_start(model, scaler, backend=DEFAULT_BACKEND):
+    """Compila modello e scaler nell'artefatto usato dai lanci successivi."""
+    from engine import DenseNetwork, compile_artifact
+    network = model if isinstance(model, DenseNetwork) else DenseNetwork.from_keras(model)
+    return compile_artifact(network, scaler, ARTIFACT_PATH, model_source_paths(backend))
+
+def load_app_resources(backend=DEFAULT_BACKEND, fast_start=False, status=print):
+    """Percorso di caricamento di LoadingScreen: modello, scaler e (con fast_start) artefatto compilato."""
+    model = load_model_backend(backend, status=status)
+    status("Modello caricato. Caricamento scaler...")
+    scaler = load_scaler()
+    if fast_start:
+        status("Compilazione per l'avvio rapido...")
+        try:
+            compile_fast_start(model, scaler, backend)
+        except Exception as e:
+            print(f"Avvio rapido non disponibile: {e}")
+    return model, scaler
+
+def network_view(model):
+    """DenseNetwork con gli stessi pesi del modello (diagramma e attivazioni), o None."""
+    from engine import DenseNetwork
+    from knn import KNNAssist
+    if isinstance(model, KNNAssist):
+        model = model.model
+    if isinstance(model, DenseNetwork):
+        return model
+    try:
+        return DenseNetwork.from_keras(model)
+    except Exception:
+        return None
+
+def load_resources(backend=DEFAULT_BACKEND):
+    """Carica il modello (backend scelto) e lo scaler joblib all'avvio dell'app."""
+    try:
+        model = load_model_backend(backend)
         print("Modello caricato. Caricamento scaler...")
-        scaler = joblib.load(SCALER_PATH)
+        scaler = load_scaler()
         print("Modello e Scaler caricati con successo.")
         return model, scaler
     except Exception as e:
@@ -55,13 +168,96 @@ def classify_input(model, scaler, input_values):
     confidence = prediction_probabilities[predicted_index]
     return predicted_label, confidence
 
+def classify_batch(model, scaler, input_matrix, chunk_size=BATCH_CHUNK_SIZE):
+    """Classifica un array (N, 4): una trasformazione e un forward pass per blocco.
+
+    Restituisce (etichette, confidenze) come array di lunghezza N.
+    """
+    data = np.asarray(input_matrix, dtype=float)
+    if data.ndim == 1:
+        data = data.reshape(1, -1)
+    labels = np.empty(len(data), dtype=int)
+    confidences = np.empty(len(data), dtype=float)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        probabilities = np.asarray(model.predict(scaler.transform(chunk), verbose=0))
+        predicted_index = np.argmax(probabilities, axis=1)
+        labels[start:start + chunk_size] = predicted_index + 1
+        confidences[start:start + chunk_size] = probabilities[np.arange(len(chunk)), predicted_index]
+    return labels, confidences
+
+def score_csv(model, scaler, input_path, output_path, chunk_size=BATCH_CHUNK_SIZE):
+    """Classifica un CSV nel formato di dataset.csv (x1,x2,x3,x4[,label]) a blocchi.
+
+    Legge e scrive un blocco alla volta, così la memoria resta limitata.
+    Restituisce (righe classificate, righe corrette o None se manca 'label').
+    """
+    from itertools import islice
+
+    total, correct = 0, 0
+    with open(input_path) as src, open(output_path, 'w') as dst:
+        header = src.readline().strip().split(',')
+        feature_columns = [i for i, name in enumerate(header) if name != 'label']
+        label_column = header.index('label') if 'label' in header else None
+        dst.write(','.join(header + ['predicted_label', 'confidence']) + '\n')
+        while True:
+            lines = list(islice(src, chunk_size))
+            if not lines:
+                break
+            # Righe vuote scartate prima: loadtxt le salterebbe e le previsioni finirebbero sulle righe sbagliate
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+            rows = np.loadtxt(lines, delimiter=',', ndmin=2)
+            labels, confidences = classify_batch(model, scaler, rows[:, feature_columns], chunk_size)
+            for line, label, confidence in zip(lines, labels, confidences):
+                dst.write(f"{line.strip()},{label},{confidence:.6f}\n")
+            total += len(rows)
+            if label_column is not None:
+                correct += int(np.sum(labels == rows[:, label_column]))
+    return total, (correct if label_column is not None else None)
+
+def score_store(model, scaler, store_path, output_path, chunk_size=BATCH_CHUNK_SIZE):
+    """Come score_csv, ma legge le feature da un archivio colonnare (colstore.py) mappato in memoria."""
+    features, true_labels = load_features(store_path)
+    names = [f'x{i + 1}' for i in range(features.shape[1])]
+    total, correct = 0, 0
+    with open(output_path, 'w') as dst:
+        dst.write(','.join(names + ['label', 'predicted_label', 'confidence']) + '\n')
+        for start in range(0, len(features), chunk_size):
+            chunk = features[start:start + chunk_size]
+            expected = true_labels[start:start + chunk_size]
+            labels, confidences = classify_batch(model, scaler, chunk, chunk_size)
+            for row, true_label, label, confidence in zip(chunk, expected, labels, confidences):
+                dst.write(','.join(f'{v:g}' for v in row) + f",{true_label},{label},{confidence:.6f}\n")
+            total += len(chunk)
+            correct += int(np.sum(labels == expected))
+    return total, correct
+
 # --- Interfaccia Utente (Tkinter) ---
 
 class HandwritingClassifierApp:
-    def __init__(self, master, model, scaler):
+    def __init__(self, master, model, scaler, live_debounce_ms=LIVE_DEBOUNCE_MS,
+                 render_mode=DEFAULT_RENDER_MODE, grid_size=DEFAULT_GRID_SIZE, recorder=None,
+                 profiler=None, registry=None, knn_assist=None, cache_size=DEFAULT_MAX_ENTRIES):
+        """
+        live_debounce_ms: attesa per le previsioni durante il tratto (None le disattiva).
+        render_mode: 'bitmap' (numero di elementi Tk costante) oppure 'vector'.
+        grid_size: griglia NxN delle feature (2 = quadranti x1..x4 del modello fornito).
+        recorder: StrokeRecorder (strokes.py) che registra gli eventi della sessione, o None.
+        profiler: Profiler (profiling.py) che temporizza le fasi e aggiunge il tab "Diagnostica", o None.
+        registry: ModelRegistry (registry.py) che sostituisce il modello a caldo quando i file cambiano, o None.
+        knn_assist: funzione (modello, scaler) -> KNNAssist (knn.assist_factory) applicata a ogni modello, o None.
+        cache_size: previsioni conservate nella cache LRU (predcache.py); 0 la disattiva.
+        """
         self.master = master
-        self.model = model
-        self.scaler = scaler
+        self.live_predictions = live_debounce_ms is not None
+        self.init_state(model, scaler, render_mode, grid_size, recorder, profiler, knn_assist, cache_size)
+        self.registry = registry
+        if registry is not None:
+            self.model_version = registry.adopt(model, scaler)
+            # Il registro chiama on_swap dal suo thread: lo scambio avviene nel thread di Tk
+            registry.on_swap = lambda version: master.after(0, self.swap_model, version)
         master.title("Riconoscimento Cifre Disegnate (Logica Dataset)")
         
         self.fixed_width = 900
@@ -69,15 +265,45 @@ class HandwritingClassifierApp:
         master.geometry(f"{self.fixed_width}x{self.fixed_height}")
         master.resizable(False, False) 
 
-        # Variabili per il disegno: 0 = bianco, 1 = disegnato (nero logico)
-        self.canvas_pixels = np.zeros((CANVAS_SIZE, CANVAS_SIZE), dtype=int) 
-        self.last_x, self.last_y = None, None
-        self.brush_size = 8  # Increased brush size for better drawing
-        self.eraser_mode = False  # New: eraser mode toggle
-        self.current_x_values = [0, 0, 0, 0] # I valori x1, x2, x3, x4 scalati a 0-100
+        # La classificazione gira in un thread separato: il mainloop non si blocca mai
+        self.inference_worker = InferenceWorker(
+            master, self.classify_features, self.show_prediction,
+            debounce_ms=live_debounce_ms if self.live_predictions else 0)
 
         self.create_widgets()
         self.clear_canvas() 
+        if registry is not None:
+            registry.start()
+
+    def init_state(self, model, scaler, render_mode=DEFAULT_RENDER_MODE, grid_size=DEFAULT_GRID_SIZE,
+                   recorder=None, profiler=None, knn_assist=None, cache_size=DEFAULT_MAX_ENTRIES):
+        """Stato di modello e disegno, senza widget (usato anche dall'app headless di replay.py)."""
+        self.render_mode = render_mode
+        self.grid_size = grid_size
+        self.recorder = recorder
+        self.profiler = profiler
+        self.knn_assist = knn_assist
+        self.prediction_cache = PredictionCache(cache_size)
+        self.model_generation = 0
+        if profiler is not None:
+            # Prima di creare worker e binding, così entrambi usano i metodi temporizzati
+            profiler.instrument(self, PROFILED_STAGES)
+        self.set_model(model, scaler)
+
+        self.last_x, self.last_y = None, None
+        self.brush_size = 8  # Increased brush size for better drawing
+        self.eraser_mode = False  # New: eraser mode toggle
+        self.reset_drawing_state()
+
+    def reset_drawing_state(self):
+        """Buffer, storico e conteggi vuoti."""
+        # Variabili per il disegno: 0 = bianco, 1 = disegnato (nero logico), un byte per pixel
+        self.canvas_pixels = np.zeros((CANVAS_SIZE, CANVAS_SIZE), dtype=np.uint8) 
+        self.history = StrokeHistory() # Annulla/ripeti per tratto (delta XOR impacchettati)
+        self.quadrant_counts = [0, 0, 0, 0] # Pixel neri per quadrante (TL, TR, BL, BR)
+        # Griglie diverse da 2x2: pixel neri per cella, aggiornati come i quadranti
+        self.cell_counts = np.zeros((self.grid_size, self.grid_size), dtype=np.int64)
+        self.current_x_values = [0] * self.grid_size ** 2 # I valori x1..xN scalati a 0-100
 
     def create_widgets(self):
         # Create main frame with padding
@@ -91,6 +317,8 @@ class HandwritingClassifierApp:
         # Create tabs
         self.create_drawing_tab()
         self.create_neural_network_tab()
+        if self.profiler is not None:
+            self.create_diagnostics_tab()
 
     def create_drawing_tab(self):
         """Create the drawing tab with canvas and controls"""
@@ -126,11 +354,18 @@ class HandwritingClassifierApp:
         self.master.bind("<KeyPress-d>", lambda e: self.toggle_eraser_mode())
         self.master.bind("<KeyPress-c>", lambda e: self.clear_canvas_with_confirmation())
         self.master.bind("<KeyPress-Return>", lambda e: self.handle_classification())
+        self.master.bind("<Control-z>", lambda e: self.undo_stroke())
+        self.master.bind("<Control-y>", lambda e: self.redo_stroke())
+        self.master.bind("<Control-Z>", lambda e: self.redo_stroke()) # Ctrl+Shift+Z
         self.master.focus_set()  # Enable keyboard focus
         
-        # Linee Guida dei Quadranti
-        self.canvas.create_line(QUADRANT_SIZE, 0, QUADRANT_SIZE, CANVAS_SIZE, fill="lightgray", dash=(4, 2))
-        self.canvas.create_line(0, QUADRANT_SIZE, CANVAS_SIZE, QUADRANT_SIZE, fill="lightgray", dash=(4, 2))
+        if self.render_mode == 'bitmap':
+            # Un'unica immagine mostra canvas_pixels; le linee guida sono nello sfondo della bitmap
+            self.canvas_background = guide_background(CANVAS_SIZE, self.grid_splits())
+            self.canvas_image = tk.PhotoImage(width=CANVAS_SIZE, height=CANVAS_SIZE)
+            self.canvas.create_image(0, 0, anchor='nw', image=self.canvas_image)
+        else:
+            self.draw_guide_lines()
 
         # --- Sezione Controlli ---
         ttk.Label(control_frame, text="Risultato Classificazione:", font=('Helvetica', 14, 'bold')).grid(row=0, column=0, columnspan=2, pady=(0, 10))
@@ -144,12 +379,17 @@ class HandwritingClassifierApp:
         ttk.Label(control_frame, text="Conteggi Percentuali (0-100):", font=('Helvetica', 10, 'bold')).grid(row=3, column=0, columnspan=2, pady=(10, 5))
         
         self.x_labels = {}
-        labels_text = ["x1 (TL):", "x2 (TR):", "x3 (BL):", "x4 (BR):"]
-        for i, text in enumerate(labels_text):
-            ttk.Label(control_frame, text=text).grid(row=4+i, column=0, sticky='w', padx=5, pady=2)
-            lbl = ttk.Label(control_frame, text="0.00", font=('Monospace', 10, 'bold'))
-            lbl.grid(row=4+i, column=1, sticky='ew', padx=5, pady=2)
-            self.x_labels[f'x{i+1}'] = lbl
+        if self.grid_size == 2:
+            labels_text = ["x1 (TL):", "x2 (TR):", "x3 (BL):", "x4 (BR):"]
+            for i, text in enumerate(labels_text):
+                ttk.Label(control_frame, text=text).grid(row=4+i, column=0, sticky='w', padx=5, pady=2)
+                lbl = ttk.Label(control_frame, text="0.00", font=('Monospace', 10, 'bold'))
+                lbl.grid(row=4+i, column=1, sticky='ew', padx=5, pady=2)
+                self.x_labels[f'x{i+1}'] = lbl
+        else:
+            # Griglia NxN: una tabella di percentuali al posto delle quattro etichette
+            self.grid_values_label = ttk.Label(control_frame, text="", font=('Monospace', 8), justify='left')
+            self.grid_values_label.grid(row=4, column=0, rowspan=4, columnspan=2, sticky='w', padx=5, pady=2)
 
         # Instructions
         ttk.Label(control_frame, text="Istruzioni:", font=('Helvetica', 10, 'bold')).grid(row=8, column=0, columnspan=2, pady=(20, 5), sticky='w')
@@ -165,6 +405,15 @@ class HandwritingClassifierApp:
         # Pulsanti Azione
         ttk.Button(control_frame, text="CLASSIFICA", command=self.handle_classification).grid(row=14, column=0, columnspan=2, pady=(10, 5))
         ttk.Button(control_frame, text="CANCELLA TUTTO", command=self.clear_canvas_with_confirmation).grid(row=15, column=0, columnspan=2, pady=5)
+        ttk.Button(control_frame, text="ANNULLA (Ctrl+Z)", command=self.undo_stroke).grid(row=16, column=0, padx=2, pady=5)
+        ttk.Button(control_frame, text="RIPETI (Ctrl+Y)", command=self.redo_stroke).grid(row=16, column=1, padx=2, pady=5)
+
+        if self.registry is not None:
+            # Ricaricamento a caldo: versione attiva e ripristino della precedente
+            ttk.Button(control_frame, text="VERSIONE PRECEDENTE", command=self.rollback_model).grid(row=17, column=0, columnspan=2, pady=5)
+            self.model_version_label = ttk.Label(control_frame, text=f"Modello: {self.model_version.describe()}",
+                                                 font=('Helvetica', 9), foreground='gray')
+            self.model_version_label.grid(row=18, column=0, columnspan=2, pady=(5, 0))
 
     def create_neural_network_tab(self):
         """Create the neural network visualization tab"""
@@ -185,145 +434,244 @@ class HandwritingClassifierApp:
         self.nn_canvas = tk.Canvas(nn_frame, bg="white", width=800, height=500, bd=2, relief="solid")
         self.nn_canvas.pack(fill='both', expand=True, pady=(0, 20))
         
-        # Bind resize event to redraw network
-        self.nn_canvas.bind("<Configure>", lambda e: self.draw_neural_network())
-        
-        # Draw neural network
-        self.draw_neural_network()
+        # La scena è costruita una volta sola; al ridimensionamento gli elementi vengono solo spostati
+        self.build_network_diagram()
         
         # Information panel
         info_frame = ttk.LabelFrame(nn_frame, text="Informazioni sulla Rete", padding="10")
         info_frame.pack(fill='x')
         
-        info_text = """
-• INPUT LAYER: 4 neuroni (x1, x2, x3, x4) - Percentuali di pixel neri per quadrante
-• HIDDEN LAYER 1: 3 neuroni - Prima elaborazione delle caratteristiche
-• HIDDEN LAYER 2: 3 neuroni - Seconda elaborazione delle caratteristiche  
-• OUTPUT LAYER: 4 neuroni (cifre 1-4) - Probabilità per ogni cifra
-• ARCHITETTURA: 4-3-3-4 (Input-Hidden1-Hidden2-Output)
-• ATTIVAZIONE: Funzioni di attivazione per la non-linearità
+        self.network_info_label = ttk.Label(info_frame, text=self.network_info_text(), font=('Helvetica', 10), 
+                                            justify='left')
+        self.network_info_label.pack(anchor='w')
+
+    def build_network_diagram(self):
+        """(Ri)crea il diagramma con le dimensioni e i pesi della rete attuale."""
+        layer_sizes = self.network.layer_sizes if self.network is not None else [4, 5, 3]
+        weights = [kernel for kernel, _, _ in self.network.layers] if self.network is not None else None
+        self.nn_diagram = NetworkDiagram(self.nn_canvas, layer_sizes, weights)
+        self.nn_canvas.bind("<Configure>", self.nn_diagram.schedule_layout)
+
+    def network_info_text(self):
+        layer_sizes = self.network.layer_sizes if self.network is not None else [4, 5, 3]
+        hidden_lines = "".join(
+            f"• HIDDEN LAYER {i}: {size} neuroni - Elaborazione delle caratteristiche\n"
+            for i, size in enumerate(layer_sizes[1:-1], start=1))
+        info_text = f"""
+• INPUT LAYER: {layer_sizes[0]} neuroni (x1-x{layer_sizes[0]}) - Percentuali di pixel neri per zona
+{hidden_lines}• OUTPUT LAYER: {layer_sizes[-1]} neuroni (1-{layer_sizes[-1]}) - Probabilità per ogni classe
+• ARCHITETTURA: {'-'.join(map(str, layer_sizes))} (dal modello caricato)
+• COLORI: dopo ogni classificazione neuroni e connessioni mostrano attivazioni e contributi (blu +, rosso -)
 • ADDESTRAMENTO: Rete allenata su dataset di cifre scritte a mano
         """
-        
-        info_label = ttk.Label(info_frame, text=info_text, font=('Helvetica', 10), 
-                              justify='left')
-        info_label.pack(anchor='w')
-
-    def draw_neural_network(self):
-        """Draw the neural network architecture"""
-        canvas = self.nn_canvas
-        canvas.delete("all")  # Clear canvas
-        
-        # Get canvas dimensions
-        width = canvas.winfo_width() or 800
-        height = canvas.winfo_height() or 500
-        
-        # Define layer positions and sizes (dynamically calculated)
-        margin = 80
-        available_width = width - 2 * margin
-        layer_spacing = available_width // 4
-        layer_x = [margin + i * layer_spacing for i in range(4)]
-        
-        layer_names = ["INPUT\n(x1,x2,x3,x4)", "HIDDEN\nLAYER 1", "HIDDEN\nLAYER 2", "OUTPUT\n(1-4)"]
-        layer_sizes = [4, 3, 3, 4]  # Number of neurons in each layer (4-3-3-4)
-        layer_colors = ["#4CAF50", "#2196F3", "#FF9800", "#F44336"]  # Green, Blue, Orange, Red
-        
-        # Adjust neuron size based on available space
-        neuron_radius = min(18, layer_spacing // 8)
-        
-        # Draw layers
-        for layer_idx, (x, name, size, color) in enumerate(zip(layer_x, layer_names, layer_sizes, layer_colors)):
-            # Draw layer label
-            canvas.create_text(x, 50, text=name, font=('Helvetica', 12, 'bold'), fill='black')
-            
-            # Calculate neuron positions in this layer
-            start_y = (height - 100) // 2 - (size * (neuron_radius * 2 + 10)) // 2 + 100
-            
-            for neuron_idx in range(size):
-                y = start_y + neuron_idx * (neuron_radius * 2 + 10)
-                
-                # Draw neuron (circle)
-                canvas.create_oval(x - neuron_radius, y - neuron_radius, 
-                                 x + neuron_radius, y + neuron_radius,
-                                 fill=color, outline='black', width=2)
-                
-                # Add neuron number for input layer
-                if layer_idx == 0:
-                    canvas.create_text(x, y, text=f"x{neuron_idx+1}", 
-                                     font=('Helvetica', 10, 'bold'), fill='white')
-                elif layer_idx == len(layer_x) - 1:  # Output layer
-                    canvas.create_text(x, y, text=str(neuron_idx+1), 
-                                     font=('Helvetica', 10, 'bold'), fill='white')
-                else:
-                    # Hidden layers - show neuron number
-                    canvas.create_text(x, y, text=str(neuron_idx+1), 
-                                     font=('Helvetica', 8, 'bold'), fill='white')
-        
-        # Draw connections between layers
-        for layer_idx in range(len(layer_x) - 1):
-            current_x = layer_x[layer_idx]
-            next_x = layer_x[layer_idx + 1]
-            current_size = layer_sizes[layer_idx]
-            next_size = layer_sizes[layer_idx + 1]
-            
-            # Calculate start positions for current layer
-            current_start_y = (height - 100) // 2 - (current_size * (neuron_radius * 2 + 10)) // 2 + 100
-            next_start_y = (height - 100) // 2 - (next_size * (neuron_radius * 2 + 10)) // 2 + 100
-            
-            # Draw connections
-            for i in range(current_size):
-                current_y = current_start_y + i * (neuron_radius * 2 + 10)
-                for j in range(next_size):
-                    next_y = next_start_y + j * (neuron_radius * 2 + 10)
-                    
-                    # Draw connection line
-                    canvas.create_line(current_x + neuron_radius, current_y,
-                                     next_x - neuron_radius, next_y,
-                                     fill='gray', width=1)
-        
-        # Add title
-        canvas.create_text(width // 2, 30, text="Architettura Rete Neurale per Riconoscimento Cifre", 
-                         font=('Helvetica', 16, 'bold'), fill='darkblue')
-        
-        # Add data flow arrows
-        for i in range(len(layer_x) - 1):
-            x = (layer_x[i] + layer_x[i+1]) // 2
-            y = height - 40
-            canvas.create_polygon(x-8, y-5, x+8, y-5, x+4, y-12, x-4, y-12, 
-                                fill='darkgreen', outline='black')
-            canvas.create_text(x, y-20, text="→", font=('Helvetica', 12, 'bold'), fill='darkgreen')
+        return info_text
+
+    def create_diagnostics_tab(self):
+        """Tab con tempi per fase, istogrammi e cattura cProfile (solo con --profile)."""
+        diagnostics_tab = ttk.Frame(self.notebook)
+        self.notebook.add(diagnostics_tab, text="📈 Diagnostica")
+
+        diagnostics_frame = ttk.Frame(diagnostics_tab, padding="10")
+        diagnostics_frame.pack(fill='both', expand=True)
+
+        self.diagnostics_text = tk.Text(diagnostics_frame, font=('Monospace', 9), height=30, wrap='none')
+        self.diagnostics_text.pack(fill='both', expand=True)
+
+        buttons = ttk.Frame(diagnostics_frame)
+        buttons.pack(fill='x', pady=(10, 0))
+        self.capture_button = ttk.Button(buttons, text=f"Cattura cProfile ({CPROFILE_SECONDS}s)",
+                                         command=lambda: self.start_profile_capture(CPROFILE_SECONDS))
+        self.capture_button.pack(side='left', padx=5)
+        ttk.Button(buttons, text="Salva JSON", command=self.save_profile).pack(side='left', padx=5)
+        self.diagnostics_status = ttk.Label(buttons, text="", font=('Helvetica', 9))
+        self.diagnostics_status.pack(side='left', padx=10)
+
+        if self.profiler.cprofile_seconds:
+            self.start_profile_capture(self.profiler.cprofile_seconds)
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        self.profiler.gauge('worker_dropped', self.inference_worker.dropped)
+        for name, value in self.prediction_cache.stats().items():
+            self.profiler.gauge(f'cache_{name}', value)
+        if self.notebook.index('current') == self.notebook.index('end') - 1:
+            # Ridisegna la tabella solo se il tab è visibile
+            self.diagnostics_text.delete('1.0', 'end')
+            self.diagnostics_text.insert('1.0', self.profiler.format_table())
+        self.master.after(DIAGNOSTICS_REFRESH_MS, self.refresh_diagnostics)
+
+    def start_profile_capture(self, seconds):
+        if self.profiler.start_capture(self.master, seconds, self.show_profile_capture):
+            self.capture_button.config(state='disabled')
+            self.diagnostics_status.config(text=f"Cattura cProfile in corso ({seconds}s)...")
+
+    def show_profile_capture(self, path, summary):
+        self.capture_button.config(state='normal')
+        self.diagnostics_status.config(text=f"cProfile salvato in '{path}'")
+        print(summary)
+
+    def save_profile(self):
+        self.diagnostics_status.config(text=f"Salvato in '{self.profiler.dump()}'")
+
+    # --- Modello attivo e ricaricamento a caldo ---
+
+    def set_model(self, model, scaler, network=None):
+        """Pubblica modello, scaler e rete insieme.
+
+        Il worker legge self.active_model con una sola lettura: una previsione
+        già partita termina con la versione con cui è iniziata.
+        """
+        if network is None and model is not None:
+            network = network_view(model)
+        if self.knn_assist is not None and model is not None and scaler is not None:
+            # Anche le versioni ricaricate a caldo restano affiancate dal k-NN
+            model = self.knn_assist(model, scaler)
+        if self.profiler is not None:
+            if model is not None:
+                model = TimedProxy(model, self.profiler, {'predict': 'model.predict'})
+            if scaler is not None:
+                scaler = TimedProxy(scaler, self.profiler, {'transform': 'scaler.transform'})
+        self.model, self.scaler, self.network = model, scaler, network
+        # Nuova generazione: le previsioni in cache del modello precedente non valgono più
+        self.model_generation += 1
+        self.active_model = (model, scaler, network, self.model_generation)
+
+    def swap_model(self, version):
+        """Eseguito nel thread di Tk quando il registro pubblica (o ripristina) una versione."""
+        self.set_model(version.model, version.scaler, version.network)
+        self.model_version = version
+        self.build_network_diagram()
+        self.network_info_label.config(text=self.network_info_text())
+        self.model_version_label.config(text=f"Modello: {version.describe()}")
+
+    def rollback_model(self):
+        if self.registry.rollback() is None:
+            self.model_version_label.config(text=f"Modello: {self.model_version.describe()} (nessuna precedente)")
+
+    def grid_splits(self):
+        """Coordinate interne delle linee della griglia delle feature."""
+        return cell_edges(CANVAS_SIZE, self.grid_size)[1:-1]
+
+    def draw_guide_lines(self):
+        for split in self.grid_splits():
+            self.canvas.create_line(split, 0, split, CANVAS_SIZE, fill="lightgray", dash=(4, 2))
+            self.canvas.create_line(0, split, CANVAS_SIZE, split, fill="lightgray", dash=(4, 2))
+
+    def record_event(self, event_type, x=0, y=0):
+        """Aggiunge l'evento al log della sessione, se la registrazione è attiva."""
+        if self.recorder is not None:
+            self.recorder.record(event_type, x, y, self.brush_size, self.eraser_mode)
 
     # --- Metodi di Disegno (Invariati) ---
     def start_draw(self, event):
+        self.record_event(strokes.START, event.x, event.y)
         self.last_x, self.last_y = event.x, event.y
+        self.history.begin()
         self.draw_on_canvas(event.x, event.y)
 
     def draw_line(self, event):
-        if self.last_x and self.last_y:
-            color = "white" if self.eraser_mode else "black"
-            self.canvas.create_line(self.last_x, self.last_y, event.x, event.y, 
-                                    width=self.brush_size, fill=color, capstyle=tk.ROUND, smooth=tk.TRUE)
-            self.draw_on_canvas(event.x, event.y)
+        self.record_event(strokes.MOVE, event.x, event.y)
+        if self.last_x is not None and self.last_y is not None:
+            if self.render_mode == 'vector':
+                color = "white" if self.eraser_mode else "black"
+                # Tag del tratto: annulla/ripeti nascondono o mostrano le sue linee
+                self.canvas.create_line(self.last_x, self.last_y, event.x, event.y, 
+                                        width=self.brush_size, fill=color, capstyle=tk.ROUND, smooth=tk.TRUE,
+                                        tags=('stroke', f'stroke_{self.history.next_id}'))
+            self.draw_on_canvas(event.x, event.y, self.last_x, self.last_y)
             self.last_x, self.last_y = event.x, event.y
+            if self.live_predictions:
+                self.request_live_prediction()
 
     def stop_draw(self, event):
+        self.record_event(strokes.STOP, event.x, event.y)
         self.last_x, self.last_y = None, None
+        for discarded in self.history.commit():
+            # Tratti annullati che non si possono più ripetere
+            if self.render_mode == 'vector':
+                self.canvas.delete(f'stroke_{discarded.id}')
         self.update_pixel_counts() # Aggiorna e calcola la percentuale
+        if self.live_predictions:
+            self.request_live_prediction()
 
-    def draw_on_canvas(self, x, y):
+    def request_live_prediction(self):
+        """Aggiorna x1..x4 e chiede una previsione con debounce (non blocca il disegno)."""
+        if self.model is None or self.scaler is None or not self.model_accepts_features():
+            return
+        self.update_pixel_counts()
+        self.inference_worker.submit(self.current_x_values)
+
+    def draw_on_canvas(self, x, y, from_x=None, from_y=None):
         # L'array canvas_pixels è 0=bianco, 1=nero. Questo simula la binarizzazione.
-        for i in range(max(0, x - self.brush_size // 2), min(CANVAS_SIZE, x + self.brush_size // 2 + 1)):
-            for j in range(max(0, y - self.brush_size // 2), min(CANVAS_SIZE, y + self.brush_size // 2 + 1)):
-                if (i - x)**2 + (j - y)**2 <= (self.brush_size / 2)**2:
-                    if 0 <= i < CANVAS_SIZE and 0 <= j < CANVAS_SIZE:
-                        if self.eraser_mode:
-                            self.canvas_pixels[j, i] = 0  # Erase (set to white)
-                        else:
-                            self.canvas_pixels[j, i] = 1  # Draw (set to black)
+        # Con from_x/from_y si rasterizza l'intero segmento (come la linea Tk), senza buchi.
+        if from_x is None or from_y is None:
+            from_x, from_y = x, y
+        stamped = stamp_segment(self.canvas_pixels, from_x, from_y, x, y,
+                                self.brush_size, 0 if self.eraser_mode else 1)
+        if stamped is None:
+            return
+        # I conteggi dei quadranti si aggiornano solo per i pixel che cambiano stato.
+        top, left, changed = stamped
+        counts = quadrant_counts(changed, top, left, QUADRANT_SIZE)
+        delta = -1 if self.eraser_mode else 1
+        for q, count in enumerate(counts):
+            self.quadrant_counts[q] += delta * count
+        if any(counts):
+            if self.grid_size != 2:
+                self.cell_counts += delta * self.region_cell_counts(changed, top, left)
+            self.history.add(top, left, changed)
+        if self.render_mode == 'bitmap' and any(counts):
+            self.render_region(top, left, *changed.shape)
+
+    def region_cell_counts(self, mask, top, left):
+        """Pixel veri di mask per cella della griglia NxN (solo il riquadro del tratto)."""
+        edges = cell_edges(CANVAS_SIZE, self.grid_size)
+        return region_cell_counts(mask, top, left, edges, edges)
+
+    def render_region(self, top, left, height, width):
+        """Ridisegna nella PhotoImage solo il rettangolo sporco di canvas_pixels."""
+        rows = slice(top, top + height)
+        cols = slice(left, left + width)
+        self.canvas_image.put(photo_rows(self.canvas_pixels[rows, cols], self.canvas_background[rows, cols]),
+                              to=(left, top))
+
+    def undo_stroke(self):
+        self.record_event(strokes.UNDO)
+        if not self.history.recording:
+            delta = self.history.undo()
+            if delta is not None:
+                self.apply_delta(delta, visible=False)
+
+    def redo_stroke(self):
+        self.record_event(strokes.REDO)
+        if not self.history.recording:
+            delta = self.history.redo()
+            if delta is not None:
+                self.apply_delta(delta, visible=True)
+
+    def apply_delta(self, delta, visible):
+        """Inverte i pixel di un tratto (XOR sul suo riquadro) e aggiorna conteggi e vista."""
+        top, left, mask = delta.apply(self.canvas_pixels)
+        region = self.canvas_pixels[top:top + mask.shape[0], left:left + mask.shape[1]]
+        added = quadrant_counts(mask & (region != 0), top, left, QUADRANT_SIZE)
+        removed = quadrant_counts(mask & (region == 0), top, left, QUADRANT_SIZE)
+        for q in range(4):
+            self.quadrant_counts[q] += added[q] - removed[q]
+        if self.grid_size != 2:
+            self.cell_counts += (self.region_cell_counts(mask & (region != 0), top, left)
+                                 - self.region_cell_counts(mask & (region == 0), top, left))
+        if self.render_mode == 'bitmap':
+            self.render_region(top, left, *mask.shape)
+        else:
+            self.canvas.itemconfigure(f'stroke_{delta.id}', state='normal' if visible else 'hidden')
+        self.update_pixel_counts()
+        if self.live_predictions:
+            self.request_live_prediction()
 
     def toggle_eraser(self, event):
         """Toggle between drawing and erasing mode"""
         self.eraser_mode = not self.eraser_mode
+        self.record_event(strokes.ERASER)
         if self.eraser_mode:
             self.mode_label.config(text="Modalità: Gomma", foreground='red')
         else:
@@ -332,6 +680,7 @@ class HandwritingClassifierApp:
     def toggle_eraser_mode(self):
         """Toggle eraser mode via keyboard shortcut"""
         self.eraser_mode = not self.eraser_mode
+        self.record_event(strokes.ERASER)
         if self.eraser_mode:
             self.mode_label.config(text="Modalità: Gomma", foreground='red')
         else:
@@ -347,65 +696,114 @@ class HandwritingClassifierApp:
         """
         Calcola la percentuale di pixel neri in ogni quadrante (0-100) 
         rispecchiando ESATTAMENTE la logica del tuo script di pre-elaborazione.
-        """
-        
-        # Il tuo script usava un ciclo nidificato. Lo replichiamo per chiarezza logica.
-        
-        input_values = []
-        
-        # Blocchi 100x100
-        block_size = QUADRANT_SIZE 
-        total_pixels = MAX_PIXELS_PER_QUADRANT # 10000
-
-        # Il nostro array self.canvas_pixels è già l'equivalente di 'img_array' 
-        # dopo la binarizzazione, dove i pixel neri sono rappresentati da '1'.
-        
-        for i in range(2):  # righe (0, 1)
-            for j in range(2):  # colonne (0, 1)
-                
-                # Estrazione del blocco
-                block = self.canvas_pixels[i*block_size:(i+1)*block_size,
-                                           j*block_size:(j+1)*block_size]
 
-                # Conteggio dei pixel neri (che sono i valori '1' nel nostro array)
-                black_pixels = np.sum(block == 1) # Nel tuo script era block == 0, qui è block == 1
+        I pixel neri per quadrante (self.quadrant_counts, ordine TL, TR, BL, BR)
+        sono già mantenuti da draw_on_canvas: qui non si riscansiona il canvas.
+        Con una griglia NxN diversa da 2x2 si usano i conteggi per cella
+        (self.cell_counts), mantenuti allo stesso modo.
+        """
+        if self.grid_size == 2:
+            total_pixels = MAX_PIXELS_PER_QUADRANT # 10000
 
-                # Percentuale neri in centesimi: (black_pixels / total_pixels) * 100
-                percent_black = (black_pixels / total_pixels) * 100
-                
-                # Arrotondamento a due decimali (come nel tuo script)
-                input_values.append(round(percent_black, 2))
+            # Percentuale neri in centesimi, arrotondata a due decimali (come nel tuo script)
+            input_values = [round((black_pixels / total_pixels) * 100, 2)
+                            for black_pixels in self.quadrant_counts]
+        else:
+            # Griglia NxN: stessa regola, con l'area di ogni cella
+            edges = cell_edges(CANVAS_SIZE, self.grid_size)
+            areas = np.outer(np.diff(edges), np.diff(edges))
+            input_values = [round(float(v), 2) for v in (self.cell_counts / areas * 100).ravel()]
 
         self.current_x_values = input_values
         
         # Aggiorna le etichette nella GUI
-        self.x_labels['x1'].config(text=f"{input_values[0]:.2f}")
-        self.x_labels['x2'].config(text=f"{input_values[1]:.2f}")
-        self.x_labels['x3'].config(text=f"{input_values[2]:.2f}")
-        self.x_labels['x4'].config(text=f"{input_values[3]:.2f}")
-
+        if self.grid_size == 2:
+            self.x_labels['x1'].config(text=f"{input_values[0]:.2f}")
+            self.x_labels['x2'].config(text=f"{input_values[1]:.2f}")
+            self.x_labels['x3'].config(text=f"{input_values[2]:.2f}")
+            self.x_labels['x4'].config(text=f"{input_values[3]:.2f}")
+        else:
+            n = self.grid_size
+            self.grid_values_label.config(text="\n".join(
+                " ".join(f"{v:5.1f}" for v in input_values[r * n:(r + 1) * n]) for r in range(n)))
+
+    def model_accepts_features(self):
+        """True se il modello ha tanti input quante sono le celle della griglia."""
+        return self.network is None or self.network.input_size == self.grid_size ** 2
+
+    def clear_pixels(self):
+        """Azzera il buffer sul posto; in modalità bitmap la cancellazione si può annullare."""
+        if self.render_mode == 'bitmap':
+            rows = np.flatnonzero(self.canvas_pixels.any(axis=1))
+            if rows.size:
+                cols = np.flatnonzero(self.canvas_pixels.any(axis=0))
+                top, left = rows[0], cols[0]
+                ink = self.canvas_pixels[top:rows[-1] + 1, left:cols[-1] + 1] != 0
+                self.history.push(int(top), int(left), ink)
+        else:
+            # Le linee Tk vengono eliminate: i tratti precedenti non sono più ripristinabili
+            self.history = StrokeHistory(self.history.max_bytes)
+        self.canvas_pixels.fill(0)
+        self.quadrant_counts = [0, 0, 0, 0]
+        self.cell_counts.fill(0)
 
     def clear_canvas(self):
-        self.canvas.delete("all")
-        # Disegna nuovamente le linee guida dei quadranti
-        self.canvas.create_line(QUADRANT_SIZE, 0, QUADRANT_SIZE, CANVAS_SIZE, fill="lightgray", dash=(4, 2))
-        self.canvas.create_line(0, QUADRANT_SIZE, CANVAS_SIZE, QUADRANT_SIZE, fill="lightgray", dash=(4, 2))
-        
-        self.canvas_pixels = np.zeros((CANVAS_SIZE, CANVAS_SIZE), dtype=int)
+        self.record_event(strokes.CLEAR)
+        self.clear_pixels()
+        if self.render_mode == 'bitmap':
+            self.render_region(0, 0, CANVAS_SIZE, CANVAS_SIZE)
+        else:
+            self.canvas.delete("all")
+            # Disegna nuovamente le linee guida dei quadranti
+            self.draw_guide_lines()
+
+        self.inference_worker.cancel()
+        self.nn_diagram.reset_activations()
         self.update_pixel_counts() 
         self.result_label.config(text="Cifra Riconosciuta: N/A", foreground='navy')
         self.confidence_label.config(text="Confidenza: N/A")
 
     def handle_classification(self):
+        self.record_event(strokes.CLASSIFY)
         if self.model is None or self.scaler is None:
             self.result_label.config(text="Errore: Modello non caricato.", foreground='red')
             return
         
+        if not self.model_accepts_features():
+            self.result_label.config(
+                text=f"Errore: il modello richiede {self.network.input_size} feature, "
+                     f"la griglia {self.grid_size}x{self.grid_size} ne produce {self.grid_size ** 2}.",
+                foreground='red')
+            return
+
         # Calcola i valori x1-x4 e li memorizza in self.current_x_values
         self.update_pixel_counts() 
         
-        predicted_label, confidence = classify_input(self.model, self.scaler, self.current_x_values)
-        
+        # La previsione avviene nel worker; il risultato arriva in show_prediction
+        self.inference_worker.submit(self.current_x_values, immediate=True)
+
+    def classify_features(self, input_values):
+        """Eseguito nel thread del worker: etichetta, confidenza e attivazioni per il diagramma.
+
+        Lo stesso disegno (feature uguali) con lo stesso modello riusa il risultato in cache.
+        """
+        model, scaler, network, generation = self.active_model
+        version, key = model_version(model, generation), cache_key(input_values)
+        result = self.prediction_cache.get(version, key)
+        if result is not None:
+            return result
+        predicted_label, confidence = classify_input(model, scaler, input_values)
+        activations = None
+        if network is not None:
+            scaled = scaler.transform(np.array(input_values).reshape(1, -1))
+            activations = network.forward(scaled, return_activations=True)
+        result = (predicted_label, confidence, activations)
+        self.prediction_cache.put(version, key, result)
+        return result
+
+    def show_prediction(self, predicted_label, confidence, activations=None):
+        if activations is not None:
+            self.nn_diagram.show_activations(activations)
         if predicted_label is not None:
             self.result_label.config(text=f"Cifra Riconosciuta: {predicted_label}", foreground='green')
             self.confidence_label.config(text=f"Confidenza: {confidence*100:.2f}%")
@@ -415,7 +813,10 @@ class HandwritingClassifierApp:
 # --- Loading Screen ---
 
 class LoadingScreen:
-    def __init__(self):
+    def __init__(self, backend=DEFAULT_BACKEND, fast_start=False, **app_options):
+        self.backend = backend
+        self.fast_start = fast_start
+        self.app_options = app_options # Inoltrate a HandwritingClassifierApp
         self.root = tk.Tk()
         self.root.title("Caricamento...")
         self.root.geometry("400x200")
@@ -453,17 +854,12 @@ class LoadingScreen:
         """Load resources in background thread"""
         def load():
             try:
-                self.update_status("Caricamento TensorFlow...")
-                from tensorflow.keras.models import load_model
-                
-                self.update_status("TensorFlow caricato. Caricamento modello...")
-                self.model = load_model(MODEL_PATH)
-                
-                self.update_status("Modello caricato. Caricamento scaler...")
-                self.scaler = joblib.load(SCALER_PATH)
+                self.model, self.scaler = load_app_resources(self.backend, self.fast_start,
+                                                             status=self.update_status)
                 
                 self.update_status("Caricamento completato!")
-                time.sleep(1)  # Brief pause to show completion
+                if not self.fast_start:
+                    time.sleep(1)  # Brief pause to show completion
                 
                 # Close loading screen and start main app
                 self.root.after(0, self.start_main_app)
@@ -487,13 +883,100 @@ class LoadingScreen:
         self.root.destroy()
         if self.model and self.scaler:
             root = tk.Tk()
-            app = HandwritingClassifierApp(root, self.model, self.scaler)
+            app = HandwritingClassifierApp(root, self.model, self.scaler, **self.app_options)
             root.mainloop()
 
 # --- Esecuzione dell'Applicazione ---
 
 if __name__ == "__main__":
-    # Show loading screen
-    loading = LoadingScreen()
-    loading.load_in_background()
-    loading.root.mainloop()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Riconoscimento lettere disegnate a mano")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Motore di inferenza: 'numpy', 'numpy-csv' e 'knn' evitano TensorFlow")
+    parser.add_argument('--score', metavar='CSV',
+                        help="Classifica un CSV (x1,x2,x3,x4[,label]) o un archivio colstore.py senza interfaccia grafica")
+    parser.add_argument('--output', default='predictions.csv',
+                        help="CSV di uscita per --score")
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE,
+                        help="Righe lette e classificate per blocco con --score")
+    parser.add_argument('--fast-start', action='store_true',
+                        help=f"Usa (e al primo avvio crea) l'artefatto compilato '{ARTIFACT_PATH}'")
+    parser.add_argument('--live-debounce-ms', type=int, default=LIVE_DEBOUNCE_MS,
+                        help="Attesa dopo l'ultimo movimento prima della previsione durante il tratto")
+    parser.add_argument('--no-live', action='store_true',
+                        help="Classifica solo con Invio / CLASSIFICA")
+    parser.add_argument('--render', choices=RENDER_MODES, default=DEFAULT_RENDER_MODE,
+                        help="'bitmap': un'unica immagine aggiornata per rettangoli; 'vector': una linea Tk per evento")
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID_SIZE,
+                        help="Griglia NxN delle feature (il modello deve avere N*N input)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Temporizza le fasi dell'app (anche con ABC_PROFILE=1) e aggiunge il tab Diagnostica")
+    parser.add_argument('--profile-output', default=PROFILE_OUTPUT,
+                        help="JSON con le statistiche scritto all'uscita (la cattura cProfile va in .prof)")
+    parser.add_argument('--cprofile-seconds', type=float, default=0,
+                        help="Con --profile, cattura cProfile del thread di Tk per i primi N secondi")
+    parser.add_argument('--watch', action='store_true',
+                        help="Ricarica a caldo modello e scaler quando i file cambiano (con ripristino)")
+    parser.add_argument('--watch-interval', type=float, default=POLL_INTERVAL,
+                        help="Secondi tra due controlli dei file con --watch")
+    parser.add_argument('--record', metavar='LOG',
+                        help="Registra gli eventi della sessione in un log binario (vedi replay.py)")
+    parser.add_argument('--knn-assist', choices=ASSIST_MODES,
+                        help="Sotto --knn-threshold di confidenza usa i vicini di dataset.csv ('fallback') "
+                             "o li media con la rete ('ensemble')")
+    parser.add_argument('--knn-threshold', type=float, default=KNN_THRESHOLD,
+                        help="Confidenza della rete sotto cui interviene --knn-assist")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Previsioni conservate nella cache LRU (0 la disattiva)")
+    args = parser.parse_args()
+    if args.knn_assist and args.backend == 'knn':
+        parser.error("--knn-assist affianca una rete: non si usa con --backend knn")
+    knn_assist = assist_factory(args.knn_assist, args.knn_threshold) if args.knn_assist else None
+    app_options = {'live_debounce_ms': None if args.no_live else args.live_debounce_ms,
+                   'render_mode': args.render, 'grid_size': args.grid, 'cache_size': args.cache_size}
+
+    if args.score:
+        model = load_model_backend(args.backend)
+        scaler = load_scaler()
+        if knn_assist is not None:
+            model = knn_assist(model, scaler)
+        start = time.perf_counter()
+        score = score_store if is_store(args.score) else score_csv
+        total, correct = score(model, scaler, args.score, args.output, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"{total} righe classificate in {elapsed:.3f}s "
+              f"({total / max(elapsed, 1e-9):,.0f} righe/s) -> {args.output}")
+        if correct is not None and total:
+            print(f"Accuratezza sulle etichette presenti: {correct / total * 100:.2f}%")
+        raise SystemExit(0)
+
+    recorder = (strokes.StrokeRecorder(args.record, CANVAS_SIZE, args.render, args.grid)
+                if args.record else None)
+    app_options['recorder'] = recorder
+    profiler = (Profiler(args.profile_output, args.cprofile_seconds)
+                if profiling_requested(args.profile) else None)
+    app_options['profiler'] = profiler
+    registry = ModelRegistry(args.backend, poll_interval=args.watch_interval) if args.watch else None
+    app_options['registry'] = registry
+    app_options['knn_assist'] = knn_assist
+    try:
+        model, scaler = load_fast_start(args.backend) if args.fast_start else (None, None)
+        if model is not None:
+            # Artefatto aggiornato: niente TensorFlow né schermata di caricamento
+            root = tk.Tk()
+            app = HandwritingClassifierApp(root, model, scaler, **app_options)
+            root.mainloop()
+        else:
+            # Show loading screen
+            loading = LoadingScreen(backend=args.backend, fast_start=args.fast_start, **app_options)
+            loading.load_in_background()
+            loading.root.mainloop()
+    finally:
+        if registry is not None:
+            registry.stop()
+        if recorder is not None:
+            recorder.close()
+            print(f"Sessione registrata in '{args.record}' ({recorder.written} eventi)")
+        if profiler is not None:
+            print(f"Statistiche di profilazione salvate in '{profiler.dump()}'")
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Diagramma della rete neurale per il tab "Rete Neurale".
+
+La scena (neuroni, etichette, connessioni) viene creata una sola volta a
+partire dalle dimensioni reali dei layer del modello caricato. Al
+ridimensionamento gli elementi, identificati da tag, vengono solo spostati con
+coords; dopo ogni classificazione neuroni e connessioni vengono colorati in
+base alle attivazioni e ai pesi, modificando solo gli attributi cambiati.
+"""
+import numpy as np
+
+LAYER_COLORS = ["#4CAF50", "#2196F3", "#FF9800", "#9C27B0", "#F44336"] # Input, hidden..., output
+EDGE_IDLE_COLOR = 'gray'
+EDGE_POSITIVE_COLOR = (33, 150, 243)  # Contributo positivo (blu)
+EDGE_NEGATIVE_COLOR = (244, 67, 54)   # Contributo negativo (rosso)
+INTENSITY_LEVELS = 16                 # Livelli di colore: evita itemconfig per variazioni minime
+MAX_EDGE_WIDTH = 5
+RESIZE_DEBOUNCE_MS = 80
+
+
+def _hex_to_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+def _blend(rgb, level):
+    """Mescola il bianco con rgb: level 0 = bianco, INTENSITY_LEVELS = colore pieno."""
+    t = level / INTENSITY_LEVELS
+    return '#%02x%02x%02x' % tuple(int(255 + (c - 255) * t) for c in rgb)
+
+
+class NetworkDiagram:
+    def __init__(self, canvas, layer_sizes, weights=None):
+        """
+        layer_sizes: neuroni per layer, input compreso (es. [4, 5, 3]).
+        weights: kernel (n_in, n_out) di ogni layer Dense, usati per colorare le connessioni.
+        """
+        self.canvas = canvas
+        self.layer_sizes = list(layer_sizes)
+        self.weights = [np.asarray(w, dtype=float) for w in weights] if weights is not None else None
+        self._item_state = {}  # id elemento -> ultimi attributi applicati
+        self._resize_job = None
+        self._size = None
+        self._build()
+        self.layout()
+
+    def layer_names(self):
+        n_inputs, n_outputs = self.layer_sizes[0], self.layer_sizes[-1]
+        names = [f"INPUT\n(x1..x{n_inputs})" if n_inputs > 4
+                 else "INPUT\n(" + ",".join(f"x{i + 1}" for i in range(n_inputs)) + ")"]
+        names += [f"HIDDEN\nLAYER {i}" for i in range(1, len(self.layer_sizes) - 1)]
+        names.append(f"OUTPUT\n(1-{n_outputs})")
+        return names
+
+    def _layer_color(self, layer_idx):
+        if layer_idx == len(self.layer_sizes) - 1:
+            return LAYER_COLORS[-1]
+        return LAYER_COLORS[min(layer_idx, len(LAYER_COLORS) - 2)]
+
+    # --- Creazione della scena (una sola volta) ---
+
+    def _build(self):
+        canvas = self.canvas
+        canvas.delete("all")
+        last = len(self.layer_sizes) - 1
+
+        # Le connessioni per prime, così restano sotto i neuroni
+        for layer_idx in range(last):
+            for i in range(self.layer_sizes[layer_idx]):
+                for j in range(self.layer_sizes[layer_idx + 1]):
+                    canvas.create_line(0, 0, 0, 0, fill=EDGE_IDLE_COLOR, width=1,
+                                       tags=('edge', f'edge_{layer_idx}_{i}_{j}'))
+
+        for layer_idx, (name, size) in enumerate(zip(self.layer_names(), self.layer_sizes)):
+            canvas.create_text(0, 0, text=name, font=('Helvetica', 12, 'bold'), fill='black',
+                               tags=('layer_label', f'layer_label_{layer_idx}'))
+            for neuron_idx in range(size):
+                canvas.create_oval(0, 0, 0, 0, fill=self._layer_color(layer_idx), outline='black', width=2,
+                                   tags=('neuron', f'neuron_{layer_idx}_{neuron_idx}'))
+                if layer_idx == 0:
+                    text, font = f"x{neuron_idx+1}", ('Helvetica', 10, 'bold')
+                elif layer_idx == last:
+                    text, font = str(neuron_idx+1), ('Helvetica', 10, 'bold')
+                else:
+                    text, font = str(neuron_idx+1), ('Helvetica', 8, 'bold')
+                canvas.create_text(0, 0, text=text, font=font, fill='white',
+                                   tags=('neuron_label', f'neuron_label_{layer_idx}_{neuron_idx}'))
+
+        canvas.create_text(0, 0, text="Architettura Rete Neurale per Riconoscimento Cifre",
+                           font=('Helvetica', 16, 'bold'), fill='darkblue', tags=('title',))
+        for i in range(last):
+            canvas.create_polygon(0, 0, 0, 0, 0, 0, 0, 0, fill='darkgreen', outline='black',
+                                  tags=('flow', f'flow_arrow_{i}'))
+            canvas.create_text(0, 0, text="→", font=('Helvetica', 12, 'bold'), fill='darkgreen',
+                               tags=('flow', f'flow_text_{i}'))
+
+    # --- Posizionamento (a ogni ridimensionamento) ---
+
+    def schedule_layout(self, event=None):
+        """Handler di <Configure>: accorpa i ridimensionamenti ravvicinati in un solo layout."""
+        if self._resize_job is not None:
+            self.canvas.after_cancel(self._resize_job)
+        self._resize_job = self.canvas.after(RESIZE_DEBOUNCE_MS, self.layout)
+
+    def layout(self):
+        self._resize_job = None
+        canvas = self.canvas
+        width = canvas.winfo_width() or 800
+        height = canvas.winfo_height() or 500
+        if width <= 1 or height <= 1:
+            width, height = 800, 500
+        if (width, height) == self._size:
+            return
+        self._size = (width, height)
+
+        n_layers = len(self.layer_sizes)
+        margin = 80
+        layer_spacing = (width - 2 * margin) // n_layers
+        layer_x = [margin + i * layer_spacing for i in range(n_layers)]
+        neuron_radius = max(4, min(18, layer_spacing // 8))
+        step = neuron_radius * 2 + 10
+
+        def neuron_y(size):
+            start_y = (height - 100) // 2 - (size * step) // 2 + 100
+            return [start_y + k * step for k in range(size)]
+
+        positions = [neuron_y(size) for size in self.layer_sizes]
+        for layer_idx, x in enumerate(layer_x):
+            canvas.coords(f'layer_label_{layer_idx}', x, 50)
+            for neuron_idx, y in enumerate(positions[layer_idx]):
+                canvas.coords(f'neuron_{layer_idx}_{neuron_idx}',
+                              x - neuron_radius, y - neuron_radius, x + neuron_radius, y + neuron_radius)
+                canvas.coords(f'neuron_label_{layer_idx}_{neuron_idx}', x, y)
+
+        for layer_idx in range(n_layers - 1):
+            x0, x1 = layer_x[layer_idx] + neuron_radius, layer_x[layer_idx + 1] - neuron_radius
+            for i, y0 in enumerate(positions[layer_idx]):
+                for j, y1 in enumerate(positions[layer_idx + 1]):
+                    canvas.coords(f'edge_{layer_idx}_{i}_{j}', x0, y0, x1, y1)
+
+        canvas.coords('title', width // 2, 30)
+        for i in range(n_layers - 1):
+            x = (layer_x[i] + layer_x[i + 1]) // 2
+            y = height - 40
+            canvas.coords(f'flow_arrow_{i}', x-8, y-5, x+8, y-5, x+4, y-12, x-4, y-12)
+            canvas.coords(f'flow_text_{i}', x, y-20)
+
+    # --- Sovrapposizione delle attivazioni ---
+
+    def show_activations(self, activations):
+        """Colora neuroni e connessioni con le attivazioni dell'ultima classificazione.
+
+        activations: lista di vettori, uno per layer (input compreso), come
+        restituito da DenseNetwork.forward(..., return_activations=True).
+        """
+        activations = [np.ravel(np.asarray(a, dtype=float)) for a in activations]
+        for layer_idx, values in enumerate(activations):
+            rgb = _hex_to_rgb(self._layer_color(layer_idx))
+            peak = np.max(np.abs(values)) or 1.0
+            levels = np.rint(np.abs(values) / peak * (INTENSITY_LEVELS - 2)).astype(int) + 2
+            for neuron_idx, level in enumerate(levels):
+                self._configure(f'neuron_{layer_idx}_{neuron_idx}', fill=_blend(rgb, level))
+
+        if self.weights is None:
+            return
+        for layer_idx, kernel in enumerate(self.weights):
+            # Contributo di ogni connessione: attivazione di partenza * peso
+            contributions = activations[layer_idx][:, None] * kernel
+            peak = np.max(np.abs(contributions)) or 1.0
+            strength = np.abs(contributions) / peak
+            widths = 1 + np.rint(strength * (MAX_EDGE_WIDTH - 1)).astype(int)
+            levels = np.rint(strength * (INTENSITY_LEVELS - 3)).astype(int) + 3
+            for i in range(kernel.shape[0]):
+                for j in range(kernel.shape[1]):
+                    rgb = EDGE_POSITIVE_COLOR if contributions[i, j] >= 0 else EDGE_NEGATIVE_COLOR
+                    self._configure(f'edge_{layer_idx}_{i}_{j}',
+                                    fill=_blend(rgb, levels[i, j]), width=int(widths[i, j]))
+
+    def reset_activations(self):
+        """Torna ai colori statici del diagramma."""
+        for layer_idx, size in enumerate(self.layer_sizes):
+            for neuron_idx in range(size):
+                self._configure(f'neuron_{layer_idx}_{neuron_idx}', fill=self._layer_color(layer_idx))
+        for layer_idx in range(len(self.layer_sizes) - 1):
+            for i in range(self.layer_sizes[layer_idx]):
+                for j in range(self.layer_sizes[layer_idx + 1]):
+                    self._configure(f'edge_{layer_idx}_{i}_{j}', fill=EDGE_IDLE_COLOR, width=1)
+
+    def _configure(self, tag, **options):
+        """itemconfig solo se gli attributi sono cambiati rispetto all'ultima volta."""
+        if self._item_state.get(tag) != options:
+            self._item_state[tag] = options
+            self.canvas.itemconfig(tag, **options)
@@ -0,0 +1,91 @@
+"""
+Cache LRU delle previsioni, con chiave sul vettore di feature arrotondato.
+
+update_pixel_counts arrotonda ogni feature a due decimali, quindi gli input
+della rete sono discreti: lo stesso disegno riclassificato con Invio, o
+vettori quasi identici dal server e dalla riproduzione, producono la stessa
+chiave. Un risultato in cache costa una ricerca in un dizionario invece di
+scaler.transform + model.predict.
+
+La chiave comprende la versione del modello: quando cambia (nuovo modello
+nell'app, ricaricamento a caldo, campioni aggiunti all'indice k-NN) la cache
+si svuota da sola alla prima ricerca. I risultati calcolati con una versione
+ormai superata non vengono salvati.
+"""
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+DECIMALS = 2 # Come l'arrotondamento di update_pixel_counts
+
+
+def cache_key(features, decimals=DECIMALS):
+    return tuple(round(float(v), decimals) for v in features)
+
+def model_version(model, generation=0):
+    """Versione da usare come chiave: generazione del modello più le modifiche interne (es. k-NN)."""
+    return (generation, getattr(model, 'version', 0))
+
+
+class PredictionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """max_entries: risultati conservati (0 disattiva la cache)."""
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock() # Il worker dell'app e il thread di Tk possono usarla insieme
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version, key):
+        """Risultato in cache o None. Una versione diversa dall'ultima svuota la cache."""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self._entries.clear()
+                    self.invalidations += 1
+                self.version = version
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        with self._lock:
+            if self.max_entries <= 0 or version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def classify(self, model, scaler, features, generation=0):
+        """classify_input con la cache: (etichetta, confidenza)."""
+        from main import classify_input
+        version, key = model_version(model, generation), cache_key(features)
+        result = self.get(version, key)
+        if result is None:
+            result = classify_input(model, scaler, features)
+            self.put(version, key, result)
+        return result
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions, 'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0}
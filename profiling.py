@@ -0,0 +1,187 @@
+"""
+Strumentazione per fasi dell'app: timer, contatori e istogrammi di latenza.
+
+Si attiva con main.py --profile oppure con la variabile d'ambiente ABC_PROFILE=1.
+Da spenta non costa nulla: i metodi dell'app non vengono avvolti. Da accesa
+ogni fase (handler di Tk, draw_on_canvas, update_pixel_counts,
+scaler.transform, model.predict, ...) registra la propria durata in una finestra
+circolare degli ultimi WINDOW campioni, da cui si ricavano percentili e un
+istogramma a fasce logaritmiche. I dati sono visibili nel tab "Diagnostica",
+salvati in JSON all'uscita e, a richiesta, affiancati da una cattura cProfile
+di durata fissa del thread di Tk.
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+import numpy as np
+
+PROFILE_ENV = 'ABC_PROFILE'
+PROFILE_OUTPUT = 'profile.json'
+WINDOW = 1024                 # Campioni recenti per fase (istogramma "rolling")
+BUCKET_EDGES_US = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+CPROFILE_TOP = 20             # Funzioni mostrate nel riepilogo della cattura cProfile
+
+
+def profiling_requested(flag=False):
+    """True con --profile oppure con ABC_PROFILE impostata a un valore diverso da 0."""
+    return flag or os.environ.get(PROFILE_ENV, '0') not in ('', '0')
+
+def bucket_labels():
+    edges = (0,) + BUCKET_EDGES_US
+    label = lambda us: f'{us // 1000}ms' if us >= 1000 else f'{us}us'
+    return [f'<{label(hi)}' for lo, hi in zip(edges, edges[1:])] + [f'>={label(BUCKET_EDGES_US[-1])}']
+
+
+class StageStats:
+    """Durate di una fase: totali cumulativi più una finestra circolare dei campioni recenti."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        recent = self.samples[:min(self.count, len(self.samples))] * 1e6
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) if len(recent) else (0.0, 0.0, 0.0)
+        histogram, _ = np.histogram(recent, bins=(0,) + BUCKET_EDGES_US + (np.inf,))
+        return {'count': self.count, 'total_s': round(self.total, 6),
+                'mean_us': round(self.total / self.count * 1e6, 2) if self.count else 0.0,
+                'p50_us': round(float(p50), 2), 'p95_us': round(float(p95), 2),
+                'p99_us': round(float(p99), 2), 'max_us': round(self.max * 1e6, 2),
+                'histogram': histogram.tolist()}
+
+
+class Profiler:
+    def __init__(self, output_path=PROFILE_OUTPUT, cprofile_seconds=0, window=WINDOW):
+        """
+        output_path: JSON scritto da dump(); la cattura cProfile va nello stesso nome con estensione .prof.
+        cprofile_seconds: se > 0 l'app avvia una cattura cProfile di questa durata all'avvio.
+        """
+        self.output_path = output_path
+        self.cprofile_seconds = cprofile_seconds
+        self.window = window
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()  # model.predict e classify girano nel thread del worker
+        self._capture = None
+
+    # --- Raccolta ---
+
+    def record(self, stage, seconds):
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats(self.window)
+            stats.add(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.counters[name] = value
+
+    def wrap(self, stage, function):
+        """Versione di function che registra la propria durata come 'stage'."""
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(stage, perf_counter() - start)
+        return timed
+
+    def instrument(self, obj, methods, prefix=''):
+        """Sostituisce i metodi indicati dell'istanza con le versioni temporizzate."""
+        for name in methods:
+            setattr(obj, name, self.wrap(prefix + name, getattr(obj, name)))
+
+    # --- Lettura ---
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: stats.summary() for name, stats in self.stages.items()}
+            counters = dict(self.counters)
+        return {'uptime_s': round(time.perf_counter() - self.started, 3), 'window': self.window,
+                'histogram_buckets': bucket_labels(), 'stages': stages, 'counters': counters}
+
+    def format_table(self):
+        """Tabella di testo per il pannello di diagnostica."""
+        snapshot = self.snapshot()
+        lines = [f"{'fase':<22}{'n':>8}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (µs)"]
+        for name, s in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['total_s']):
+            lines.append(f"{name:<22}{s['count']:>8}{s['mean_us']:>10.1f}{s['p50_us']:>10.1f}"
+                         f"{s['p95_us']:>10.1f}{s['p99_us']:>10.1f}{s['max_us']:>10.1f}")
+        lines.append("")
+        lines.append("Istogramma (ultimi campioni): " + " ".join(snapshot['histogram_buckets']))
+        for name, s in sorted(snapshot['stages'].items()):
+            peak = max(s['histogram']) or 1
+            bars = "".join(" ▁▂▃▄▅▆▇█"[round(v / peak * 8)] for v in s['histogram'])
+            lines.append(f"{name:<22}|{bars}|")
+        if snapshot['counters']:
+            lines.append("")
+            lines.append("Contatori: " + ", ".join(f"{k}={v}" for k, v in sorted(snapshot['counters'].items())))
+        lines.append(f"Attivo da {snapshot['uptime_s']:.1f}s")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        path = path or self.output_path
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    # --- Cattura cProfile ---
+
+    @property
+    def capturing(self):
+        return self._capture is not None
+
+    def start_capture(self, master, seconds, on_done=None):
+        """Profila con cProfile il thread di Tk per 'seconds' secondi; on_done(percorso, riepilogo)."""
+        if self._capture is not None:
+            return False
+        self._capture = cProfile.Profile()
+        self._capture.enable()
+        master.after(int(seconds * 1000), self._finish_capture, on_done)
+        return True
+
+    def _finish_capture(self, on_done):
+        capture, self._capture = self._capture, None
+        capture.disable()
+        path = os.path.splitext(self.output_path)[0] + '.prof'
+        capture.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(capture, stream=stream).sort_stats('cumulative').print_stats(CPROFILE_TOP)
+        if on_done is not None:
+            on_done(path, stream.getvalue())
+
+
+class TimedProxy:
+    """Avvolge modello o scaler temporizzandone alcuni metodi; il resto passa all'oggetto originale."""
+
+    def __init__(self, target, profiler, methods):
+        """methods: {nome del metodo: nome della fase}, es. {'predict': 'model.predict'}."""
+        self._target = target
+        for name, stage in methods.items():
+            setattr(self, name, profiler.wrap(stage, getattr(target, name)))
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
@@ -0,0 +1,106 @@
+"""
+Rasterizzazione vettorizzata dei tratti sul buffer binario del canvas.
+
+Il pennello è un disco di diametro brush_size (stessa regola di draw_on_canvas:
+un pixel è coperto se la sua distanza dal centro è <= brush_size / 2). Un
+segmento tra due eventi del mouse copre tutti i pixel entro brush_size / 2 dal
+segmento, cioè la stessa forma della linea Tk con capstyle=ROUND: il buffer
+corrisponde a ciò che si vede a schermo, anche con tratti veloci.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=64)
+def brush_mask(brush_size):
+    """Maschera booleana (2r+1, 2r+1) del disco, con r = brush_size // 2. Calcolata una volta per dimensione."""
+    r = brush_size // 2
+    offsets = np.arange(-r, r + 1)
+    mask = offsets[:, None] ** 2 + offsets[None, :] ** 2 <= (brush_size / 2) ** 2
+    mask.setflags(write=False)
+    return mask
+
+@lru_cache(maxsize=4096)
+def capsule_mask(dx, dy, brush_size):
+    """Maschera del tratto da (0, 0) a (dx, dy), con origine in (min(0, dx) - r, min(0, dy) - r).
+
+    I movimenti del mouse tra due eventi sono brevi e si ripetono, quindi la
+    maschera di ogni spostamento (dx, dy) viene calcolata una sola volta.
+    """
+    if dx == 0 and dy == 0:
+        return brush_mask(brush_size)
+    r = brush_size // 2
+    inv_len2 = 1.0 / (dx * dx + dy * dy)
+    # Coordinate dei pixel del riquadro relative al punto di partenza
+    px = np.arange(min(0, dx) - r, max(0, dx) + r + 1, dtype=float)[None, :]
+    py = np.arange(min(0, dy) - r, max(0, dy) + r + 1, dtype=float)[:, None]
+    t = np.clip(px * (dx * inv_len2) + py * (dy * inv_len2), 0.0, 1.0)
+    mask = (px - t * dx) ** 2 + (py - t * dy) ** 2 <= (brush_size / 2) ** 2
+    mask.setflags(write=False)
+    return mask
+
+def segment_mask(x0, y0, x1, y1, brush_size, width, height):
+    """Pixel coperti dal pennello lungo il segmento (x0, y0) -> (x1, y1).
+
+    Restituisce (top, left, mask) con la maschera già ritagliata ai bordi del
+    canvas, oppure None se il tratto cade interamente fuori.
+    """
+    r = brush_size // 2
+    origin_x, origin_y = min(x0, x1) - r, min(y0, y1) - r
+    left, right = max(0, origin_x), min(width, max(x0, x1) + r + 1)
+    top, bottom = max(0, origin_y), min(height, max(y0, y1) + r + 1)
+    if left >= right or top >= bottom:
+        return None
+    mask = capsule_mask(x1 - x0, y1 - y0, brush_size)
+    return top, left, mask[top - origin_y:bottom - origin_y, left - origin_x:right - origin_x]
+
+def stamp_segment(pixels, x0, y0, x1, y1, brush_size, value):
+    """Applica il pennello (value = 1 disegna, 0 cancella) lungo il segmento.
+
+    Restituisce (top, left, changed): la maschera dei soli pixel che hanno
+    cambiato stato, posizionata nel riquadro sporco, oppure None.
+    """
+    height, width = pixels.shape
+    covered = segment_mask(x0, y0, x1, y1, brush_size, width, height)
+    if covered is None:
+        return None
+    top, left, mask = covered
+    region = pixels[top:top + mask.shape[0], left:left + mask.shape[1]]
+    changed = mask & (region != value)
+    region[changed] = value
+    return top, left, changed
+
+def quadrant_counts(changed, top, left, split):
+    """Pixel di 'changed' in ciascun quadrante (TL, TR, BL, BR) divisi alla coordinata 'split'."""
+    h, w = changed.shape
+    rs = min(max(split - top, 0), h)
+    cs = min(max(split - left, 0), w)
+    if rs in (0, h) and cs in (0, w):
+        # Caso comune: il riquadro sporco sta in un solo quadrante
+        counts = [0, 0, 0, 0]
+        counts[(rs == 0) * 2 + (cs == 0)] = np.count_nonzero(changed)
+        return tuple(counts)
+    return (np.count_nonzero(changed[:rs, :cs]), np.count_nonzero(changed[:rs, cs:]),
+            np.count_nonzero(changed[rs:, :cs]), np.count_nonzero(changed[rs:, cs:]))
+
+
+# --- Rendering su bitmap (PhotoImage) ---
+
+INK_COLOR = '#000000'
+PAPER_COLOR = '#ffffff'
+GUIDE_COLOR = '#d3d3d3' # lightgray, come le linee guida dei quadranti
+
+def guide_background(size, splits, dash=(4, 2)):
+    """Colori dello sfondo: bianco con le linee guida tratteggiate alle coordinate 'splits'."""
+    background = np.full((size, size), PAPER_COLOR, dtype='<U7')
+    on = np.arange(size) % sum(dash) < dash[0]
+    for split in np.atleast_1d(splits):
+        background[on, split] = GUIDE_COLOR
+        background[split, on] = GUIDE_COLOR
+    return background
+
+def photo_rows(pixels, background):
+    """Dati per PhotoImage.put: una riga '{#rrggbb ...}' per ogni riga di pixel."""
+    colors = np.where(pixels != 0, INK_COLOR, background)
+    return ' '.join('{' + ' '.join(row) + '}' for row in colors.tolist())
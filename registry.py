@@ -0,0 +1,237 @@
+"""
+Registro dei modelli con ricaricamento a caldo.
+
+Un thread controlla periodicamente (os.stat) i file da cui dipende il backend
+scelto: modello Keras, model.json + shard binario o CSV dei pesi, più lo
+scaler. Quando cambiano e restano stabili per un intervallo, la nuova versione
+viene caricata in background, validata su un piccolo insieme di sonda e
+pubblicata con una sola assegnazione: le classificazioni già in corso
+finiscono con la versione con cui sono partite. La versione precedente resta
+in memoria per il ripristino immediato.
+
+Con il backend 'numpy' ogni versione mappa in memoria la propria copia di
+model.json e dello shard (in una cartella temporanea), non i file osservati:
+riscriverli sul posto (cp, tensorflowjs_converter) non cambia i pesi della
+versione attiva né di quella di ripristino, e la versione validata è
+esattamente quella pubblicata.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+POLL_INTERVAL = 1.0   # Secondi tra due controlli dei file
+PROBE_ROWS = 64       # Righe di dataset.csv (o casuali) usate per validare una nuova versione
+DATASET_PATH = 'dataset.csv'
+
+
+class ModelVersion:
+    """Modello e scaler caricati insieme, con la rete NumPy equivalente (o None per Keras non denso)."""
+
+    def __init__(self, number, model, scaler, network, source, report=None, snapshot_dir=None):
+        self.number = number
+        self.model = model
+        self.scaler = scaler
+        self.network = network
+        self.source = source        # Backend da cui è stata caricata
+        self.report = report or {}  # Esito della validazione
+        self.snapshot_dir = snapshot_dir # Copia privata dei file mappati in memoria, o None
+        self.loaded_at = time.time()
+
+    def describe(self):
+        sizes = '-'.join(map(str, self.network.layer_sizes)) if self.network is not None else '?'
+        return f"v{self.number} ({self.source}, {sizes})"
+
+
+def probe_inputs(n_features, dataset_path=DATASET_PATH, rows=PROBE_ROWS, seed=0):
+    """Feature di sonda: le prime righe del dataset se compatibili, altrimenti valori casuali 0-100."""
+    if os.path.exists(dataset_path):
+        from export import load_dataset
+        features, _ = load_dataset(dataset_path)
+        if features.shape[1] == n_features:
+            return features[:rows]
+    return np.random.default_rng(seed).uniform(0, 100, (rows, n_features))
+
+
+def _remove_snapshot(snapshot_dir):
+    if snapshot_dir is not None:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+class ModelRegistry:
+    def __init__(self, backend, on_swap=None, poll_interval=POLL_INTERVAL, dataset_path=DATASET_PATH):
+        """on_swap(versione): chiamata dal thread del registro dopo ogni cambio di versione."""
+        self.backend = backend
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+        self.dataset_path = dataset_path
+        self.current = None
+        self.previous = None
+        self.rejected = None        # (motivo, istante) dell'ultima versione scartata
+        self._versions = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot_root = None  # Cartella temporanea con le copie dei file delle versioni
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def watched_paths(self):
+        from main import model_source_paths
+        return model_source_paths(self.backend)
+
+    def _stat_signature(self):
+        signature = []
+        for path in self.watched_paths():
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    # --- Versioni ---
+
+    def adopt(self, model, scaler, source=None):
+        """Registra il modello già caricato all'avvio come prima versione."""
+        from main import network_view
+        version = self._new_version(model, scaler, network_view(model), source or self.backend)
+        with self._lock:
+            self.current = version
+        self._signature = self._stat_signature()
+        return version
+
+    def _new_version(self, model, scaler, network, source, report=None, snapshot_dir=None):
+        self._versions += 1
+        return ModelVersion(self._versions, model, scaler, network, source, report, snapshot_dir)
+
+    def load(self):
+        """Carica e valida i file attuali. Restituisce la nuova versione (ValueError se non valida)."""
+        from main import load_model_backend, load_scaler, network_view
+        snapshot_dir = None
+        try:
+            if self.backend == 'numpy':
+                from engine import DenseNetwork
+                snapshot_dir, model_json_path = self._snapshot_tfjs()
+                model = DenseNetwork.from_tfjs(model_json_path, mmap=True)
+            else:
+                model = load_model_backend(self.backend, status=lambda message: None)
+            scaler = load_scaler()
+            network = network_view(model)
+            report = self.validate(model, scaler, network)
+        except Exception:
+            _remove_snapshot(snapshot_dir)
+            raise
+        return self._new_version(model, scaler, network, self.backend, report, snapshot_dir)
+
+    def _snapshot_tfjs(self):
+        """Copia model.json e i suoi shard in una cartella nuova. Restituisce (cartella, model.json copiato)."""
+        from main import MODEL_JSON_PATH
+        if self._snapshot_root is None:
+            self._snapshot_root = tempfile.mkdtemp(prefix='model_registry_')
+        snapshot_dir = tempfile.mkdtemp(dir=self._snapshot_root)
+        model_json_path = os.path.join(snapshot_dir, os.path.basename(MODEL_JSON_PATH))
+        try:
+            shutil.copyfile(MODEL_JSON_PATH, model_json_path)
+            with open(model_json_path) as f:
+                manifest = json.load(f).get('weightsManifest', [])
+            base_dir = os.path.dirname(os.path.abspath(MODEL_JSON_PATH))
+            for group in manifest:
+                for path in group['paths']:
+                    target = os.path.join(snapshot_dir, path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(os.path.join(base_dir, path), target)
+        except Exception:
+            _remove_snapshot(snapshot_dir)
+            raise
+        return snapshot_dir, model_json_path
+
+    def validate(self, model, scaler, network):
+        """Controlla forma e uscite sul set di sonda; confronta le etichette con la versione attuale."""
+        from main import classify_batch
+        current = self.current
+        n_features = network.input_size if network is not None else None
+        if current is not None and current.network is not None and n_features is not None \
+                and n_features != current.network.input_size:
+            raise ValueError(f"La nuova versione richiede {n_features} feature, "
+                             f"quella attuale {current.network.input_size}")
+        if n_features is None:
+            n_features = current.network.input_size if current is not None and current.network else 4
+        probe = probe_inputs(n_features, self.dataset_path)
+        labels, confidences = classify_batch(model, scaler, probe)
+        if not np.all(np.isfinite(confidences)) or np.any((confidences < 0) | (confidences > 1 + 1e-5)):
+            raise ValueError("Confidenze non valide sul set di sonda")
+        report = {'probe_rows': int(len(probe))}
+        if current is not None:
+            current_labels, _ = classify_batch(current.model, current.scaler, probe)
+            report['agreement'] = round(float(np.mean(labels == current_labels)), 4)
+        return report
+
+    def _publish(self, version):
+        with self._lock:
+            dropped = self.previous
+            self.previous = self.current
+            self.current = version
+        if dropped is not None:
+            # Le classificazioni ancora in corso con quei pesi restano valide: il file
+            # mappato sparisce dalla cartella ma non dalla memoria (su Windows resta fino all'uscita)
+            _remove_snapshot(dropped.snapshot_dir)
+        if self.on_swap is not None:
+            self.on_swap(version)
+
+    def rollback(self):
+        """Torna alla versione precedente (e rende la attuale la nuova 'precedente')."""
+        with self._lock:
+            if self.previous is None:
+                return None
+            self.current, self.previous = self.previous, self.current
+            version = self.current
+        if self.on_swap is not None:
+            self.on_swap(version)
+        return version
+
+    # --- Controllo dei file ---
+
+    def check(self):
+        """Un giro di controllo: ricarica se i file sono cambiati e stabili. True se c'è stato uno scambio."""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return False
+        # Attende che la scrittura finisca: la firma deve restare uguale per un intervallo
+        time.sleep(min(self.poll_interval, 0.5))
+        if self._stat_signature() != signature:
+            return False
+        self._signature = signature
+        if any(mtime is None for _, mtime, _ in signature):
+            self.rejected = ("File mancanti", time.time())
+            return False
+        try:
+            version = self.load()
+        except Exception as e:
+            self.rejected = (str(e), time.time())
+            print(f"Nuova versione del modello scartata: {e}")
+            return False
+        self._publish(version)
+        print(f"Modello aggiornato a {version.describe()} {version.report}")
+        return True
+
+    def start(self):
+        if self._signature is None:
+            self._signature = self._stat_signature()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._snapshot_root is not None:
+            shutil.rmtree(self._snapshot_root, ignore_errors=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Errore nel controllo del modello: {e}")
@@ -0,0 +1,194 @@
+"""
+Riproduzione senza interfaccia dei log registrati con main.py --record.
+
+Ogni record passa per gli stessi handler dell'app (start_draw, draw_line,
+stop_draw), quindi per la stessa rasterizzazione (raster.py), lo stesso calcolo
+delle feature (update_pixel_counts) e, agli eventi CLASSIFY, per classify_input.
+I widget Tk sono sostituiti da oggetti vuoti. La riproduzione è deterministica:
+a parità di log si ottengono sempre gli stessi pixel, feature ed etichette.
+L'app headless usa il rendering e la griglia registrati nel log (i log della
+versione 1 non li hanno: rendering 'bitmap'); --grid sostituisce la griglia,
+che cambia solo le feature e non i pixel.
+
+    python replay.py sessione.strk                      # il più veloce possibile, statistiche
+    python replay.py sessione.strk --realtime           # alla velocità registrata
+    python replay.py logs/*.strk --rows righe.csv --label 3 --workers 4
+
+Con --rows ogni evento CLASSIFY diventa una riga nel formato di dataset.csv
+(x1..xN, label); senza --label l'etichetta è quella prevista dal modello.
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import main
+import strokes
+from features import CANVAS_SIZE, DEFAULT_GRID_SIZE, feature_names
+from raster import guide_background
+
+
+class _Widget:
+    """Sostituto headless dei widget Tk usati dagli handler: accetta le chiamate e non fa nulla."""
+    def config(self, **options):
+        pass
+
+    def put(self, data, to=None):
+        pass
+
+    def create_line(self, *args, **options):
+        pass
+
+    def itemconfigure(self, tag, **options):
+        pass
+
+    def delete(self, *tags):
+        pass
+
+
+def headless_app(brush_size=8, render_mode='bitmap', grid_size=DEFAULT_GRID_SIZE, model=None, scaler=None):
+    """HandwritingClassifierApp con lo stato di disegno reale ma senza finestra Tk."""
+    app = main.HandwritingClassifierApp.__new__(main.HandwritingClassifierApp)
+    app.live_predictions = False
+    app.init_state(model, scaler, render_mode, grid_size)
+    app.brush_size = brush_size
+    # Segnaposto dei widget che gli handler aggiornano
+    app.x_labels = {f'x{i}': _Widget() for i in range(1, 5)}
+    app.grid_values_label = _Widget()
+    app.mode_label = _Widget()
+    app.canvas = _Widget()
+    app.canvas_image = _Widget()
+    app.canvas_background = guide_background(CANVAS_SIZE, app.grid_splits())
+    return app
+
+def reset_canvas(app):
+    """Stato di clear_canvas senza i widget."""
+    app.reset_drawing_state()
+
+
+def replay(records, app, realtime=False, classify=True, on_classify=None):
+    """Invia i record agli handler dell'app. Restituisce il numero di eventi CLASSIFY.
+
+    realtime: rispetta gli intervalli registrati (altrimenti il più veloce possibile).
+    classify: esegue classify_input agli eventi CLASSIFY (serve un modello).
+    on_classify(feature, etichetta, confidenza): chiamata a ogni evento CLASSIFY.
+    """
+    classifications = 0
+    start = time.perf_counter()
+    for record in records:
+        if realtime:
+            delay = record['t'] - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        event_type = record['event']
+        app.brush_size = int(record['brush'])
+        app.eraser_mode = bool(record['eraser'])
+        event = SimpleNamespace(x=int(record['x']), y=int(record['y']))
+        if event_type == strokes.START:
+            app.start_draw(event)
+        elif event_type == strokes.MOVE:
+            app.draw_line(event)
+        elif event_type == strokes.STOP:
+            app.stop_draw(event)
+        elif event_type == strokes.CLEAR:
+            app.clear_pixels()
+        elif event_type == strokes.UNDO:
+            app.undo_stroke()
+        elif event_type == strokes.REDO:
+            app.redo_stroke()
+        elif event_type == strokes.CLASSIFY:
+            app.update_pixel_counts()
+            features = list(app.current_x_values)
+            label, confidence = None, None
+            if classify and app.model is not None and app.model_accepts_features():
+                # Stesso percorso del worker dell'app, cache delle previsioni compresa
+                label, confidence, _ = app.classify_features(features)
+            classifications += 1
+            if on_classify is not None:
+                on_classify(features, label, confidence)
+        # ERASER: lo stato della gomma è già in ogni record
+    return classifications
+
+
+_resources = {} # Modello e scaler per processo del pool (caricati una volta)
+
+def _load(backend):
+    if backend not in _resources:
+        _resources[backend] = (main.load_model_backend(backend, status=lambda message: None),
+                               main.load_scaler())
+    return _resources[backend]
+
+def replay_file(path, backend=None, grid_size=None, realtime=False):
+    """Riproduce un log. Restituisce (righe [(feature, etichetta, confidenza)], statistiche).
+
+    grid_size: griglia delle feature; None usa quella registrata nel log.
+    """
+    records, session = strokes.read_log(path)
+    if session['canvas_size'] != CANVAS_SIZE:
+        raise ValueError(f"'{path}': canvas {session['canvas_size']}px, l'app usa {CANVAS_SIZE}px")
+    render_mode = session['render_mode'] or main.DEFAULT_RENDER_MODE
+    grid_size = grid_size or session['grid_size'] or DEFAULT_GRID_SIZE
+    model, scaler = _load(backend) if backend else (None, None)
+    app = headless_app(render_mode=render_mode, grid_size=grid_size, model=model, scaler=scaler)
+    rows = []
+    start = time.perf_counter()
+    classifications = replay(records, app, realtime, classify=model is not None,
+                             on_classify=lambda *row: rows.append(row))
+    seconds = time.perf_counter() - start
+    return rows, {'path': path, 'render_mode': render_mode, 'grid_size': grid_size, 'events': len(records), 'classifications': classifications,
+                  'seconds': seconds, 'recorded_seconds': float(records['t'][-1]) if len(records) else 0.0,
+                  'cache': app.prediction_cache.stats()}
+
+def _replay_job(args):
+    return replay_file(*args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Riproduce log di tratti senza interfaccia grafica.")
+    parser.add_argument('logs', nargs='+', help="Log registrati con main.py --record")
+    parser.add_argument('--realtime', action='store_true', help="Rispetta i tempi registrati")
+    parser.add_argument('--backend', choices=main.BACKENDS, default='numpy')
+    parser.add_argument('--no-classify', action='store_true', help="Solo disegno e feature, nessun modello")
+    parser.add_argument('--grid', type=int, default=None,
+                        help="Griglia delle feature (predefinita: quella registrata nel log)")
+    parser.add_argument('--rows', metavar='CSV', help="Scrive una riga per evento CLASSIFY (formato dataset.csv)")
+    parser.add_argument('--label', type=int, default=None,
+                        help="Etichetta delle righe (predefinito: quella prevista dal modello)")
+    parser.add_argument('--workers', type=int, default=1, help="Processi per riprodurre più log in parallelo")
+    args = parser.parse_args()
+    if args.rows and args.label is None and args.no_classify:
+        parser.error("--rows senza --label richiede il modello (togli --no-classify)")
+
+    backend = None if args.no_classify else args.backend
+    jobs = [(path, backend, args.grid, args.realtime) for path in args.logs]
+    start = time.perf_counter()
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_replay_job, jobs))
+    else:
+        results = [_replay_job(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    for _, stats in results:
+        print(f"{stats['path']}: {stats['events']} eventi in {stats['seconds']:.3f}s "
+              f"({stats['events'] / max(stats['seconds'], 1e-9):,.0f} eventi/s, registrati in "
+              f"{stats['recorded_seconds']:.1f}s), {stats['classifications']} classificazioni "
+              f"(cache: {stats['cache']['hits']} hit, {stats['cache']['misses']} miss)")
+    total_events = sum(stats['events'] for _, stats in results)
+    print(f"Totale: {total_events} eventi da {len(results)} log in {elapsed:.3f}s")
+
+    if args.rows:
+        grids = {stats['grid_size'] for _, stats in results}
+        if len(grids) > 1:
+            raise SystemExit(f"Log con griglie diverse ({sorted(grids)}): usa --grid per le righe")
+        written = 0
+        with open(args.rows, 'w') as f:
+            f.write(','.join(feature_names(grids.pop()) + ['label']) + '\n')
+            for rows, _ in results:
+                for features, label, _ in rows:
+                    label = args.label if args.label is not None else label
+                    if label is None:
+                        continue
+                    f.write(','.join(f'{v:.2f}' for v in features) + f',{label}\n')
+                    written += 1
+        print(f"{written} righe scritte in '{args.rows}'")
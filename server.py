@@ -0,0 +1,351 @@
+"""
+Servizio HTTP locale (asyncio) per classificare da più client con un solo modello.
+
+    POST /classify   {"features": [x1, x2, x3, x4]}
+                     {"batch": [[x1, x2, x3, x4], ...]}
+                     {"bitmap": [[0, 1, ...], ...]}           (righe di pixel, 1 = nero)
+                     {"bitmap_b64": "...", "shape": [h, w]}   (bit impacchettati con np.packbits)
+    POST /samples    {"features": [...], "label": 2}, {"batch": [...], "labels": [...]}, {"bitmap": ..., "label": 2}
+                     (aggiunge campioni etichettati all'indice k-NN, con --backend knn o --knn-assist)
+    GET  /health
+
+Ogni vettore passa prima per la cache LRU delle previsioni (predcache.py,
+chiave sul vettore arrotondato a due decimali): solo quelli non in cache
+vengono accodati. Le richieste concorrenti vengono raccolte in micro-batch: il primo vettore in
+coda attende al massimo --max-wait-ms gli altri, poi l'intero blocco passa per
+classify_batch (una trasformazione dello scaler e un forward pass). Le bitmap
+vengono riportate al formato CANVAS_SIZE x CANVAS_SIZE e trasformate in
+feature con la stessa regola di update_pixel_counts.
+
+Uso:
+    python server.py --backend numpy --port 8000
+"""
+import argparse
+import asyncio
+import base64
+import functools
+import json
+import time
+
+import numpy as np
+
+from features import CANVAS_SIZE, DEFAULT_GRID_SIZE, IntegralImage
+from knn import (ASSIST_MODES, DEFAULT_THRESHOLD as KNN_THRESHOLD, KNNAssist, NearestNeighborClassifier,
+                 assist_factory)
+from main import (BACKENDS, DEFAULT_BACKEND, classify_batch, load_fast_start,
+                  load_model_backend, load_scaler)
+from predcache import DEFAULT_MAX_ENTRIES, PredictionCache, cache_key, model_version
+
+DEFAULT_PORT = 8000
+MAX_BATCH_SIZE = 256       # Vettori massimi per micro-batch
+MAX_WAIT_MS = 2.0          # Budget di attesa per riempire un micro-batch
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def bitmap_features(bitmap, grid_size=DEFAULT_GRID_SIZE):
+    """Feature di una bitmap binaria di qualsiasi dimensione, riportata a CANVAS_SIZE x CANVAS_SIZE."""
+    try:
+        # Righe di lunghezza diversa o valori non numerici: errore del client, non del server
+        pixels = np.array(bitmap, dtype=float)
+    except (TypeError, ValueError):
+        raise BadRequest("'bitmap' deve essere una matrice di numeri con righe della stessa lunghezza")
+    if pixels.ndim != 2 or pixels.size == 0:
+        raise BadRequest("'bitmap' deve essere una matrice 2D non vuota")
+    if not np.isfinite(pixels).all():
+        raise BadRequest("'bitmap' contiene valori non finiti")
+    if pixels.shape != (CANVAS_SIZE, CANVAS_SIZE):
+        # Ricampionamento nearest-neighbour nel riquadro del canvas
+        rows = np.arange(CANVAS_SIZE) * pixels.shape[0] // CANVAS_SIZE
+        cols = np.arange(CANVAS_SIZE) * pixels.shape[1] // CANVAS_SIZE
+        pixels = pixels[np.ix_(rows, cols)]
+    return IntegralImage(pixels != 0).grid_features(grid_size)
+
+
+class MicroBatcher:
+    """Accoda i vettori di feature e li classifica a blocchi con classify_batch."""
+
+    def __init__(self, model, scaler, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 cache_size=DEFAULT_MAX_ENTRIES):
+        self.model = model
+        self.scaler = scaler
+        self.cache = PredictionCache(cache_size)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.vectors = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def classify(self, vectors):
+        """Accoda i vettori non in cache e attende (etichetta, confidenza) per ciascuno."""
+        loop = asyncio.get_running_loop()
+        version = model_version(self.model)
+        futures = []
+        for vector in vectors:
+            future = loop.create_future()
+            key = cache_key(vector)
+            result = self.cache.get(version, key)
+            if result is not None:
+                future.set_result(result)
+            else:
+                future.add_done_callback(functools.partial(self._remember, version, key))
+                self.queue.put_nowait((vector, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    def _remember(self, version, key, future):
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(version, key, future.result())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Svuota senza attendere ciò che è già arrivato
+            while len(items) < self.max_batch_size and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+
+            vectors = np.array([vector for vector, _ in items], dtype=float)
+            try:
+                # Nel thread pool: un modello Keras non deve bloccare il loop
+                labels, confidences = await loop.run_in_executor(
+                    None, classify_batch, self.model, self.scaler, vectors)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.vectors += len(items)
+            for (_, future), label, confidence in zip(items, labels, confidences):
+                if not future.done():
+                    future.set_result((int(label), float(confidence)))
+
+
+class InferenceServer:
+    def __init__(self, batcher, n_features, grid_size=DEFAULT_GRID_SIZE):
+        self.batcher = batcher
+        self.n_features = n_features
+        self.grid_size = grid_size
+        self.started = time.time()
+
+    def parse_vectors(self, payload):
+        """Restituisce (vettori, singolo) dal corpo JSON della richiesta."""
+        if 'features' in payload:
+            vectors, single = [payload['features']], True
+        elif 'batch' in payload:
+            vectors, single = payload['batch'], False
+        elif 'bitmap' in payload:
+            vectors, single = [bitmap_features(payload['bitmap'], self.grid_size)], True
+        elif 'bitmap_b64' in payload:
+            try:
+                height, width = (int(v) for v in payload['shape'])
+                bits = np.unpackbits(np.frombuffer(base64.b64decode(payload['bitmap_b64']), dtype=np.uint8))
+            except (KeyError, TypeError, ValueError):
+                raise BadRequest("'bitmap_b64' richiede una stringa base64 e 'shape': [h, w]")
+            if height <= 0 or width <= 0 or bits.size < height * width:
+                raise BadRequest("'bitmap_b64' più corta di shape")
+            bitmap = bits[:height * width].reshape(height, width)
+            vectors, single = [bitmap_features(bitmap, self.grid_size)], True
+        else:
+            raise BadRequest("Serve uno tra 'features', 'batch', 'bitmap', 'bitmap_b64'")
+        if not isinstance(vectors, list) or not vectors:
+            raise BadRequest("Nessun vettore da classificare")
+        try:
+            # Conversione qui: un vettore malformato non deve far fallire il micro-batch degli altri
+            matrix = np.array(vectors, dtype=float)
+        except (TypeError, ValueError):
+            raise BadRequest("I vettori devono contenere solo numeri")
+        if matrix.ndim != 2 or matrix.shape[1] != self.n_features:
+            raise BadRequest(f"Ogni vettore deve avere {self.n_features} valori")
+        if not np.isfinite(matrix).all():
+            raise BadRequest("I vettori contengono valori non finiti")
+        return list(matrix), single
+
+    async def handle_classify(self, body):
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise BadRequest("JSON non valido")
+        if not isinstance(payload, dict):
+            raise BadRequest("Il corpo deve essere un oggetto JSON")
+        vectors, single = self.parse_vectors(payload)
+        results = await self.batcher.classify(vectors)
+        results = [{'label': label, 'confidence': confidence} for label, confidence in results]
+        return results[0] if single else {'results': results}
+
+    def knn_index(self):
+        """Indice k-NN del modello servito (backend 'knn' o rete con --knn-assist), o None."""
+        model = self.batcher.model
+        if isinstance(model, KNNAssist):
+            return model.knn
+        return model if isinstance(model, NearestNeighborClassifier) else None
+
+    def handle_samples(self, body):
+        knn = self.knn_index()
+        if knn is None:
+            raise BadRequest("Nessun indice k-NN: avvia con --backend knn oppure --knn-assist")
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise BadRequest("JSON non valido")
+        if not isinstance(payload, dict):
+            raise BadRequest("Il corpo deve essere un oggetto JSON")
+        vectors, single = self.parse_vectors(payload)
+        labels = [payload.get('label')] if single else payload.get('labels')
+        if not isinstance(labels, list) or len(labels) != len(vectors) \
+                or not all(isinstance(label, int) and label >= 1 for label in labels):
+            raise BadRequest("Serve un'etichetta intera >= 1 per ogni vettore ('label' o 'labels')")
+        knn.add(np.array(vectors), labels)
+        return {'added': len(labels), 'rows': len(knn)}
+
+    def health(self):
+        health = {'status': 'ok', 'uptime_s': round(time.time() - self.started, 1),
+                  'batches': self.batcher.batches, 'vectors': self.batcher.vectors,
+                  'mean_batch_size': round(self.batcher.vectors / max(self.batcher.batches, 1), 2),
+                  'cache': self.batcher.cache.stats()}
+        knn = self.knn_index()
+        if knn is not None:
+            health['knn'] = knn.stats()
+        if isinstance(self.batcher.model, KNNAssist):
+            health['knn']['assisted_rows'] = self.batcher.model.assisted
+        return health
+
+    async def handle_connection(self, reader, writer):
+        """Una connessione HTTP/1.1 con keep-alive: più richieste in sequenza."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Richiesta non valida'}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': 'Corpo troppo grande'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+
+                path = path.split('?', 1)[0]
+                if method == 'OPTIONS':
+                    await self.respond(writer, 204, None, keep_alive)
+                elif method == 'GET' and path == '/health':
+                    await self.respond(writer, 200, self.health(), keep_alive)
+                elif method == 'POST' and path == '/classify':
+                    try:
+                        await self.respond(writer, 200, await self.handle_classify(body), keep_alive)
+                    except BadRequest as e:
+                        await self.respond(writer, 400, {'error': str(e)}, keep_alive)
+                    except Exception as e:
+                        await self.respond(writer, 500, {'error': f"Errore nella classificazione: {e}"}, keep_alive)
+                elif method == 'POST' and path == '/samples':
+                    try:
+                        await self.respond(writer, 200, self.handle_samples(body), keep_alive)
+                    except BadRequest as e:
+                        await self.respond(writer, 400, {'error': str(e)}, keep_alive)
+                    except Exception as e:
+                        await self.respond(writer, 500, {'error': f"Errore nell'aggiunta dei campioni: {e}"},
+                                           keep_alive)
+                else:
+                    await self.respond(writer, 404, {'error': 'Percorso sconosciuto'}, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        reasons = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+                   413: 'Payload Too Large', 500: 'Internal Server Error'}
+        body = json.dumps(payload).encode() if payload is not None else b''
+        headers = dict(CORS_HEADERS)
+        headers['Content-Length'] = str(len(body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+        head = f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(model, scaler, host, port, grid_size=DEFAULT_GRID_SIZE,
+                max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, cache_size=DEFAULT_MAX_ENTRIES):
+    from main import network_view
+    network = network_view(model)
+    n_features = network.input_size if network is not None else grid_size ** 2
+    batcher = MicroBatcher(model, scaler, max_batch_size, max_wait_ms, cache_size)
+    batcher.start()
+    server = InferenceServer(batcher, n_features, grid_size)
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Server in ascolto su http://{host}:{port} (micro-batch fino a {max_batch_size}, "
+          f"attesa max {max_wait_ms} ms)")
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servizio HTTP locale di classificazione con micro-batching.")
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument('--fast-start', action='store_true',
+                        help="Usa l'artefatto compilato se aggiornato (niente TensorFlow)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--grid', type=int, default=DEFAULT_GRID_SIZE,
+                        help="Griglia NxN usata per le feature delle bitmap")
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--knn-assist', choices=ASSIST_MODES,
+                        help="Affianca alla rete i vicini di dataset.csv quando la confidenza è bassa")
+    parser.add_argument('--knn-threshold', type=float, default=KNN_THRESHOLD)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Previsioni conservate nella cache LRU (0 la disattiva)")
+    args = parser.parse_args()
+    if args.knn_assist and args.backend == 'knn':
+        parser.error("--knn-assist affianca una rete: non si usa con --backend knn")
+
+    model, scaler = load_fast_start(args.backend) if args.fast_start else (None, None)
+    if model is None:
+        model, scaler = load_model_backend(args.backend), load_scaler()
+    if args.knn_assist:
+        model = assist_factory(args.knn_assist, args.knn_threshold)(model, scaler)
+    try:
+        asyncio.run(serve(model, scaler, args.host, args.port, args.grid,
+                          args.max_batch_size, args.max_wait_ms, args.cache_size))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,103 @@
+"""
+Registrazione delle sessioni di disegno in un log binario compatto.
+
+Ogni evento gestito dall'app (start_draw, draw_line, stop_draw, cambio
+gomma, cancellazione, classificazione, annulla/ripeti) diventa un record di 15 byte:
+
+    t       float64  secondi dall'inizio della registrazione
+    x, y    int16    coordinate sul canvas
+    event   uint8    uno tra START, MOVE, STOP, ERASER, CLEAR, CLASSIFY, UNDO, REDO
+    brush   uint8    brush_size al momento dell'evento
+    eraser  uint8    1 se la gomma è attiva (per ERASER: stato dopo il cambio)
+
+Il file è un'intestazione (MAGIC, versione, dimensione del canvas, modalità di
+rendering, griglia delle feature) seguita dai record uno dopo l'altro, così un log si legge con una sola np.frombuffer. I
+record vengono accumulati in un array preallocato e scritti a blocchi.
+Rendering e griglia servono alla riproduzione: in modalità 'vector' una
+cancellazione svuota lo storico, in 'bitmap' si può annullare.
+"""
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'ABCSTRK'
+FORMAT_VERSION = 2
+PREFIX = struct.Struct('<7sB')    # magic, versione
+HEADERS = {
+    1: struct.Struct('<H'),       # dimensione del canvas
+    2: struct.Struct('<H8sB'),    # dimensione del canvas, modalità di rendering (ASCII), griglia
+}
+
+RECORD_DTYPE = np.dtype([('t', '<f8'), ('x', '<i2'), ('y', '<i2'),
+                         ('event', 'u1'), ('brush', 'u1'), ('eraser', 'u1')])
+
+START, MOVE, STOP, ERASER, CLEAR, CLASSIFY, UNDO, REDO = range(8)
+EVENT_NAMES = ('start', 'move', 'stop', 'eraser', 'clear', 'classify', 'undo', 'redo')
+
+FLUSH_RECORDS = 4096 # Record in memoria prima di una scrittura su disco
+
+
+class StrokeRecorder:
+    """Accumula gli eventi in un array di record e li scrive su file a blocchi."""
+
+    def __init__(self, path, canvas_size, render_mode, grid_size, flush_records=FLUSH_RECORDS):
+        self.path = path
+        self.buffer = np.zeros(flush_records, dtype=RECORD_DTYPE)
+        self.count = 0             # Record nel buffer non ancora scritti
+        self.written = 0
+        self.started = time.perf_counter()
+        self._file = open(path, 'wb')
+        self._file.write(PREFIX.pack(MAGIC, FORMAT_VERSION)
+                         + HEADERS[FORMAT_VERSION].pack(canvas_size, render_mode.encode('ascii'), grid_size))
+
+    def record(self, event, x=0, y=0, brush=0, eraser=False):
+        if self._file is None:
+            return
+        self.buffer[self.count] = (time.perf_counter() - self.started, x, y, event, brush, eraser)
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self._file is None or not self.count:
+            return
+        self.buffer[:self.count].tofile(self._file)
+        self._file.flush()
+        self.written += self.count
+        self.count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def read_log(path):
+    """Legge un log. Restituisce (record, sessione) con sessione = {'canvas_size', 'render_mode', 'grid_size'}.
+
+    I log della versione 1 non hanno rendering e griglia: valgono None.
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(PREFIX.size)
+        if len(prefix) < PREFIX.size:
+            raise ValueError(f"'{path}' non è un log di tratti (file troppo corto)")
+        magic, version = PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' non è un log di tratti")
+        if version not in HEADERS:
+            raise ValueError(f"Versione del log non supportata: {version}")
+        header = f.read(HEADERS[version].size)
+        if len(header) < HEADERS[version].size:
+            raise ValueError(f"'{path}' non è un log di tratti (file troppo corto)")
+        data = f.read()
+    if version == 1:
+        session = {'canvas_size': HEADERS[1].unpack(header)[0], 'render_mode': None, 'grid_size': None}
+    else:
+        canvas_size, render_mode, grid_size = HEADERS[version].unpack(header)
+        session = {'canvas_size': canvas_size, 'render_mode': render_mode.rstrip(b'\0').decode('ascii'),
+                   'grid_size': grid_size}
+    # Un record troncato in coda (registrazione interrotta) viene ignorato
+    usable = len(data) - len(data) % RECORD_DTYPE.itemsize
+    return np.frombuffer(data[:usable], dtype=RECORD_DTYPE), session
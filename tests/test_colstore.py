@@ -0,0 +1,34 @@
+import pytest
+
+from colstore import ColumnStore, convert_csv
+
+
+def write_csv(path, labels):
+    path.write_text("label,x1,x2,x3,x4\n" + ''.join(f"{label},1,2,3,4\n" for label in labels))
+    return str(path)
+
+
+def test_text_labels_use_the_class_table(tmp_path):
+    store = convert_csv(write_csv(tmp_path / 'site.csv', ['c', 'a', 'c', 'b']), str(tmp_path / 'store'))
+    assert list(store.column('label')) == [3, 1, 3, 2]
+    assert store.meta['label_names'] == ['a', 'b', 'c']
+
+    # Un secondo export che inizia con un'altra lettera mantiene gli stessi codici
+    store = convert_csv(write_csv(tmp_path / 'more.csv', ['b', 'c']), str(tmp_path / 'store'))
+    assert list(ColumnStore(store.path).column('label')) == [3, 1, 3, 2, 2, 3]
+
+
+def test_custom_classes_and_numeric_labels(tmp_path):
+    store = convert_csv(write_csv(tmp_path / 'site.csv', ['y', 'x', '2']), str(tmp_path / 'store'),
+                        classes=('x', 'y'))
+    assert list(store.column('label')) == [2, 1, 2]
+
+    store = convert_csv(write_csv(tmp_path / 'numeric.csv', [3, 1]), str(tmp_path / 'numeric'))
+    assert list(store.column('label')) == [3, 1]
+    assert 'label_names' not in store.meta
+
+
+def test_unknown_text_label_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='z'):
+        convert_csv(write_csv(tmp_path / 'site.csv', ['a', 'z']), str(tmp_path / 'store'))
+    assert len(ColumnStore(str(tmp_path / 'store'))) == 0
@@ -0,0 +1,25 @@
+import os
+
+import numpy as np
+
+from engine import DenseNetwork
+
+
+def small_network(seed=0):
+    rng = np.random.default_rng(seed)
+    return DenseNetwork([(rng.normal(size=(4, 5)), rng.normal(size=5), 'relu'),
+                         (rng.normal(size=(5, 3)), rng.normal(size=3), 'softmax')])
+
+
+def test_int8_npz_is_smaller_and_close_to_float32(tmp_path):
+    network = small_network()
+    float32_path, int8_path = str(tmp_path / 'float32.npz'), str(tmp_path / 'int8.npz')
+    network.save_npz(float32_path)
+    network.save_npz(int8_path, quantize='int8')
+    assert os.path.getsize(int8_path) < os.path.getsize(float32_path)
+
+    X = np.random.default_rng(1).uniform(-2, 2, size=(50, 4))
+    restored = DenseNetwork.from_npz(int8_path)
+    assert restored.layer_sizes == network.layer_sizes
+    np.testing.assert_allclose(restored.forward(X), network.forward(X), atol=0.02)
+    np.testing.assert_allclose(DenseNetwork.from_npz(float32_path).forward(X), network.forward(X), atol=1e-6)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from features import grid_features
+from replay import headless_app
+
+
+def draw_stroke(app, points):
+    app.history.begin()
+    last_x, last_y = points[0]
+    app.draw_on_canvas(last_x, last_y)
+    for x, y in points[1:]:
+        app.draw_on_canvas(x, y, last_x, last_y)
+        last_x, last_y = x, y
+    app.history.commit()
+
+def assert_matches_canvas(app):
+    app.update_pixel_counts()
+    assert app.current_x_values == grid_features(app.canvas_pixels, app.grid_size)
+
+
+@pytest.mark.parametrize('grid_size', [3, 4, 7])
+def test_cell_counts_follow_strokes_undo_and_clear(grid_size):
+    app = headless_app(grid_size=grid_size)
+    draw_stroke(app, [(10, 10), (190, 30), (60, 180), (199, 199)])
+    assert_matches_canvas(app)
+    app.eraser_mode = True
+    draw_stroke(app, [(0, 100), (199, 90)])
+    app.eraser_mode = False
+    assert_matches_canvas(app)
+    app.undo_stroke()
+    assert_matches_canvas(app)
+    app.redo_stroke()
+    assert_matches_canvas(app)
+    app.clear_pixels()
+    assert_matches_canvas(app)
+    app.undo_stroke()
+    assert np.any(app.canvas_pixels)
+    assert_matches_canvas(app)
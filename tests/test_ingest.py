@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from ingest import canvas_features
+from server import bitmap_features
+
+
+def test_worker_modules_do_not_import_the_gui():
+    code = "import sys, ingest, loadgen; sys.exit('tkinter' in sys.modules or 'main' in sys.modules)"
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+
+@pytest.mark.parametrize('shape, grid_size', [((28, 28), 2), ((64, 37), 3), ((400, 250), 4)])
+def test_canvas_features_match_the_server_bitmap(shape, grid_size):
+    binary = np.random.default_rng(0).random(shape) < 0.3
+    assert canvas_features(binary, grid_size) == bitmap_features(binary.astype(np.uint8), grid_size)
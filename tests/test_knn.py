@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from engine import AffineScaler, compile_artifact, load_artifact
+from knn import KNNAssist, NearestNeighborClassifier, assist_factory
+
+from test_engine import small_network
+
+
+class UniformModel:
+    """Modello finto indeciso: stessa probabilità per ognuna delle n classi."""
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+
+    def predict(self, X, verbose=0):
+        return np.full((len(X), self.n_classes), 1 / self.n_classes)
+
+
+def knn_with_labels(labels, k=4):
+    features = np.zeros((len(labels), 4))
+    return NearestNeighborClassifier(features, labels, AffineScaler.identity(4), k=k)
+
+
+@pytest.mark.parametrize('mode', ['fallback', 'ensemble'])
+def test_votes_for_unknown_classes_are_dropped_and_renormalized(mode):
+    # Vicini 1, 3, 4, 4: la rete ha 3 classi, quindi contano solo 1 e 3
+    assist = KNNAssist(UniformModel(3), knn_with_labels([1, 3, 4, 4]), mode)
+    probabilities = assist.predict(np.zeros((1, 4)))
+    votes = np.array([0.5, 0.0, 0.5])
+    expected = votes if mode == 'fallback' else (votes + 1 / 3) / 2
+    np.testing.assert_allclose(probabilities[0], expected)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1)
+
+
+def test_index_with_fewer_classes_keeps_label_columns():
+    assist = KNNAssist(UniformModel(3), knn_with_labels([2, 2, 2, 2]))
+    np.testing.assert_allclose(assist.predict(np.zeros((2, 4))), [[0, 1, 0], [0, 1, 0]])
+
+
+def test_rows_without_known_neighbours_keep_the_network():
+    assist = KNNAssist(UniformModel(3), knn_with_labels([4, 5, 4, 5]))
+    np.testing.assert_allclose(assist.predict(np.zeros((1, 4))), [[1 / 3] * 3])
+    assert assist.assisted == 0
+
+
+def test_fast_start_assist_matches_a_normal_launch(tmp_path):
+    rng = np.random.default_rng(3)
+    features = rng.uniform(0, 100, size=(60, 4)) * [1, 1, 0.1, 0.1]
+    labels = rng.integers(1, 4, size=60)
+    dataset = tmp_path / 'dataset.csv'
+    np.savetxt(dataset, np.column_stack([features, labels]), delimiter=',', fmt='%g',
+               header='x1,x2,x3,x4,label', comments='')
+    scaler = AffineScaler([0.05, 0.05, 0.5, 0.5], [-2, -2, -2, -2])
+    network = small_network()
+    artifact, source = str(tmp_path / 'model_cache.npz'), str(dataset)
+    compile_artifact(network, scaler, artifact, [source])
+    folded, folded_scaler = load_artifact(artifact, [source])
+
+    normal = assist_factory('fallback', threshold=1.0, path=source)(network, scaler)
+    fast = assist_factory('fallback', threshold=1.0, path=source)(folded, folded_scaler)
+    queries = rng.uniform(0, 100, size=(20, 4)) * [1, 1, 0.1, 0.1]
+    np.testing.assert_allclose(fast.predict(folded_scaler.transform(queries)),
+                               normal.predict(scaler.transform(queries)))
+    assert fast.knn.scaler is folded_scaler.folded
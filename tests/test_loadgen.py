@@ -0,0 +1,26 @@
+import asyncio
+
+from engine import AffineScaler
+from loadgen import run
+from server import InferenceServer, MicroBatcher
+
+from test_engine import small_network
+
+
+def test_clients_send_distinct_payloads_and_report_cache_hits():
+    async def scenario():
+        batcher = MicroBatcher(small_network(), AffineScaler.identity(4))
+        batcher.start()
+        server = InferenceServer(batcher, n_features=4)
+        tcp_server = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        async with tcp_server:
+            first = await run('127.0.0.1', port, 4, 40, 'features', 1, 4)
+            again = await run('127.0.0.1', port, 4, 40, 'features', 1, 4)
+        return first, again
+
+    (latencies, errors, _, cache), (_, _, _, cache_again) = asyncio.run(scenario())
+    assert len(latencies) == 40 and not errors
+    assert (cache['hits'], cache['misses']) == (0, 40)
+    # Stessi semi: la seconda prova è servita tutta dalla cache, e il report lo dice
+    assert (cache_again['hits'], cache_again['misses']) == (40, 0)
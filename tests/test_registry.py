@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+import main
+from engine import AffineScaler, DenseNetwork
+from registry import ModelRegistry
+
+from test_engine import small_network
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'load_scaler', lambda path=main.SCALER_PATH: AffineScaler.identity(4))
+    small_network(seed=0).save_tfjs(main.MODEL_JSON_PATH)
+    registry = ModelRegistry('numpy', dataset_path=str(tmp_path / 'missing.csv'))
+    yield registry
+    registry.stop()
+
+
+def test_published_versions_do_not_follow_in_place_rewrites(registry):
+    X = np.random.default_rng(2).uniform(-2, 2, size=(8, 4))
+    first = registry.load()
+    registry._publish(first)
+    expected = first.model.forward(X)
+
+    # Riscrittura sul posto dello shard osservato (come cp o open('wb')), poi troncamento
+    with open('group1-shard1of1.bin', 'r+b') as f:
+        f.write(b'\0' * os.path.getsize('group1-shard1of1.bin'))
+    np.testing.assert_array_equal(first.model.forward(X), expected)
+    with open('group1-shard1of1.bin', 'wb'):
+        pass
+    np.testing.assert_array_equal(first.model.forward(X), expected)
+
+    small_network(seed=1).save_tfjs(main.MODEL_JSON_PATH)
+    second = registry.load()
+    registry._publish(second)
+    np.testing.assert_allclose(second.model.forward(X), small_network(seed=1).forward(X), rtol=1e-5)
+    assert registry.rollback() is first
+    np.testing.assert_array_equal(registry.current.model.forward(X), expected)
+
+    # Una terza versione fa uscire la prima dal registro: la sua copia viene rimossa
+    registry.rollback()
+    registry._publish(registry.load())
+    assert not os.path.exists(first.snapshot_dir)
+    assert os.path.exists(second.snapshot_dir)
+
+
+def test_rejected_version_leaves_no_snapshot(registry, monkeypatch):
+    def reject(*args):
+        raise ValueError("sonda")
+    monkeypatch.setattr(registry, 'validate', reject)
+    with pytest.raises(ValueError):
+        registry.load()
+    assert os.listdir(registry._snapshot_root) == []
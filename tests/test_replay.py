@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import main
+import strokes
+from replay import headless_app, replay_file, reset_canvas
+
+
+def test_headless_app_uses_the_app_state_setup():
+    app = headless_app(brush_size=4, grid_size=3)
+    assert app.brush_size == 4
+    assert app.current_x_values == [0] * 9
+    assert app.cell_counts.shape == (3, 3)
+    assert app.model is None and app.knn_assist is None
+
+    app.history.begin()
+    app.draw_on_canvas(100, 100)
+    app.history.commit()
+    assert app.canvas_pixels.any() and app.cell_counts.any()
+
+    reset_canvas(app)
+    assert not app.canvas_pixels.any()
+    assert not app.cell_counts.any()
+    assert app.quadrant_counts == [0, 0, 0, 0]
+    assert app.history.undo() is None
+
+
+def record_session(path, render_mode, grid_size=2):
+    recorder = strokes.StrokeRecorder(str(path), main.CANVAS_SIZE, render_mode, grid_size)
+    recorder.record(strokes.START, 40, 40, brush=8)
+    for x in range(45, 160, 5):
+        recorder.record(strokes.MOVE, x, x, brush=8)
+    recorder.record(strokes.STOP, 160, 160, brush=8)
+    recorder.record(strokes.CLEAR)
+    recorder.record(strokes.UNDO)
+    recorder.record(strokes.CLASSIFY)
+    recorder.close()
+    return str(path)
+
+
+@pytest.mark.parametrize('render_mode, inked', [('vector', False), ('bitmap', True)])
+def test_replay_uses_the_recorded_render_mode(tmp_path, render_mode, inked):
+    path = record_session(tmp_path / 'session.strk', render_mode, grid_size=3)
+    _, session = strokes.read_log(path)
+    assert session == {'canvas_size': main.CANVAS_SIZE, 'render_mode': render_mode, 'grid_size': 3}
+
+    rows, stats = replay_file(path)
+    assert (stats['render_mode'], stats['grid_size']) == (render_mode, 3)
+    features = rows[0][0]
+    assert len(features) == 9
+    # Annulla dopo Cancella ripristina il disegno solo in modalità bitmap, come nell'app
+    assert any(features) == inked
+
+
+def test_version_1_logs_replay_as_bitmap(tmp_path):
+    path = tmp_path / 'old.strk'
+    record = np.zeros(1, dtype=strokes.RECORD_DTYPE)
+    record['event'] = strokes.CLASSIFY
+    path.write_bytes(strokes.PREFIX.pack(strokes.MAGIC, 1) + strokes.HEADERS[1].pack(main.CANVAS_SIZE)
+                     + record.tobytes())
+    rows, stats = replay_file(str(path))
+    assert (stats['render_mode'], stats['grid_size']) == ('bitmap', 2)
+    assert rows[0][0] == [0.0] * 4
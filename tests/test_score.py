@@ -0,0 +1,34 @@
+import numpy as np
+
+from engine import AffineScaler
+from main import score_csv
+
+
+class ArgmaxModel:
+    """Modello finto: la classe prevista è la colonna con il valore più alto."""
+    def predict(self, X, verbose=0):
+        X = np.asarray(X)
+        probabilities = np.zeros_like(X, dtype=float)
+        probabilities[np.arange(len(X)), np.argmax(X, axis=1)] = 1.0
+        return probabilities
+
+
+def test_score_csv_blank_lines_keep_rows_aligned(tmp_path):
+    source = tmp_path / 'input.csv'
+    source.write_text("x1,x2,x3,x4,label\n"
+                      "9,0,0,0,1\n"
+                      "\n"
+                      "0,9,0,0,2\n"
+                      "   \n"
+                      "0,0,9,0,3\n"
+                      "0,0,0,9,4\n"
+                      "\n")
+    output = tmp_path / 'predictions.csv'
+    total, correct = score_csv(ArgmaxModel(), AffineScaler.identity(4), str(source), str(output), chunk_size=2)
+    assert (total, correct) == (4, 4)
+    lines = output.read_text().splitlines()
+    assert lines[0] == 'x1,x2,x3,x4,label,predicted_label,confidence'
+    for line in lines[1:]:
+        values = line.split(',')
+        assert values[4] == values[5]
+    assert len(lines) == 5
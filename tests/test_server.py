@@ -0,0 +1,92 @@
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from knn import NearestNeighborClassifier
+from server import BadRequest, InferenceServer, bitmap_features
+
+
+@pytest.fixture
+def server():
+    return InferenceServer(batcher=None, n_features=4)
+
+
+@pytest.mark.parametrize('payload', [
+    {'bitmap': [[0, 1], [1]]},
+    {'bitmap': [['a', 'b'], ['c', 'd']]},
+    {'bitmap': [[0, {'x': 1}], [1, 0]]},
+    {'bitmap': [[0, None], [1, 0]]},
+    {'bitmap': [[[0, 1]], [[1, 0]]]},
+    {'bitmap': [0, 1, 1, 0]},
+    {'bitmap': []},
+    {'bitmap': [[]]},
+    {'bitmap': 'pixels'},
+    {'bitmap_b64': 'AAAA', 'shape': [200]},
+    {'bitmap_b64': base64.b64encode(b'\xff').decode(), 'shape': [4, 4]},
+    {'features': [1, 2, 3]},
+    {'features': [1, 2, 'x', 4]},
+    {'batch': [[1, 2, 3, 4], [1, 2]]},
+    {'batch': []},
+    {'other': 1},
+])
+def test_bad_payloads_raise_bad_request(server, payload):
+    with pytest.raises(BadRequest):
+        server.parse_vectors(payload)
+
+
+def test_bitmap_matches_packed_bitmap(server):
+    bitmap = np.zeros((20, 20), dtype=np.uint8)
+    bitmap[:10, :5] = 1
+    vectors, single = server.parse_vectors({'bitmap': bitmap.tolist()})
+    packed = base64.b64encode(np.packbits(bitmap)).decode()
+    packed_vectors, _ = server.parse_vectors({'bitmap_b64': packed, 'shape': [20, 20]})
+    assert single
+    assert list(vectors[0]) == list(packed_vectors[0]) == bitmap_features(bitmap) == [50.0, 0.0, 0.0, 0.0]
+
+
+class FailingIndex(NearestNeighborClassifier):
+    def __init__(self):
+        pass
+
+    def add(self, features, labels):
+        raise RuntimeError("disco pieno")
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_samples_error_returns_500_and_keeps_the_connection(server):
+    server.batcher = SimpleNamespace(model=FailingIndex())
+    body = json.dumps({'features': [1, 2, 3, 4], 'label': 1}).encode()
+    request = (f"POST /samples HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+               + b"POST /samples HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}")
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(request)
+        reader.feed_eof()
+        writer = RecordingWriter()
+        await server.handle_connection(reader, writer)
+        return writer
+
+    writer = asyncio.run(run())
+    responses = writer.data.split(b'HTTP/1.1 ')[1:]
+    assert [r.split(b'\r\n', 1)[0] for r in responses] == [b'500 Internal Server Error', b'400 Bad Request']
+    assert b'disco pieno' in responses[0]
+    assert writer.closed
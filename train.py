@@ -0,0 +1,218 @@
+"""
+Addestramento in NumPy puro della rete densa (ReLU + Softmax) da dataset.csv.
+
+Sostituisce il passaggio per Keras del notebook: discesa del gradiente a
+mini-batch (Adam) completamente vettorizzata, ricerca a griglia su neuroni
+nascosti e learning rate distribuita su un pool di processi, e scrittura del
+modello vincente in tutti i formati letti dall'app e dal sito a partire da
+un'unica rete:
+
+    model.json + group1-shard1of1.bin   (backend 'numpy' e TF.js)
+    weights_*.csv / biases_*.csv        (backend 'numpy-csv' e index.html)
+    scaler.json / scaler.pkl            (index.html / app; .pkl solo se scikit-learn è installato)
+    model_float32.npz                   (rete con lo scaler incorporato, come export.py)
+
+Uso:
+    python train.py --dataset dataset.csv --out-dir trained --hidden 3 5 8 --lr 0.003 0.01 0.03
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import AffineScaler, DenseNetwork, softmax
+from export import DATASET_PATH, load_dataset
+
+DEFAULT_HIDDEN_SIZES = (3, 5, 8, 16)
+DEFAULT_LEARNING_RATES = (0.003, 0.01, 0.03)
+DEFAULT_EPOCHS = 300
+DEFAULT_BATCH_SIZE = 16
+VALIDATION_FRACTION = 0.2
+
+
+def fit_standard_scaler(X):
+    """Equivalente di StandardScaler.fit: (x - media) / deviazione standard."""
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale = np.where(scale == 0, 1.0, scale)
+    return AffineScaler(1.0 / scale, -mean / scale)
+
+def labels_to_indices(labels):
+    """Le etichette devono essere 1..K: l'app mostra argmax + 1."""
+    labels = np.asarray(labels, dtype=int)
+    if labels.min() < 1:
+        raise ValueError("Le etichette devono essere interi da 1 a K")
+    return labels - 1, int(labels.max())
+
+def stratified_split(y, fraction, seed):
+    """Indici (train, validazione) con la stessa proporzione di classi."""
+    rng = np.random.default_rng(seed)
+    train, valid = [], []
+    for cls in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == cls))
+        n_valid = max(1, int(round(len(idx) * fraction))) if len(idx) > 1 else 0
+        valid.append(idx[:n_valid])
+        train.append(idx[n_valid:])
+    return np.concatenate(train), np.concatenate(valid)
+
+
+def train_network(X, y, n_classes, hidden_size, learning_rate, epochs=DEFAULT_EPOCHS,
+                  batch_size=DEFAULT_BATCH_SIZE, seed=0):
+    """Addestra Dense(hidden, relu) -> Dense(n_classes, softmax) con Adam.
+
+    X deve essere già scalato; y contiene indici di classe 0..n_classes-1.
+    Restituisce (DenseNetwork, loss finale sul training set).
+    """
+    rng = np.random.default_rng(seed)
+    n_samples, n_inputs = X.shape
+    # He per lo strato ReLU, Glorot uniforme per l'uscita (come Keras)
+    limit = np.sqrt(6.0 / (hidden_size + n_classes))
+    params = [rng.normal(0.0, np.sqrt(2.0 / n_inputs), (n_inputs, hidden_size)),
+              np.zeros(hidden_size),
+              rng.uniform(-limit, limit, (hidden_size, n_classes)),
+              np.zeros(n_classes)]
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    one_hot = np.eye(n_classes)[y]
+    step = 0
+
+    for _ in range(epochs):
+        order = rng.permutation(n_samples)
+        for start in range(0, n_samples, batch_size):
+            batch = order[start:start + batch_size]
+            W1, b1, W2, b2 = params
+            Z1 = X[batch] @ W1 + b1
+            A1 = np.maximum(Z1, 0)
+            P = softmax(A1 @ W2 + b2)
+
+            # Gradiente della cross-entropy rispetto ai logit: P - Y
+            dZ2 = (P - one_hot[batch]) / len(batch)
+            dZ1 = (dZ2 @ W2.T) * (Z1 > 0)
+            grads = [X[batch].T @ dZ1, dZ1.sum(axis=0), A1.T @ dZ2, dZ2.sum(axis=0)]
+
+            step += 1
+            correction = np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+            for p, g, m, v in zip(params, grads, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= learning_rate * correction * m / (np.sqrt(v) + eps)
+
+    network = DenseNetwork([(params[0], params[1], 'relu'), (params[2], params[3], 'softmax')],
+                           dtype=np.float64)
+    return network, cross_entropy(network.forward(X), y)
+
+def cross_entropy(probabilities, y):
+    return float(-np.mean(np.log(probabilities[np.arange(len(y)), y] + 1e-12)))
+
+def _evaluate_candidate(args):
+    """Eseguita nei processi del pool: addestra una combinazione e la valuta sulla validazione."""
+    X_train, y_train, X_valid, y_valid, n_classes, hidden_size, learning_rate, epochs, batch_size, seed = args
+    start = time.perf_counter()
+    network, train_loss = train_network(X_train, y_train, n_classes, hidden_size, learning_rate,
+                                        epochs, batch_size, seed)
+    probabilities = network.forward(X_valid)
+    return {
+        'hidden_size': hidden_size,
+        'learning_rate': learning_rate,
+        'train_loss': train_loss,
+        'valid_loss': cross_entropy(probabilities, y_valid),
+        'valid_accuracy': float(np.mean(np.argmax(probabilities, axis=1) == y_valid)),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+def grid_search(X, y, n_classes, hidden_sizes, learning_rates, epochs=DEFAULT_EPOCHS,
+                batch_size=DEFAULT_BATCH_SIZE, seed=0, workers=None):
+    """Valuta tutte le combinazioni in parallelo; la migliore ha accuratezza più alta, poi loss più bassa."""
+    train_idx, valid_idx = stratified_split(y, VALIDATION_FRACTION, seed)
+    jobs = [(X[train_idx], y[train_idx], X[valid_idx], y[valid_idx], n_classes,
+             hidden_size, learning_rate, epochs, batch_size, seed)
+            for hidden_size, learning_rate in itertools.product(hidden_sizes, learning_rates)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_evaluate_candidate, jobs))
+    best = max(results, key=lambda r: (r['valid_accuracy'], -r['valid_loss']))
+    return best, results
+
+
+def export_all(network, scaler, out_dir):
+    """Scrive la rete e lo scaler in tutti i formati di app e sito. Restituisce i file scritti."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = lambda name: os.path.join(out_dir, name)
+    written = []
+
+    network.save_tfjs(path('model.json'))
+    written += ['model.json', 'group1-shard1of1.bin']
+    network.save_csv(path('weights_hidden.csv'), path('biases_hidden.csv'),
+                     path('weights_output.csv'), path('biases_output.csv'))
+    written += ['weights_hidden.csv', 'biases_hidden.csv', 'weights_output.csv', 'biases_output.csv']
+    with open(path('scaler.json'), 'w') as f:
+        json.dump(scaler.to_json(), f)
+    written.append('scaler.json')
+    network.fold_scaler(scaler).save_npz(path('model_float32.npz'))
+    written.append('model_float32.npz')
+
+    try:
+        import joblib
+        from sklearn.preprocessing import StandardScaler
+    except ImportError:
+        print("scikit-learn/joblib non installati: scaler.pkl non scritto (usa scaler.json)")
+    else:
+        config = scaler.to_json()
+        sk_scaler = StandardScaler()
+        sk_scaler.mean_ = np.asarray(config['mean'])
+        sk_scaler.scale_ = np.asarray(config['scale'])
+        sk_scaler.var_ = sk_scaler.scale_ ** 2
+        sk_scaler.n_features_in_ = len(config['mean'])
+        sk_scaler.n_samples_seen_ = 0
+        joblib.dump(sk_scaler, path('scaler.pkl'))
+        written.append('scaler.pkl')
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Addestramento NumPy con ricerca a griglia parallela.")
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--out-dir', default='trained',
+                        help="Cartella di uscita (usa '.' per sostituire i file del progetto)")
+    parser.add_argument('--hidden', type=int, nargs='+', default=list(DEFAULT_HIDDEN_SIZES))
+    parser.add_argument('--lr', type=float, nargs='+', default=list(DEFAULT_LEARNING_RATES))
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="Processi del pool (predefinito: CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    features, labels = load_dataset(args.dataset)
+    y, n_classes = labels_to_indices(labels)
+    scaler = fit_standard_scaler(features)
+    X = scaler.transform(features)
+    print(f"Dataset: {len(X)} righe, {X.shape[1]} feature, {n_classes} classi")
+
+    start = time.perf_counter()
+    best, results = grid_search(X, y, n_classes, args.hidden, args.lr, args.epochs,
+                                args.batch_size, args.seed, args.workers)
+    print(f"Ricerca a griglia: {len(results)} combinazioni in {time.perf_counter() - start:.1f}s")
+    for r in sorted(results, key=lambda r: (-r['valid_accuracy'], r['valid_loss'])):
+        print(f"  hidden={r['hidden_size']:>3} lr={r['learning_rate']:<7} "
+              f"acc. validazione {r['valid_accuracy'] * 100:6.2f}%  loss {r['valid_loss']:.4f}")
+
+    # Modello finale: migliori iperparametri, addestrato su tutto il dataset
+    network, train_loss = train_network(X, y, n_classes, best['hidden_size'], best['learning_rate'],
+                                        args.epochs, args.batch_size, args.seed)
+    network = DenseNetwork(network.layers, dtype=np.float32)
+    train_accuracy = float(np.mean(np.argmax(network.forward(X), axis=1) == y))
+    written = export_all(network, scaler, args.out_dir)
+
+    report = {'best': best, 'candidates': results, 'train_loss': train_loss,
+              'train_accuracy': train_accuracy, 'layer_sizes': network.layer_sizes, 'files': written}
+    with open(os.path.join(args.out_dir, 'training_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Migliore: hidden={best['hidden_size']} lr={best['learning_rate']} — "
+          f"accuratezza training {train_accuracy * 100:.2f}%")
+    print(f"Scritti in '{args.out_dir}': {', '.join(written)}")
@@ -0,0 +1,89 @@
+"""
+Thread di inferenza in background per l'app Tkinter.
+
+Il mainloop di Tk non esegue mai model.predict: consegna l'ultimo vettore di
+feature a InferenceWorker, che lo classifica in un thread separato e riporta il
+risultato nell'interfaccia con master.after. La coda ha un solo posto: se
+arrivano nuove richieste mentre una previsione è in corso, quelle vecchie
+vengono scartate e si classifica solo la più recente.
+"""
+import threading
+import time
+
+LIVE_DEBOUNCE_MS = 120 # Attesa dopo l'ultimo movimento prima della previsione "live"
+
+
+class InferenceWorker:
+    def __init__(self, master, classify, on_result, debounce_ms=LIVE_DEBOUNCE_MS):
+        """
+        classify(features) -> tupla (etichetta, confidenza, ...), eseguita nel thread del worker.
+        on_result(*tupla), eseguita nel thread di Tk tramite master.after.
+        """
+        self.master = master
+        self.classify = classify
+        self.on_result = on_result
+        self.debounce_ms = debounce_ms
+
+        self._condition = threading.Condition()
+        self._pending = None       # Ultimo vettore di feature non ancora classificato
+        self._due = 0.0            # Istante (perf_counter) in cui il pending può partire
+        self._generation = 0       # Incrementato da cancel(): i risultati vecchi si scartano
+        self._stopped = False
+        self.dropped = 0           # Richieste sostituite prima di essere classificate
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, features, immediate=False):
+        """Accoda le feature sostituendo l'eventuale richiesta in attesa.
+
+        Con immediate=False la previsione parte solo dopo debounce_ms senza
+        nuove richieste; con immediate=True (Invio, CLASSIFICA) parte subito.
+        """
+        delay = 0.0 if immediate else self.debounce_ms / 1000.0
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = list(features)
+            self._due = time.perf_counter() + delay
+            self._condition.notify()
+
+    def cancel(self):
+        """Scarta la richiesta in attesa e i risultati delle previsioni già in corso."""
+        with self._condition:
+            self._pending = None
+            self._generation += 1
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._pending is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._due - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopped:
+                    return
+                features, self._pending = self._pending, None
+                generation = self._generation
+
+            try:
+                result = tuple(self.classify(features))
+            except Exception as e:
+                print(f"Errore nella classificazione in background: {e}")
+                result = (None, None)
+
+            self.master.after(0, self._deliver, generation, result)
+
+    def _deliver(self, generation, result):
+        # Eseguito nel thread di Tk
+        if generation == self._generation:
+            self.on_result(*result)